@@ -0,0 +1,59 @@
+import asyncio
+import json
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from sqlmodel import Session, select
+
+from app.db.session import engine
+from app.models.tournament import Tournament
+from app.services.live_hub import live_hub
+
+router = APIRouter()
+
+@router.websocket("/tournaments/{public_uuid}")
+async def tournament_live_feed(websocket: WebSocket, public_uuid: str):
+    """
+    Live kanaal voor de publieke pagina's.
+    Eerst een 'hello' met het huidige volgnummer, daarna 'changes' events na elke commit.
+    Bij 'resync' (of 'partial') haalt de client de delta op via ?since=<seq>.
+    """
+    # Sessie alleen kort openen; een websocket kan uren openstaan
+    with Session(engine) as session:
+        tournament = session.exec(
+            select(Tournament).where(Tournament.public_uuid == public_uuid)
+        ).first()
+        tournament_id = tournament.id if tournament else None
+        seq = tournament.change_seq if tournament else 0
+
+    if tournament_id is None:
+        await websocket.close(code=4404)
+        return
+
+    await websocket.accept()
+    subscriber = live_hub.subscribe(tournament_id)
+
+    async def send_events():
+        await websocket.send_text(json.dumps({"type": "hello", "seq": seq}))
+        while True:
+            message = await subscriber.queue.get()
+            await websocket.send_text(message)
+            if subscriber.dropped:
+                await websocket.close(code=4408)
+                return
+            if subscriber.queue.empty():
+                subscriber.resyncs = 0
+
+    async def receive_until_closed():
+        # Clients sturen niets; we lezen alleen om een disconnect te merken
+        while True:
+            await websocket.receive_text()
+
+    sender = asyncio.create_task(send_events())
+    receiver = asyncio.create_task(receive_until_closed())
+    try:
+        await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        live_hub.unsubscribe(subscriber)
+        for task in (sender, receiver):
+            task.cancel()
@@ -1,8 +1,11 @@
 import logging
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlmodel import Session, select
 from sqlalchemy.orm import selectinload 
+from sqlalchemy.orm.exc import StaleDataError
 from pydantic import BaseModel
 
 from app.db.session import get_session
@@ -13,7 +16,19 @@ from app.models.tournament import Tournament
 from app.models.user import User
 from app.schemas.match import MatchRead, MatchScoreUpdate
 from app.api.users import get_current_user
-from app.services.tournament_gen import check_and_advance_knockout
+from app.api.pagination import keyset, list_response, next_cursor, parse_fields
+from app.services.archive_service import ARCHIVED_STATUS, load_archive
+from app.services.change_feed import CHANGE_SEQ_HEADER, build_delta
+from app.services.score_service import (
+    MatchNotFoundError,
+    ScoreValidationError,
+    VersionConflictError,
+    apply_score_update,
+    check_version,
+    load_match_for_update
+)
+from app.services.score_writer import ScoreQueueTimeoutError, score_writer
+from app.services.idempotency import IDEMPOTENCY_HEADER, REPLAYED_HEADER, idempotency_cache
 
 logger = logging.getLogger("dart_app")
 
@@ -33,75 +48,79 @@ def get_match_or_404(match_id: int, session: Session) -> Match:
 def update_match_score(
     match_id: int,
     match_in: MatchScoreUpdate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, alias=IDEMPOTENCY_HEADER),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    match = session.get(Match, match_id)
-    if not match:
-        raise HTTPException(status_code=404, detail="Match not found")
-
-    # --- VALIDATION LOGIC --- 
-    if match.best_of_legs:
-        limit = match.best_of_legs
-        winning_threshold = (limit // 2) + 1
-        
-        # 1. Validate Total Legs
-        if match_in.score_p1 + match_in.score_p2 > limit:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Impossible score: Total legs ({match_in.score_p1 + match_in.score_p2}) cannot exceed Best of {limit}."
-            )
+    # Een herhaalde request (zelfde Idempotency-Key) krijgt het opgeslagen antwoord,
+    # zonder opnieuw te schrijven of de knockout-check te draaien
+    result, replayed = idempotency_cache.run(
+        f"score:{current_user.id}:{match_id}", idempotency_key, match_in,
+        lambda: write_match_score(match_id, match_in, session)
+    )
+    if replayed:
+        response.headers[REPLAYED_HEADER] = "true"
+    return result
 
-        # 2. Validate Individual Score
-        if match_in.score_p1 > winning_threshold or match_in.score_p2 > winning_threshold:
+def write_match_score(match_id: int, match_in: MatchScoreUpdate, session: Session):
+    # Optioneel via de single-writer queue (SQLite met veel tablets tegelijk)
+    if score_writer.enabled:
+        try:
+            return score_writer.submit(match_id, match_in)
+        except SCORE_ERRORS as e:
+            raise score_error_to_http(e, session, match_id)
+        except ScoreQueueTimeoutError as e:
             raise HTTPException(
-                status_code=400, 
-                detail=f"Impossible score: A player cannot win more than {winning_threshold} legs in a Best of {limit} match."
+                status_code=503,
+                detail={"message": str(e), "written": e.written},
+                headers={"Retry-After": str(e.retry_after)}
             )
 
-        # 3. Auto-Complete Logic
-        if match_in.score_p1 == winning_threshold or match_in.score_p2 == winning_threshold:
-            match.is_completed = True
-        else:
-            match.is_completed = False
-
-    # Apply updates
-    # We updaten de scores altijd
-    match.score_p1 = match_in.score_p1
-    match.score_p2 = match_in.score_p2
-    
-    # --- FIX: Gebruik model_dump(exclude_unset=True) ---
-    # Dit zorgt ervoor dat we alleen velden updaten die expliciet zijn meegestuurd.
-    # Als de tablet géén referee_id stuurt, wordt deze dus ook NIET overschreven met None.
-    update_data = match_in.model_dump(exclude_unset=True)
-
-    if "referee_id" in update_data:
-        match.referee_id = update_data["referee_id"]
-    
-    if "referee_team_id" in update_data:
-        match.referee_team_id = update_data["referee_team_id"]
+    try:
+        match = load_match_for_update(session, match_id)
+        apply_score_update(match, match_in)
+        session.add(match)
+        session.commit()
+    except SCORE_ERRORS as e:
+        raise score_error_to_http(e, session, match_id)
 
-    if "custom_referee_name" in update_data:
-        match.custom_referee_name = update_data["custom_referee_name"]
+    # Knockout progressie gebeurt in de outbox worker (het event zit in dezelfde commit)
+    session.refresh(match)
+    return match
 
-    if not match.best_of_legs:
-        match.is_completed = match_in.is_completed
+SCORE_ERRORS = (ScoreValidationError, MatchNotFoundError, VersionConflictError, StaleDataError)
 
-    session.add(match)
-    session.commit()
-    session.refresh(match)
-    
-    # Trigger knockout progressie als de wedstrijd voltooid is
-    if match.is_completed and match.poule_number is None:
-        check_and_advance_knockout(match.tournament_id, match.round_number, session)
+def score_error_to_http(error: Exception, session: Session, match_id: int) -> HTTPException:
+    if isinstance(error, MatchNotFoundError):
+        return HTTPException(status_code=404, detail=str(error))
+    if isinstance(error, (VersionConflictError, StaleDataError)):
+        return version_conflict_to_http(session, match_id)
+    return HTTPException(status_code=400, detail=str(error))
 
-    return match
+def version_conflict_to_http(session: Session, match_id: int) -> HTTPException:
+    """409 met de actuele stand, zodat de client kan tonen wat er intussen veranderd is."""
+    session.rollback()
+    current = session.get(Match, match_id)
+    return HTTPException(status_code=409, detail={
+        "message": "Deze wedstrijd is intussen gewijzigd. Controleer de actuele stand.",
+        "current": jsonable_encoder(MatchRead.model_validate(current)) if current else None
+    })
 
 @router.get("/by-tournament/{public_uuid}", response_model=List[MatchRead])
 def get_matches_public(
     public_uuid: str,
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    fields: Optional[str] = None,
+    since: Optional[int] = None,
     session: Session = Depends(get_session)
 ):
+    """
+    Alle wedstrijden van een toernooi (via public of scorer uuid).
+    Met '?since=<seq>' komt alleen de delta terug: {seq, reset, matches, deleted}.
+    """
     # 1. Resolve Tournament [cite: 58]
     statement = select(Tournament).where(Tournament.public_uuid == public_uuid)
     tournament = session.exec(statement).first()
@@ -112,28 +131,60 @@ def get_matches_public(
         
     if not tournament:
         raise HTTPException(status_code=404, detail="Tournament not found")
-        
-    # 2. Get Matches met relaties [cite: 59]
-    statement_matches = (
-        select(Match)
-        .where(Match.tournament_id == tournament.id)
-        .options(
+
+    field_set = parse_fields(fields)
+    response.headers[CHANGE_SEQ_HEADER] = str(tournament.change_seq)
+
+    # Gearchiveerd: wedstrijden komen uit het archief i.p.v. de Match tabel
+    if tournament.status == ARCHIVED_STATUS:
+        archived = load_archive(session, tournament.id)
+        rows = archived["tournament"]["matches"] if archived else []
+        if since is not None:
+            rows = [MatchRead.model_validate(r).model_dump() for r in rows]
+            return JSONResponse(content=jsonable_encoder({"seq": tournament.change_seq, "reset": True, "matches": rows, "deleted": []}))
+        rows = [r for r in rows if after_id is None or r["id"] > after_id][:limit]
+        return list_response(response, rows, field_set, next_cursor(rows, limit), MatchRead)
+
+    # Namen alleen resolven als ze (ook) gevraagd worden
+    want_names = field_set is None or bool(field_set & {"player1_name", "player2_name"})
+    want_referee = field_set is None or "referee_name" in field_set
+    options = []
+    if want_names:
+        options += [
             selectinload(Match.player1),
             selectinload(Match.player2),
             selectinload(Match.team1), 
-            selectinload(Match.team2),
+            selectinload(Match.team2)
+        ]
+    if want_referee:
+        options += [
             selectinload(Match.referee),
             selectinload(Match.referee_team)
-        )
-        .order_by(Match.id)
-    )
-    matches = session.exec(statement_matches).all()
+        ]
+
+    def serialize(matches: List[Match]) -> List[dict]:
+        # Via MatchRead, zodat de delta dezelfde velden toont als de gewone lijst
+        return [
+            MatchRead.model_validate(serialize_match(m, want_names, want_referee)).model_dump(include=field_set)
+            for m in matches
+        ]
+
+    # Delta modus: alleen wat sinds 'since' gewijzigd of verwijderd is
+    if since is not None:
+        return JSONResponse(content=jsonable_encoder(build_delta(session, tournament.id, since, serialize, *options)))
+        
+    # 2. Get Matches met relaties [cite: 59]
+    statement_matches = select(Match).where(Match.tournament_id == tournament.id).options(*options)
+    matches = session.exec(keyset(statement_matches, Match.id, after_id, limit)).all()
     
     # 3. Construct Response met de juiste namen [cite: 60]
-    results = []
-    for m in matches:
-        m_data = m.model_dump()
-        
+    results = [serialize_match(m, want_names, want_referee) for m in matches]
+    return list_response(response, results, field_set, next_cursor(results, limit), MatchRead)
+
+def serialize_match(m: Match, want_names: bool = True, want_referee: bool = True) -> dict:
+    m_data = m.model_dump()
+    
+    if want_names:
         # Naam 1 [cite: 61, 62]
         if m.player1:
             m_data['player1_name'] = m.player1.name
@@ -150,6 +201,7 @@ def get_matches_public(
         else:
              m_data['player2_name'] = "Bye"
 
+    if want_referee:
         # Referee Naam Logica (Uitgebreid voor handmatige namen) [cite: 64]
         if m.referee:
             m_data['referee_name'] = m.referee.name
@@ -159,31 +211,46 @@ def get_matches_public(
             m_data['referee_name'] = m.custom_referee_name
         else:
             m_data['referee_name'] = "-" 
-    
-        results.append(m_data)
-        
-    return results
+
+    return m_data
 
 class MatchBoardUpdate(BaseModel):
     board_number: int
+    version: Optional[int] = None
 
 @router.patch("/{match_id}/assign-board", response_model=MatchRead)
 def assign_board(
     match_id: int,
     update_data: MatchBoardUpdate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, alias=IDEMPOTENCY_HEADER),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
     """
     Handmatige override: Verplaats een wedstrijd naar een specifiek bord. [cite: 64]
     """
+    result, replayed = idempotency_cache.run(
+        f"assign-board:{current_user.id}:{match_id}", idempotency_key, update_data,
+        lambda: write_board_assignment(match_id, update_data, session)
+    )
+    if replayed:
+        response.headers[REPLAYED_HEADER] = "true"
+    return result
+
+def write_board_assignment(match_id: int, update_data: MatchBoardUpdate, session: Session) -> Match:
     match = session.get(Match, match_id)
     if not match:
         raise HTTPException(status_code=404, detail="Match not found") 
     
-    match.board_number = update_data.board_number
-    session.add(match)
-    session.commit()
+    try:
+        check_version(match, update_data.version)
+        match.board_number = update_data.board_number
+        session.add(match)
+        session.commit()
+    except (VersionConflictError, StaleDataError):
+        raise version_conflict_to_http(session, match_id)
+
     session.refresh(match)
     return match
 
@@ -0,0 +1,99 @@
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+# Header waarin de cursor voor de volgende pagina staat (leeg = laatste pagina)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Korte groepsnamen voor de mobiele views: fields=id,scores,is_completed,names
+FIELD_ALIASES = {
+    "scores": ["score_p1", "score_p2"],
+    "names": ["player1_name", "player2_name"],
+}
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Set[str]]:
+    """'id,scores,names' -> {'id', 'score_p1', 'score_p2', 'player1_name', 'player2_name'}"""
+    if not fields:
+        return None
+
+    result = set()
+    for name in fields.split(","):
+        name = name.strip()
+        if not name:
+            continue
+        result.update(FIELD_ALIASES.get(name, [name]))
+    return result or None
+
+
+def keyset(statement, column, after: Optional[Any], limit: Optional[int]):
+    """Voegt 'WHERE column > after ORDER BY column LIMIT n' toe (oplopende keyset)."""
+    if after is not None:
+        statement = statement.where(column > after)
+    statement = statement.order_by(column)
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement
+
+
+def next_cursor(rows: List[Any], limit: Optional[int], key: str = "id") -> Optional[str]:
+    """Cursor voor de volgende pagina, alleen als deze pagina vol is."""
+    if not rows or limit is None or len(rows) < limit:
+        return None
+    last = rows[-1]
+    value = last[key] if isinstance(last, dict) else getattr(last, key)
+    return str(value)
+
+
+def list_response(
+    response: Response,
+    rows: Iterable[Any],
+    fields: Optional[Set[str]],
+    cursor: Optional[str] = None,
+    schema: Any = None
+):
+    """
+    Geeft de lijst terug. Zonder 'fields' gaat alles via het response_model van de endpoint,
+    met 'fields' sturen we alleen de gevraagde kolommen terug (buiten het response_model om).
+    """
+    headers = {NEXT_CURSOR_HEADER: cursor} if cursor else {}
+
+    if not fields:
+        response.headers.update(headers)
+        return rows
+
+    sparse = [_sparse_row(row, fields, schema) for row in rows]
+    return JSONResponse(content=jsonable_encoder(sparse), headers=headers)
+
+
+@lru_cache(maxsize=None)
+def _field_adapter(schema: Any, name: str) -> TypeAdapter:
+    return TypeAdapter(schema.model_fields[name].annotation)
+
+
+def _sparse_row(row: Any, fields: Set[str], schema: Any) -> Dict[str, Any]:
+    # Met een schema komen alleen velden mee die het response_model ook zou tonen
+    # (ook voor dict rijen, die vaak een volledige model_dump zijn)
+    if schema is not None:
+        fields = fields & schema.model_fields.keys()
+
+    if isinstance(row, dict):
+        names = [name for name in fields if name in row]
+        get = row.__getitem__
+    else:
+        # Alleen de gevraagde attributen aanraken, zodat niet-gevraagde relaties niet lazy geladen worden
+        names = [name for name in fields if schema is not None or hasattr(row, name)]
+        get = lambda name: getattr(row, name)
+
+    result = {}
+    for name in names:
+        if schema is not None:
+            adapter = _field_adapter(schema, name)
+            result[name] = adapter.dump_python(adapter.validate_python(get(name), from_attributes=True))
+        else:
+            result[name] = get(name)
+    return result
@@ -1,13 +1,22 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Response
 from sqlmodel import Session, select
 
 from app.db.session import get_session
 from app.models.player import Player
-from app.schemas.player import PlayerCreate, PlayerRead, PlayerUpdate
+from app.schemas.player import PlayerCreate, PlayerRatingRead, PlayerRead, PlayerUpdate
 from app.services import csv_service
+from app.api.pagination import keyset, list_response, next_cursor, parse_fields
+from app.models.tournament import Tournament
+from app.models.links import TournamentPlayerLink
+from app.schemas.match import NextMatchRead
+from app.services.schedule_index import find_next_match
+from app.services.rating import INITIAL_RD, recompute_ratings
+from app.services.simulation import DEFAULT_RATING
+from app.models.rating import Rating
 
-from app.api.users import get_current_user 
+from app.api.users import get_current_admin, get_current_user 
+from app.api.tournaments import verify_tournament_access
 from app.models.user import User
 
 router = APIRouter()
@@ -33,15 +42,24 @@ def create_player(
 
 @router.get("/", response_model=List[PlayerRead])
 def read_players(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    after_id: Optional[int] = None,
+    fields: Optional[str] = None,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user) # Zorg dat de user bekend is
 ):
     # Filter: Alleen spelers waar user_id gelijk is aan current_user.id
-    statement = select(Player).where(Player.user_id == current_user.id).offset(skip).limit(limit)
+    statement = select(Player).where(Player.user_id == current_user.id)
+
+    # Keyset paginatie op id (after_id); 'skip' blijft werken voor oude clients
+    statement = keyset(statement, Player.id, after_id, limit)
+    if after_id is None and skip:
+        statement = statement.offset(skip)
+
     players = session.exec(statement).all()
-    return players
+    return list_response(response, players, parse_fields(fields), next_cursor(players, limit), PlayerRead)
 
 @router.delete("/{player_id}")
 def delete_player(
@@ -58,6 +76,43 @@ def delete_player(
     return {"ok": True}
 
 
+@router.get("/ratings", response_model=List[PlayerRatingRead])
+def read_player_ratings(
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """Ratings van de eigen spelers, sterkste eerst (zonder wedstrijden: startwaarde)."""
+    players = session.exec(select(Player).where(Player.user_id == current_user.id)).all()
+    ratings = {
+        r.entity_id: r for r in session.exec(
+            select(Rating)
+            .where(Rating.entity_type == "player")
+            .where(Rating.entity_id.in_([p.id for p in players]))
+        ).all()
+    }
+    result = []
+    for p in players:
+        r = ratings.get(p.id)
+        result.append(PlayerRatingRead(
+            player_id=p.id,
+            name=p.name,
+            rating=r.rating if r else DEFAULT_RATING,
+            rd=r.rd if r else INITIAL_RD,
+            matches=r.matches if r else 0
+        ))
+    result.sort(key=lambda r: (-r.rating, r.name))
+    return result
+
+
+@router.post("/ratings/recompute")
+def recompute_player_ratings(
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_admin)
+):
+    """Berekent alle ratings opnieuw uit de volledige historie (live + archief). Alleen voor beheerders."""
+    return recompute_ratings(session)
+
+
 @router.get("/export-template")
 def export_template():
     """Download de CSV template via een GET verzoek."""
@@ -101,4 +156,34 @@ def update_player(
     session.add(player)
     session.commit()
     session.refresh(player)
-    return player
\ No newline at end of file
+    return player
+
+@router.get("/{player_id}/next", response_model=Optional[NextMatchRead])
+def get_next_match_for_player(
+    player_id: int,
+    tournament_id: Optional[int] = None,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    'Wanneer moet ik spelen?': volgende wedstrijd, bord, plek in de wachtrij en ETA.
+    Zonder tournament_id pakken we het meest recente actieve toernooi van de speler.
+    """
+    if tournament_id is not None:
+        tournament = session.get(Tournament, tournament_id)
+    else:
+        tournament = session.exec(
+            select(Tournament)
+            .join(TournamentPlayerLink, TournamentPlayerLink.tournament_id == Tournament.id)
+            .where(TournamentPlayerLink.player_id == player_id)
+            .where(Tournament.status.in_(["active", "knockout_ready"]))
+            .order_by(Tournament.created_at.desc())
+        ).first()
+
+    if not tournament:
+        raise HTTPException(status_code=404, detail="Geen actief toernooi gevonden voor deze speler")
+
+    session.refresh(tournament, ["admins"])
+    verify_tournament_access(tournament, current_user)
+
+    return find_next_match(session, tournament, player_id)
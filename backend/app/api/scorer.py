@@ -1,15 +1,24 @@
 import random
 import string
-from typing import List, Optional
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select, desc
 from pydantic import BaseModel
+from sqlalchemy.orm.exc import StaleDataError
 
 from app.db.session import get_session
 from app.models.scorer_auth import ScorerAccessCode
 from app.models.match import Match
 from app.models.tournament import Tournament
 from app.models.dartboard import Dartboard
+from app.models.player import Player
+from app.models.team import Team
+from app.models.links import TournamentBoardLink, TournamentPlayerLink, TournamentTeamLink
+from app.schemas.match import MatchScoreUpdate
+from app.services.tournament_gen import calculate_poule_standings
+from app.services.score_service import ScoreValidationError, apply_score_update, mark_match_called, mark_match_started
 from app.api.users import get_current_user # Voor admin acties
 
 router = APIRouter()
@@ -30,6 +39,10 @@ class ScorerMatchInfo(BaseModel):
     score_p2: int
     referee_name: Optional[str] = "-"
     round_str: str  # Bijv "Poule 1" of "KO - R2"
+    # Nodig om offline te kunnen scoren en later te synchroniseren
+    best_of_legs: Optional[int] = None
+    is_completed: bool = False
+    version: Optional[int] = None
 
 class ScorerStatus(BaseModel):
     tournament_id: int
@@ -40,6 +53,64 @@ class ScorerStatus(BaseModel):
     last_matches: List[ScorerMatchInfo] = []
     next_matches: List[ScorerMatchInfo] = []
 
+class ScoreSyncEvent(BaseModel):
+    match_id: int
+    score_p1: int
+    score_p2: int
+    is_completed: bool = False
+    recorded_at: datetime # Tijdstip op de tablet; events worden in deze volgorde toegepast
+    version: Optional[int] = None # Versie van de wedstrijd toen de tablet offline ging
+
+class MatchStartRequest(BaseModel):
+    code: str
+    match_id: int
+    started_at: Optional[datetime] = None # Tijdstip op de tablet (offline gestart); anders nu
+
+class ScoreSyncRequest(BaseModel):
+    code: str
+    events: List[ScoreSyncEvent] = []
+
+class ScoreSyncResult(BaseModel):
+    index: int # Positie in de meegestuurde events
+    match_id: int
+    status: str # "applied", "duplicate", "conflict" of "rejected"
+    detail: Optional[str] = None
+    current: Optional[ScorerMatchInfo] = None # Actuele stand bij een conflict
+
+class ScoreSyncResponse(BaseModel):
+    tournament_id: int
+    board_number: int
+    seq: int # Versie van het schema (change_seq van het toernooi)
+    results: List[ScoreSyncResult] = []
+    status: ScorerStatus
+    schedule: List[ScorerMatchInfo] = [] # Alle openstaande wedstrijden op dit bord, huidige eerst
+
+class VenueBoard(BaseModel):
+    board_number: int
+    board_name: Optional[str] = None
+    state: str
+    current_match: Optional[ScorerMatchInfo] = None
+    next_matches: List[ScorerMatchInfo] = []
+    last_matches: List[ScorerMatchInfo] = []
+
+class VenueStanding(BaseModel):
+    id: int
+    name: str
+    points: int
+    played: int
+    leg_diff: int
+
+class VenueOverview(BaseModel):
+    tournament_id: int
+    seq: int
+    boards: List[VenueBoard] = []
+    standings: Dict[int, List[VenueStanding]] = {}
+
+# Cache voor het venue overzicht: tournament_id -> (change_seq, overview)
+# Een nieuw volgnummer (elke wedstrijdwijziging) maakt de cache automatisch ongeldig.
+_overview_cache: "OrderedDict[int, Tuple[int, VenueOverview]]" = OrderedDict()
+OVERVIEW_CACHE_SIZE = 32
+
 # --- ADMIN ENDPOINTS ---
 
 @router.post("/generate-codes/{tournament_id}", response_model=List[CodeOverview])
@@ -111,18 +182,27 @@ def login_with_code(
         raise HTTPException(status_code=401, detail="Ongeldige code")
 
     # Geef direct de status terug
-    return get_board_status_logic(access.tournament_id, access.board_number, session)
+    return get_board_status_logic(access.tournament_id, access.board_number, session, mark_called=True)
 
 @router.get("/status/{tournament_id}/{board_number}", response_model=ScorerStatus)
 def get_board_status(
     tournament_id: int,
     board_number: int,
+    code: Optional[str] = None,
     session: Session = Depends(get_session)
 ):
     """
     Wordt elke 5 seconden aangeroepen door de tablet (Polling).
+    Alleen lezen, tenzij de tablet zijn toegangscode meestuurt: dan telt het tonen
+    van de actieve wedstrijd als 'afgeroepen'.
     """
-    return get_board_status_logic(tournament_id, board_number, session)
+    access = session.get(ScorerAccessCode, code) if code else None
+    mark_called = (
+        access is not None
+        and access.tournament_id == tournament_id
+        and access.board_number == board_number
+    )
+    return get_board_status_logic(tournament_id, board_number, session, mark_called=mark_called)
 
 def get_board_status_logic(t_id: int, b_num: int, session: Session) -> ScorerStatus:
     # Zoek de EERSTVOLGENDE actieve wedstrijd op dit bord
@@ -170,10 +250,13 @@ def format_match_info(m: Match) -> ScorerMatchInfo:
         score_p1=m.score_p1,
         score_p2=m.score_p2,
         referee_name=ref,
-        round_str=r_str
+        round_str=r_str,
+        best_of_legs=m.best_of_legs,
+        is_completed=m.is_completed,
+        version=m.version
     )
 
-def get_board_status_logic(t_id: int, b_num: int, session: Session) -> ScorerStatus:
+def get_board_status_logic(t_id: int, b_num: int, session: Session, mark_called: bool = False) -> ScorerStatus:
     # 1. Huidige actieve match (zoals voorheen)
     active_match = session.exec(
         select(Match)
@@ -186,6 +269,11 @@ def get_board_status_logic(t_id: int, b_num: int, session: Session) -> ScorerSta
     state = "active_match" if active_match else "waiting"
     current_id = active_match.id if active_match else None
 
+    # Eerste keer dat de (ingelogde) tablet deze wedstrijd als actief toont: de wedstrijd is 'afgeroepen'
+    if mark_called and active_match and active_match.called_at is None:
+        if mark_match_called(session, active_match.id):
+            session.commit()
+
     # 2. Laatste 4 Gespeelde Matches (History)
     # We laden relaties in voor namen (selectinload zou netter zijn in imports, maar dit werkt ook als lazy loaded)
     history_matches = session.exec(
@@ -215,4 +303,254 @@ def get_board_status_logic(t_id: int, b_num: int, session: Session) -> ScorerSta
         state=state,
         last_matches=[format_match_info(m) for m in history_matches],
         next_matches=[format_match_info(m) for m in next_matches_db]
-    )
\ No newline at end of file
+    )
+
+@router.post("/start")
+def start_board_match(
+    start_data: MatchStartRequest,
+    session: Session = Depends(get_session)
+):
+    """
+    Tablet meldt dat de eerste pijl gegooid is (alleen de eerste melding telt).
+    Zonder deze melding geldt de eerste score-update als start.
+    """
+    access = session.get(ScorerAccessCode, start_data.code)
+    if not access:
+        raise HTTPException(status_code=401, detail="Ongeldige code")
+
+    match = session.get(Match, start_data.match_id)
+    if not match:
+        raise HTTPException(status_code=404, detail="Match not found")
+    if match.tournament_id != access.tournament_id or match.board_number != access.board_number:
+        raise HTTPException(status_code=403, detail="Wedstrijd hoort niet bij dit bord")
+
+    started = mark_match_started(session, match.id, start_data.started_at)
+    session.commit()
+    return {"ok": True, "started": started}
+
+# --- OFFLINE SYNC (TABLET) ---
+
+@router.post("/sync", response_model=ScoreSyncResponse)
+def sync_board_scores(
+    sync_data: ScoreSyncRequest,
+    session: Session = Depends(get_session)
+):
+    """
+    Tablet komt weer online en stuurt alle scores die offline zijn ingevoerd in één keer.
+    Events worden op tijdstip gesorteerd en in één transactie toegepast. Per wedstrijd
+    geldt de meegestuurde versie: is de wedstrijd intussen door iemand anders gewijzigd,
+    dan volgt een conflict met de actuele stand. Het antwoord bevat meteen het volledige
+    schema van het bord (met versie), zodat de tablet weer offline verder kan.
+    """
+    access = session.get(ScorerAccessCode, sync_data.code)
+    if not access:
+        raise HTTPException(status_code=401, detail="Ongeldige code")
+
+    t_id, b_num = access.tournament_id, access.board_number
+    results = apply_sync_events(session, access, sync_data.events)
+
+    try:
+        session.commit()
+    except StaleDataError:
+        # Iemand anders schreef tussen ons lezen en schrijven; de tablet probeert het opnieuw
+        session.rollback()
+        raise HTTPException(status_code=409, detail="Wedstrijden zijn tijdens de sync gewijzigd, probeer opnieuw")
+
+    # Knockout progressie volgt via de outbox worker
+
+    tournament = session.get(Tournament, t_id)
+    session.refresh(tournament)
+    schedule = session.exec(
+        select(Match)
+        .where(Match.tournament_id == t_id)
+        .where(Match.board_number == b_num)
+        .where(Match.is_completed == False)
+        .order_by(Match.id)
+    ).all()
+
+    return ScoreSyncResponse(
+        tournament_id=t_id,
+        board_number=b_num,
+        seq=tournament.change_seq,
+        results=results,
+        status=get_board_status_logic(t_id, b_num, session),
+        schedule=[format_match_info(m) for m in schedule]
+    )
+
+def apply_sync_events(
+    session: Session,
+    access: ScorerAccessCode,
+    events: List[ScoreSyncEvent]
+) -> List[ScoreSyncResult]:
+    """Past de events toe (zonder commit) en geeft per event het resultaat terug."""
+    ordered = sorted(enumerate(events), key=lambda pair: pair[1].recorded_at)
+
+    matches: Dict[int, Match] = {
+        m.id: m for m in session.exec(
+            select(Match).where(Match.id.in_({e.match_id for e in events}))
+        ).all()
+    }
+    # Versie per wedstrijd vóór de sync; alle offline events van een wedstrijd gaan uit van die versie
+    base_versions = {m_id: m.version for m_id, m in matches.items()}
+    last_event = {e.match_id: e for _, e in ordered}
+
+    results: Dict[int, ScoreSyncResult] = {}
+    for index, event in ordered:
+        match = matches.get(event.match_id)
+        if not match:
+            results[index] = ScoreSyncResult(index=index, match_id=event.match_id, status="rejected", detail="Match not found")
+            continue
+        if match.tournament_id != access.tournament_id or match.board_number != access.board_number:
+            results[index] = ScoreSyncResult(index=index, match_id=event.match_id, status="rejected", detail="Wedstrijd hoort niet bij dit bord")
+            continue
+
+        if event.version is not None and event.version != base_versions[match.id]:
+            final = last_event[match.id]
+            if (match.score_p1, match.score_p2) == (final.score_p1, final.score_p2):
+                # Deze sync is al eerder verwerkt (retry na een verloren antwoord)
+                results[index] = ScoreSyncResult(index=index, match_id=match.id, status="duplicate")
+            else:
+                results[index] = ScoreSyncResult(
+                    index=index, match_id=match.id, status="conflict",
+                    detail="Wedstrijd is intussen gewijzigd", current=format_match_info(match)
+                )
+            continue
+
+        try:
+            apply_score_update(match, MatchScoreUpdate(
+                score_p1=event.score_p1, score_p2=event.score_p2, is_completed=event.is_completed
+            ), at=event.recorded_at)
+        except ScoreValidationError as e:
+            results[index] = ScoreSyncResult(index=index, match_id=match.id, status="rejected", detail=str(e))
+            continue
+
+        session.add(match)
+        results[index] = ScoreSyncResult(index=index, match_id=match.id, status="applied")
+
+    return [results[i] for i in sorted(results)]
+
+# --- VENUE OVERVIEW (BIG SCREEN) ---
+
+@router.get("/overview/{tournament_id}", response_model=VenueOverview)
+def get_venue_overview(
+    tournament_id: int,
+    session: Session = Depends(get_session)
+):
+    """
+    Alles voor het grote scherm in één response: per bord de huidige wedstrijd,
+    de volgende 2 en de laatste uitslagen, plus compacte poule standen.
+    """
+    tournament = session.get(Tournament, tournament_id)
+    if not tournament:
+        raise HTTPException(status_code=404, detail="Toernooi niet gevonden")
+
+    cached = _overview_cache.get(tournament_id)
+    if cached and cached[0] == tournament.change_seq:
+        _overview_cache.move_to_end(tournament_id)
+        return cached[1]
+
+    overview = build_venue_overview(tournament, session)
+
+    _overview_cache[tournament_id] = (tournament.change_seq, overview)
+    _overview_cache.move_to_end(tournament_id)
+    while len(_overview_cache) > OVERVIEW_CACHE_SIZE:
+        _overview_cache.popitem(last=False)
+
+    return overview
+
+def build_venue_overview(tournament: Tournament, session: Session) -> VenueOverview:
+    t_id = tournament.id
+    is_doubles = tournament.mode == "doubles"
+
+    # 1. Alles in een paar batch queries: wedstrijden, borden en namen
+    matches = session.exec(
+        select(Match).where(Match.tournament_id == t_id).order_by(Match.id)
+    ).all()
+
+    boards = session.exec(
+        select(Dartboard)
+        .join(TournamentBoardLink, TournamentBoardLink.board_id == Dartboard.id)
+        .where(TournamentBoardLink.tournament_id == t_id)
+    ).all()
+
+    player_names = {
+        p.id: p.name for p in session.exec(
+            select(Player)
+            .join(TournamentPlayerLink, TournamentPlayerLink.player_id == Player.id)
+            .where(TournamentPlayerLink.tournament_id == t_id)
+        ).all()
+    }
+    team_names = {
+        team.id: team.name for team in session.exec(
+            select(Team)
+            .join(TournamentTeamLink, TournamentTeamLink.team_id == Team.id)
+            .where(TournamentTeamLink.tournament_id == t_id)
+        ).all()
+    }
+
+    # Scheidsrechters die (nog) niet in de maps staan in één keer bijladen
+    missing_refs = {m.referee_id for m in matches if m.referee_id and m.referee_id not in player_names}
+    if missing_refs:
+        for p in session.exec(select(Player).where(Player.id.in_(missing_refs))).all():
+            player_names[p.id] = p.name
+
+    def info(m: Match) -> ScorerMatchInfo:
+        p1 = player_names.get(m.player1_id) if m.player1_id else team_names.get(m.team1_id)
+        p2 = player_names.get(m.player2_id) if m.player2_id else team_names.get(m.team2_id)
+
+        ref = "-"
+        if m.referee_id: ref = player_names.get(m.referee_id, "-")
+        elif m.referee_team_id: ref = team_names.get(m.referee_team_id, "-")
+        elif m.custom_referee_name: ref = m.custom_referee_name
+
+        return ScorerMatchInfo(
+            id=m.id,
+            player1_name=p1 or "Bye",
+            player2_name=p2 or "Bye",
+            score_p1=m.score_p1,
+            score_p2=m.score_p2,
+            referee_name=ref,
+            round_str=f"Poule {m.poule_number}" if m.poule_number else f"KO R{m.round_number}",
+            best_of_legs=m.best_of_legs,
+            is_completed=m.is_completed,
+            version=m.version
+        )
+
+    # 2. Per bord groeperen (zelfde regels als get_board_status_logic)
+    open_per_board: Dict[int, List[Match]] = {}
+    done_per_board: Dict[int, List[Match]] = {}
+    for m in matches:
+        if m.board_number is None:
+            continue
+        target = done_per_board if m.is_completed else open_per_board
+        target.setdefault(m.board_number, []).append(m)
+
+    board_names = {b.number: b.name for b in boards}
+    board_numbers = sorted(set(board_names) | set(open_per_board) | set(done_per_board))
+
+    board_overviews = []
+    for b_num in board_numbers:
+        queue = open_per_board.get(b_num, [])
+        history = done_per_board.get(b_num, [])[::-1][:4] # Nieuwste eerst
+        board_overviews.append(VenueBoard(
+            board_number=b_num,
+            board_name=board_names.get(b_num),
+            state="active_match" if queue else "waiting",
+            current_match=info(queue[0]) if queue else None,
+            next_matches=[info(m) for m in queue[1:3]],
+            last_matches=[info(m) for m in history]
+        ))
+
+    # 3. Poule standen uit dezelfde wedstrijdenlijst (geen extra queries)
+    names = team_names if is_doubles else player_names
+    standings = calculate_poule_standings(session, tournament, matches=matches, names=names)
+
+    return VenueOverview(
+        tournament_id=t_id,
+        seq=tournament.change_seq,
+        boards=board_overviews,
+        standings={
+            p_num: [VenueStanding(**{k: row[k] for k in VenueStanding.model_fields}) for row in rows]
+            for p_num, rows in standings.items()
+        }
+    )
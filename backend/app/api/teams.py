@@ -1,6 +1,6 @@
 import random
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Response
 from sqlmodel import Session, select
 
 from app.db.session import get_session
@@ -12,6 +12,7 @@ from app.schemas.team import TeamCreateManual, TeamAutoGenerate, TeamRead, TeamL
 from app.api.users import get_current_user 
 from sqlalchemy.orm import selectinload
 from app.services import csv_service
+from app.api.pagination import keyset, list_response, next_cursor, parse_fields
 from app.models.user import User
 
 router = APIRouter()
@@ -29,13 +30,23 @@ def generate_team_name(players: List[Player]) -> str:
 # --- ENDPOINT 1: Alle Teams Ophalen (Global) ---
 @router.get("/", response_model=List[TeamRead])
 def read_all_teams(
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    fields: Optional[str] = None,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
     # Alleen teams ophalen van de ingelogde gebruiker
     statement = select(Team).where(Team.user_id == current_user.id)
-    teams = session.exec(statement).all()
-    return teams
+
+    # Spelers alleen laden als ze gevraagd worden
+    field_set = parse_fields(fields)
+    if field_set is None or "players" in field_set:
+        statement = statement.options(selectinload(Team.players))
+
+    teams = session.exec(keyset(statement, Team.id, after_id, limit)).all()
+    return list_response(response, teams, field_set, next_cursor(teams, limit), TeamRead)
 
 # --- ENDPOINT 2: Teams van een specifiek toernooi ophalen ---
 @router.get("/by-tournament/{tournament_id}", response_model=List[TeamRead])
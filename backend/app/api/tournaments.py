@@ -1,30 +1,58 @@
 # FILE: backend/app/api/tournaments.py
 import uuid
 import math 
-from typing import List, Optional, Any, Dict
-from fastapi import APIRouter, Depends, HTTPException, Query
+import logging
+from typing import List, Optional, Any, Dict, Tuple
+from collections import OrderedDict
+from datetime import datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlmodel import Session, select
 from sqlalchemy.orm import selectinload
 from pydantic import BaseModel, EmailStr
-from sqlalchemy import or_
+from sqlalchemy import or_, and_, case, delete, update, func
 
 from app.db.session import get_session
 from app.models.tournament import Tournament
 from app.models.user import User
 from app.models.player import Player
-from app.models.match import Match
+from app.models.match import Match, MatchTombstone
 from app.models.dartboard import Dartboard 
 from app.models.team import Team
 from app.api.users import get_current_user
-from app.models.links import TournamentTeamLink
+from app.api.pagination import list_response, parse_fields
+from app.models.links import (
+    TournamentTeamLink,
+    TournamentPlayerLink,
+    TournamentBoardLink,
+    TournamentAdminLink,
+    TeamPlayerLink
+)
+from app.models.scorer_auth import ScorerAccessCode
+from app.models.archive import TournamentArchive
+from app.models.outbox import OutboxEvent
+from app.models.timing import TournamentTimingStats
+from app.models.swiss import SwissStanding
+from app.models.rating import RatingApplication
 
 from app.schemas.tournament import (
     TournamentCreate, 
     TournamentRead, 
     TournamentUpdate, 
     TournamentReadWithMatches,
+    TournamentCreated,
+    ScheduleQuality,
     SwapRequest,
-    SwapMatchRequest
+    SwapMatchRequest,
+    ParticipantOdds,
+    TournamentOdds,
+    PouleScenario,
+    SwissStandingRead,
+    DurationEstimate,
+    PlanRequest,
+    FormatOption,
+    TimingReport
 )
 
 from app.services.tournament_gen import (
@@ -32,11 +60,30 @@ from app.services.tournament_gen import (
     generate_round_robin_global,
     generate_knockout,
     generate_knockout_bracket,
-    assign_referees,
+    schedule_poule_matches,
     calculate_poule_standings 
 )
+from app.services.archive_service import ARCHIVED_STATUS, archive_tournament, load_archive
+from app.services.change_feed import bump_change_seq, tombstone_matches, build_delta
+from app.services.schedule_index import MINUTES_PER_LEG, find_next_match
+from app.services.simulation import DEFAULT_SIMULATIONS, simulate_tournament
+from app.services.scenarios import poule_scenarios
+from app.services.planner import plan_formats
+from app.services.swiss import SWISS_FORMAT, start_swiss, swiss_standings
+from app.services.double_elimination import DOUBLE_ELIMINATION_FORMAT, generate_double_elimination
+from app.services.rating import SEEDING_OPTIONS, SEEDING_RATING, rating_map, seeded_order, snake_poules
+from app.services.duration import DEFAULT_CHANGEOVER_MINUTES, DEFAULT_REPLICATIONS, MAX_REPLICATIONS, estimate_duration
+from app.services.match_analytics import build_timing_report, refresh_timing_stats
+from app.services.idempotency import IDEMPOTENCY_HEADER, REPLAYED_HEADER, idempotency_cache
+from app.schemas.match import NextMatchRead
 
 router = APIRouter()
+logger = logging.getLogger("dart_app")
+
+# Cache voor de kansberekening: tournament_id -> (change_seq, odds)
+# De simulatie is duur; pas bij een nieuwe uitslag (nieuw volgnummer) rekenen we opnieuw.
+_odds_cache: "OrderedDict[int, Tuple[int, TournamentOdds]]" = OrderedDict()
+ODDS_CACHE_SIZE = 32
 
 # --- HELPER: TOEGANGSCONTROLE ---
 def verify_tournament_access(tournament: Tournament, user: User):
@@ -53,24 +100,82 @@ def verify_tournament_access(tournament: Tournament, user: User):
          raise HTTPException(status_code=403, detail="Access denied: You are not the owner or admin.")
     
 
-def nuke_future_knockout_rounds(session: Session, tournament_id: int, current_round: int):
+def reject_double_elimination_swap(tournament: Tournament) -> None:
+    """
+    Wisselen ruimt vervolgrondes op via nuke_future_knockout_rounds. Bij double elimination
+    staat de hele bracket vooraf in de database (met routering per wedstrijd), dus dat zou
+    het schema slopen.
+    """
+    if tournament.format == DOUBLE_ELIMINATION_FORMAT:
+        raise HTTPException(status_code=400, detail="Wisselen kan niet bij double elimination")
+
+
+def nuke_future_knockout_rounds(session: Session, tournament_id: int, current_round: int) -> int:
     """
     Verwijdert alle knockout-wedstrijden die ná 'current_round' komen.
     Dit is nodig als de basis van de bracket verandert.
+    Eén set-based DELETE; de commit laten we aan de aanroeper over.
+    Geeft het aantal verwijderde wedstrijden terug.
     """
-    future_matches = session.exec(
-        select(Match)
-        .where(Match.tournament_id == tournament_id)
-        .where(Match.poule_number == None) # Alleen Knockout
-        .where(Match.round_number > current_round)
+    criteria = (
+        Match.tournament_id == tournament_id,
+        Match.poule_number == None, # Alleen Knockout
+        Match.round_number > current_round
+    )
+
+    # Tombstones voor delta-clients, daarna de rijen zelf weg
+    seq = bump_change_seq(session, tournament_id)
+    tombstone_matches(session, seq, *criteria)
+    result = session.exec(
+        delete(Match)
+        .where(*criteria)
+        .execution_options(synchronize_session=False)
+    )
+    removed = result.rowcount or 0
+
+    if removed:
+        logger.info(f"{removed} toekomstige wedstrijden verwijderd omdat de bracket is gewijzigd.")
+    return removed
+
+def purge_tournament_rows(session: Session, tournament_id: int) -> Dict[str, int]:
+    """
+    Verwijdert een toernooi en alle afhankelijke rijen met set-based DELETEs.
+    Volgorde: eerst de rijen die naar het toernooi (of zijn teams) verwijzen, dan het toernooi zelf.
+    Commit niet; de aanroeper doet dat zodat alles in één transactie gebeurt.
+    """
+    def _delete(statement) -> int:
+        return session.exec(statement.execution_options(synchronize_session=False)).rowcount or 0
+
+    # Teams die bij dit toernooi horen (klein lijstje, dus gewoon de ids ophalen)
+    team_ids = session.exec(
+        select(TournamentTeamLink.team_id).where(TournamentTeamLink.tournament_id == tournament_id)
     ).all()
-    
-    if future_matches:
-        for fm in future_matches:
-            session.delete(fm)
-        print(f"DEBUG: {len(future_matches)} toekomstige wedstrijden verwijderd omdat de bracket is gewijzigd.")
 
-@router.post("/", response_model=TournamentRead)
+    counts = {
+        "matches": _delete(delete(Match).where(Match.tournament_id == tournament_id)),
+        "scorer_codes": _delete(delete(ScorerAccessCode).where(ScorerAccessCode.tournament_id == tournament_id)),
+        "player_links": _delete(delete(TournamentPlayerLink).where(TournamentPlayerLink.tournament_id == tournament_id)),
+        "board_links": _delete(delete(TournamentBoardLink).where(TournamentBoardLink.tournament_id == tournament_id)),
+        "admin_links": _delete(delete(TournamentAdminLink).where(TournamentAdminLink.tournament_id == tournament_id)),
+        "archives": _delete(delete(TournamentArchive).where(TournamentArchive.tournament_id == tournament_id)),
+        "tombstones": _delete(delete(MatchTombstone).where(MatchTombstone.tournament_id == tournament_id)),
+        "outbox_events": _delete(delete(OutboxEvent).where(OutboxEvent.tournament_id == tournament_id)),
+        "timing_stats": _delete(delete(TournamentTimingStats).where(TournamentTimingStats.tournament_id == tournament_id)),
+        "swiss_standings": _delete(delete(SwissStanding).where(SwissStanding.tournament_id == tournament_id)),
+        "teams": 0,
+    }
+    # De ratings zelf blijven staan (ze tellen over toernooien heen)
+    _delete(delete(RatingApplication).where(RatingApplication.tournament_id == tournament_id))
+
+    if team_ids:
+        _delete(delete(TeamPlayerLink).where(TeamPlayerLink.team_id.in_(team_ids)))
+        _delete(delete(TournamentTeamLink).where(TournamentTeamLink.team_id.in_(team_ids)))
+        counts["teams"] = _delete(delete(Team).where(Team.id.in_(team_ids)))
+
+    _delete(delete(Tournament).where(Tournament.id == tournament_id))
+    return counts
+
+@router.post("/", response_model=TournamentCreated)
 def create_tournament(
     tourn_in: TournamentCreate,
     session: Session = Depends(get_session),
@@ -98,6 +203,19 @@ def create_tournament(
                     detail=f"Te veel deelnames per poule! Je probeert {avg_entities} teams/spelers per poule te stoppen. Het maximum is 7."
                 )
 
+    if tourn_in.seeding not in SEEDING_OPTIONS:
+        raise HTTPException(status_code=400, detail=f"Onbekende seeding '{tourn_in.seeding}' (kies uit: {', '.join(SEEDING_OPTIONS)})")
+
+    if tourn_in.format == SWISS_FORMAT and tourn_in.swiss_rounds is not None:
+            entity_count = len(players_to_link)
+            if tourn_in.mode == "doubles":
+                entity_count = math.ceil(entity_count / 2)
+            if not 1 <= tourn_in.swiss_rounds <= entity_count - 1:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Aantal Swiss ronden moet tussen 1 en {entity_count - 1} liggen (anders volgen rematches)."
+                )
+
     # 3. Verify Boards
     boards_to_link = []
     if tourn_in.board_ids:
@@ -123,9 +241,10 @@ def create_tournament(
     session.refresh(tournament)
     
     # 6. Generate Matches (Singles)
+    quality = None
     if tournament.mode == "singles":
             if tournament.format == "hybrid":
-                generate_poule_phase(
+                quality = generate_poule_phase(
                     tournament_id=tournament.id, 
                     players=players_to_link, 
                     num_poules=tournament.number_of_poules, 
@@ -134,23 +253,79 @@ def create_tournament(
                     session=session
                 )
             elif tournament.format == "round_robin":
-                generate_round_robin_global(
+                quality = generate_round_robin_global(
                     tournament_id=tournament.id,
                     players=players_to_link,
                     legs_best_of=tournament.starting_legs_group,
                     sets_best_of=tournament.sets_per_match,
                     session=session
                 )
+            elif tournament.format == SWISS_FORMAT:
+                start_swiss(session, tournament, seeded_order(session, tournament, [p.id for p in players_to_link]))
+                session.refresh(tournament)
+            elif tournament.format == DOUBLE_ELIMINATION_FORMAT:
+                entity_ids = seeded_order(session, tournament, [p.id for p in players_to_link])
+                generate_double_elimination(session, tournament, entity_ids)
             elif tournament.format == "knockout":
                 generate_knockout(
                     tournament_id=tournament.id,
                     players=players_to_link,
                     legs_best_of=tournament.starting_legs_ko,
                     sets_best_of=tournament.sets_per_match,
-                    session=session
+                    session=session,
+                    seed_by_rating=tournament.seeding == SEEDING_RATING
                 )
         
-    return tournament
+    result = TournamentCreated.model_validate(tournament, from_attributes=True)
+    result.schedule_quality = ScheduleQuality(**quality) if quality else None
+    return result
+
+@router.post("/plan", response_model=List[FormatOption])
+def plan_tournament_format(
+    plan_in: PlanRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Welke formats (poules, qualifiers, best-of) passen in het tijdslot van de zaal?
+    Gerangschikt op aantal gespeelde legs per deelnemer; 'fits' = ook de p90 blijft binnen het budget.
+    """
+    if plan_in.player_count < 2 or plan_in.boards < 1 or plan_in.time_budget_minutes <= 0:
+        raise HTTPException(status_code=400, detail="Minimaal 2 spelers, 1 bord en een positief tijdsbudget.")
+
+    entity_count = plan_in.player_count
+    if plan_in.mode == "doubles":
+        entity_count = math.ceil(entity_count / 2)
+
+    return plan_formats(
+        entity_count,
+        plan_in.boards,
+        plan_in.time_budget_minutes,
+        minutes_per_leg=plan_in.minutes_per_leg or MINUTES_PER_LEG,
+        limit=max(1, min(plan_in.limit, 50))
+    )
+
+@router.get("/timing-report", response_model=TimingReport)
+def get_season_timing_report(
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    waiting_limit: int = Query(50, ge=0, le=1000),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Seizoensrapport over alle eigen toernooien (en die waar de user co-admin is),
+    optioneel gefilterd op datum (YYYY-MM-DD, inclusief). Telt de opgeslagen aggregaten
+    per toernooi op; alleen toernooien die sinds de vorige keer gewijzigd zijn worden herberekend.
+    """
+    co_admin_ids = select(TournamentAdminLink.tournament_id).where(TournamentAdminLink.user_id == current_user.id)
+    statement = select(Tournament).where(or_(Tournament.user_id == current_user.id, Tournament.id.in_(co_admin_ids)))
+    if date_from:
+        statement = statement.where(Tournament.date >= date_from)
+    if date_to:
+        statement = statement.where(Tournament.date <= date_to)
+
+    tournaments = session.exec(statement.order_by(Tournament.id)).all()
+    return build_timing_report(session, list(tournaments), waiting_limit)
 
 @router.get("/{tournament_id}", response_model=TournamentRead)
 def read_tournament_by_id(
@@ -196,39 +371,140 @@ def get_tournament_standings(
     verify_tournament_access(tournament, current_user)
     # ----------------------
 
+    if tournament.status == ARCHIVED_STATUS:
+        archived = load_archive(session, tournament.id)
+        if archived:
+            # JSON keys zijn strings, de live variant gebruikt ints
+            return {int(k): v for k, v in archived["standings"].items()}
+
     return calculate_poule_standings(session, tournament)
 
+@router.get("/{tournament_id}/duration-estimate", response_model=DurationEstimate)
+def get_duration_estimate(
+    tournament_id: int,
+    replications: int = Query(DEFAULT_REPLICATIONS, ge=10, le=MAX_REPLICATIONS),
+    minutes_per_leg: float = Query(MINUTES_PER_LEG, gt=0, le=30),
+    changeover_minutes: float = Query(DEFAULT_CHANGEOVER_MINUTES, ge=0, le=30),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Wanneer zijn we klaar? Simuleert het resterende schema (poules + KO) vanaf de live stand
+    en geeft de eindtijd met onzekerheidsband en de bezetting per bord terug.
+    """
+    tournament = session.get(Tournament, tournament_id)
+    if not tournament:
+        raise HTTPException(status_code=404, detail="Toernooi niet gevonden")
+
+    session.refresh(tournament, ["admins", "boards"])
+    verify_tournament_access(tournament, current_user)
+    if tournament.format in (SWISS_FORMAT, DOUBLE_ELIMINATION_FORMAT):
+        raise HTTPException(status_code=400, detail="Duurschatting is er (nog) niet voor dit format")
+
+    matches = session.exec(select(Match).where(Match.tournament_id == tournament_id)).all()
+    estimate = estimate_duration(
+        tournament,
+        matches,
+        [b.number for b in tournament.boards],
+        replications=replications,
+        minutes_per_leg=minutes_per_leg,
+        changeover_minutes=changeover_minutes
+    )
+    return DurationEstimate(tournament_id=tournament_id, **estimate)
+
+@router.get("/{tournament_id}/timing", response_model=TimingReport)
+def get_tournament_timing(
+    tournament_id: int,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Gemeten tijden van één toernooi: bezetting en stilstand per bord, gemiddelde duur
+    per best-of, tijd tussen afroepen en starten, en wachttijd per deelnemer.
+    """
+    tournament = session.get(Tournament, tournament_id)
+    if not tournament:
+        raise HTTPException(status_code=404, detail="Toernooi niet gevonden")
+
+    session.refresh(tournament, ["admins"])
+    verify_tournament_access(tournament, current_user)
+
+    return build_timing_report(session, [tournament])
+
 @router.get("/", response_model=List[TournamentRead])
 def read_tournaments(
+    response: Response,
     offset: int = 0,
     limit: int = 100,
+    before_created_at: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    fields: Optional[str] = None,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    # TODO: Voor volledigheid zou je hier ook toernooien moeten ophalen 
-    # waar de user 'admin' van is, niet alleen eigenaar.
-    # Voor nu laten we dit op eigenaar staan voor de standaard lijst.
-    tournaments = session.exec(
-        select(Tournament)
-        .where(Tournament.user_id == current_user.id)
-        .options(selectinload(Tournament.players), selectinload(Tournament.boards))
-        .order_by(Tournament.created_at.desc())
-        .offset(offset)
-        .limit(limit)
-    ).all()
+    """
+    Dashboard lijst: eigen toernooien + toernooien waar de user co-admin van is.
+    Aantallen komen uit gecorreleerde COUNT subqueries (geen spelers/borden laden).
+    Keyset paginatie: geef created_at en id van het laatste item mee als
+    before_created_at / before_id voor de volgende pagina.
+    Met fields=id,name,... worden alleen die kolommen teruggestuurd.
+    """
+    player_count = (
+        select(func.count())
+        .select_from(TournamentPlayerLink)
+        .where(TournamentPlayerLink.tournament_id == Tournament.id)
+        .correlate(Tournament)
+        .scalar_subquery()
+    )
+    board_count = (
+        select(func.count())
+        .select_from(TournamentBoardLink)
+        .where(TournamentBoardLink.tournament_id == Tournament.id)
+        .correlate(Tournament)
+        .scalar_subquery()
+    )
+    co_admin_ids = select(TournamentAdminLink.tournament_id).where(TournamentAdminLink.user_id == current_user.id)
+
+    statement = (
+        select(Tournament, player_count, board_count)
+        .where(or_(Tournament.user_id == current_user.id, Tournament.id.in_(co_admin_ids)))
+        .order_by(Tournament.created_at.desc(), Tournament.id.desc())
+    )
+
+    if before_created_at is not None:
+        if before_id is not None:
+            statement = statement.where(or_(
+                Tournament.created_at < before_created_at,
+                and_(Tournament.created_at == before_created_at, Tournament.id < before_id)
+            ))
+        else:
+            statement = statement.where(Tournament.created_at < before_created_at)
+    else:
+        statement = statement.offset(offset)
+
+    rows = session.exec(statement.limit(limit)).all()
     
     results = []
-    for t in tournaments:
+    for t, n_players, n_boards in rows:
         t_data = t.model_dump()
-        t_data['player_count'] = len(t.players)
-        t_data['board_count'] = len(t.boards)
+        t_data['player_count'] = n_players
+        t_data['board_count'] = n_boards
         results.append(t_data)
         
-    return results
+    return list_response(response, results, parse_fields(fields), schema=TournamentRead)
 
 @router.get("/public/{public_uuid}", response_model=TournamentReadWithMatches)
-def read_public_tournament(public_uuid: str, session: Session = Depends(get_session)):
+def read_public_tournament(
+    public_uuid: str,
+    since: Optional[int] = None,
+    session: Session = Depends(get_session)
+):
     # Publieke endpoints hebben GEEN user check nodig
+
+    # Delta modus: alleen gewijzigde/verwijderde wedstrijden sinds 'since'
+    if since is not None:
+        return read_public_tournament_delta(public_uuid, since, session)
+
     t = session.exec(
         select(Tournament)
         .where(Tournament.public_uuid == public_uuid)
@@ -244,6 +520,194 @@ def read_public_tournament(public_uuid: str, session: Session = Depends(get_sess
     if not t:
         raise HTTPException(status_code=404, detail="Tournament not found")
 
+    # Gearchiveerde toernooien hebben geen wedstrijden meer in de live tabellen
+    if t.status == ARCHIVED_STATUS:
+        archived = load_archive(session, t.id)
+        if archived:
+            response = archived["tournament"]
+            response.update(t.model_dump())
+            return response
+
+    return build_public_tournament(session, t)
+
+@router.get("/public/{public_uuid}/next/{player_id}", response_model=Optional[NextMatchRead])
+def read_public_next_match(
+    public_uuid: str,
+    player_id: int,
+    session: Session = Depends(get_session)
+):
+    """Publieke variant van 'wanneer moet ik spelen?' (geen login nodig)."""
+    t = session.exec(select(Tournament).where(Tournament.public_uuid == public_uuid)).first()
+    if not t:
+        raise HTTPException(status_code=404, detail="Tournament not found")
+
+    return find_next_match(session, t, player_id)
+
+@router.get("/public/{public_uuid}/odds", response_model=TournamentOdds)
+def read_public_tournament_odds(
+    public_uuid: str,
+    session: Session = Depends(get_session)
+):
+    """
+    Kans per deelnemer op kwalificatie, eindpositie in de poule en toernooiwinst (Monte Carlo).
+    Publiek endpoint: het aantal simulaties ligt vast, anders kan iedereen de server laten rekenen.
+    """
+    t = session.exec(select(Tournament).where(Tournament.public_uuid == public_uuid)).first()
+    if not t:
+        raise HTTPException(status_code=404, detail="Tournament not found")
+    if t.status == ARCHIVED_STATUS:
+        raise HTTPException(status_code=400, detail="Toernooi is gearchiveerd, er valt niets meer te voorspellen")
+    if t.format in (SWISS_FORMAT, DOUBLE_ELIMINATION_FORMAT, "round_robin"):
+        # De simulatie kent alleen poules + KO; een hele competitie zou als KO behandeld worden
+        raise HTTPException(status_code=400, detail="Kansberekening is er (nog) niet voor dit format")
+
+    cache_key = t.id
+    cached = _odds_cache.get(cache_key)
+    if cached and cached[0] == t.change_seq:
+        _odds_cache.move_to_end(cache_key)
+        return cached[1]
+
+    odds = build_tournament_odds(session, t, DEFAULT_SIMULATIONS)
+
+    _odds_cache[cache_key] = (t.change_seq, odds)
+    _odds_cache.move_to_end(cache_key)
+    while len(_odds_cache) > ODDS_CACHE_SIZE:
+        _odds_cache.popitem(last=False)
+
+    return odds
+
+@router.get("/public/{public_uuid}/poules/{poule_number}/scenarios", response_model=List[PouleScenario])
+def read_public_poule_scenarios(
+    public_uuid: str,
+    poule_number: int,
+    session: Session = Depends(get_session)
+):
+    """'Wat heb ik nodig om door te gaan?': exacte status per deelnemer van de poule."""
+    t = session.exec(select(Tournament).where(Tournament.public_uuid == public_uuid)).first()
+    if not t:
+        raise HTTPException(status_code=404, detail="Tournament not found")
+    if t.status == ARCHIVED_STATUS:
+        raise HTTPException(status_code=400, detail="Toernooi is gearchiveerd, er valt niets meer te voorspellen")
+
+    matches = session.exec(
+        select(Match)
+        .where(Match.tournament_id == t.id)
+        .where(Match.poule_number == poule_number)
+    ).all()
+    if not matches:
+        raise HTTPException(status_code=404, detail="Poule niet gevonden")
+
+    scenarios = poule_scenarios(t, matches, poule_number)
+
+    model = Team if t.mode == "doubles" else Player
+    ids = [s["entity_id"] for s in scenarios]
+    names = {e.id: e.name for e in session.exec(select(model).where(model.id.in_(ids)))}
+
+    return [PouleScenario(name=names.get(s["entity_id"], "Onbekend"), **s) for s in scenarios]
+
+@router.get("/public/{public_uuid}/swiss-standings", response_model=List[SwissStandingRead])
+def read_public_swiss_standings(
+    public_uuid: str,
+    session: Session = Depends(get_session)
+):
+    """Swiss stand met tie-breaks (punten, Buchholz, Sonneborn-Berger, legsaldo)."""
+    t = session.exec(select(Tournament).where(Tournament.public_uuid == public_uuid)).first()
+    if not t:
+        raise HTTPException(status_code=404, detail="Tournament not found")
+    if t.format != SWISS_FORMAT:
+        raise HTTPException(status_code=400, detail="Geen Swiss toernooi")
+
+    rows = swiss_standings(session, t.id)
+
+    model = Team if t.mode == "doubles" else Player
+    ids = [r.entity_id for r in rows]
+    names = {e.id: e.name for e in session.exec(select(model).where(model.id.in_(ids)))}
+
+    return [
+        SwissStandingRead(
+            rank=rank,
+            name=names.get(r.entity_id, "Onbekend"),
+            **r.model_dump(include={
+                "entity_id", "points", "wins", "legs_won", "legs_lost",
+                "buchholz", "sonneborn_berger", "rounds_played", "had_bye"
+            })
+        )
+        for rank, r in enumerate(rows, start=1)
+    ]
+
+def build_tournament_odds(session: Session, t: Tournament, simulations: int) -> TournamentOdds:
+    matches = session.exec(select(Match).where(Match.tournament_id == t.id)).all()
+    # Sterktes uit de ratings (wie nog geen rating heeft, telt als gemiddeld)
+    is_doubles = t.mode == "doubles"
+    ids = {e for m in matches for e in ((m.team1_id, m.team2_id) if is_doubles else (m.player1_id, m.player2_id)) if e}
+    ratings = rating_map(session, "team" if is_doubles else "player", ids)
+    result = simulate_tournament(t, matches, ratings=ratings, simulations=simulations)
+
+    model = Team if t.mode == "doubles" else Player
+    names = {
+        e.id: e.name for e in session.exec(select(model).where(model.id.in_(result["entities"])))
+    }
+
+    poule_of: Dict[int, Tuple[int, List[float]]] = {}
+    for p_num, (entities, matrix) in result["positions"].items():
+        for row, entity_id in enumerate(entities):
+            poule_of[entity_id] = (p_num, [round(float(x), 4) for x in matrix[row]])
+
+    participants = []
+    for idx, entity_id in enumerate(result["entities"]):
+        p_num, positions = poule_of.get(entity_id, (None, []))
+        participants.append(ParticipantOdds(
+            entity_id=entity_id,
+            name=names.get(entity_id, "Onbekend"),
+            poule_number=p_num,
+            qualified=round(float(result["qualified"][idx]), 4),
+            title=round(float(result["title"][idx]), 4),
+            positions=positions
+        ))
+    participants.sort(key=lambda p: (-p.title, -p.qualified, p.name))
+
+    return TournamentOdds(
+        tournament_id=t.id,
+        seq=t.change_seq,
+        simulations=result["simulations"],
+        participants=participants
+    )
+
+def read_public_tournament_delta(public_uuid: str, since: int, session: Session) -> JSONResponse:
+    t = session.exec(
+        select(Tournament)
+        .where(Tournament.public_uuid == public_uuid)
+        .options(selectinload(Tournament.players))
+    ).first()
+
+    if not t:
+        raise HTTPException(status_code=404, detail="Tournament not found")
+
+    if t.status == ARCHIVED_STATUS:
+        archived = load_archive(session, t.id)
+        matches = archived["tournament"]["matches"] if archived else []
+        delta = {"seq": t.change_seq, "reset": True, "matches": matches, "deleted": []}
+    else:
+        delta = build_delta(
+            session, t.id, since,
+            lambda matches: format_public_matches(session, t, matches),
+            selectinload(Match.referee),
+            selectinload(Match.referee_team)
+        )
+
+    return JSONResponse(content=jsonable_encoder(delta))
+
+def build_public_tournament(session: Session, t: Tournament) -> Dict[str, Any]:
+    """Bouwt de publieke weergave (toernooi + wedstrijden met namen)."""
+    response = t.model_dump()
+    response['matches'] = format_public_matches(session, t, t.matches)
+    response['player_count'] = len(t.players)
+    response['board_count'] = len(t.boards)
+
+    return response
+
+def format_public_matches(session: Session, t: Tournament, matches: List[Match]) -> List[Dict[str, Any]]:
+    """Wedstrijden met speler/team/referee namen, gesorteerd op id."""
     player_map = {p.id: p.name for p in t.players}
     
     teams = session.exec(
@@ -254,7 +718,7 @@ def read_public_tournament(public_uuid: str, session: Session = Depends(get_sess
     team_map = {team.id: team.name for team in teams}
 
     matches_data = []
-    sorted_matches = sorted(t.matches, key=lambda m: m.id)
+    sorted_matches = sorted(matches, key=lambda m: m.id)
     
     for m in sorted_matches:
         m_dict = m.model_dump()
@@ -282,12 +746,7 @@ def read_public_tournament(public_uuid: str, session: Session = Depends(get_sess
 
         matches_data.append(m_dict)
 
-    response = t.model_dump()
-    response['matches'] = matches_data
-    response['player_count'] = len(t.players)
-    response['board_count'] = len(t.boards)
-
-    return response
+    return matches_data
 
 @router.post("/{tournament_id}/start-knockout")
 def start_knockout(
@@ -353,71 +812,93 @@ def update_round_format(
     verify_tournament_access(tournament, current_user)
     # ----------------------
 
-    statement = select(Match).where(
-        Match.tournament_id == tournament_id,
-        Match.round_number == round_number,
-        Match.is_completed == False 
+    # Eén set-based UPDATE in plaats van elke wedstrijd apart te laden
+    result = session.exec(
+        update(Match)
+        .where(Match.tournament_id == tournament_id)
+        .where(Match.round_number == round_number)
+        .where(Match.is_completed == False)
+        .values(
+            best_of_legs=best_of_legs,
+            change_seq=bump_change_seq(session, tournament_id),
+            version=Match.version + 1
+        )
+        .execution_options(synchronize_session=False)
     )
-    matches = session.exec(statement).all()
-    
-    if not matches:
-        return {"message": "Geen ongespeelde wedstrijden gevonden in deze ronde om aan te passen."}
-        
-    for match in matches:
-        match.best_of_legs = best_of_legs
-        session.add(match)
-        
+    updated = result.rowcount or 0
     session.commit()
-    return {"message": f"{len(matches)} wedstrijden geüpdatet naar Best of {best_of_legs} legs."}
+
+    if not updated:
+        return {"message": "Geen ongespeelde wedstrijden gevonden in deze ronde om aan te passen.", "updated": 0}
+
+    return {"message": f"{updated} wedstrijden geüpdatet naar Best of {best_of_legs} legs.", "updated": updated}
 
 @router.post("/{tournament_id}/swap-participants")
 def swap_poule_participants(
     tournament_id: int,
     swap_data: SwapRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, alias=IDEMPOTENCY_HEADER),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
+    # De bevestigingsvraag en de echte wissel zijn aparte stappen, dus 'confirmed' zit in de scope
+    result, replayed = idempotency_cache.run(
+        f"swap:{current_user.id}:{tournament_id}:{swap_data.confirmed}", idempotency_key, swap_data,
+        lambda: perform_participant_swap(tournament_id, swap_data, session, current_user)
+    )
+    if replayed:
+        response.headers[REPLAYED_HEADER] = "true"
+    return result
+
+def perform_participant_swap(tournament_id: int, swap_data: SwapRequest, session: Session, current_user: User) -> dict:
     tournament = session.get(Tournament, tournament_id)
     if not tournament:
         raise HTTPException(status_code=404, detail="Toernooi niet gevonden")
     
     session.refresh(tournament, ["admins"])
     verify_tournament_access(tournament, current_user)
-
-    matches = session.exec(
-        select(Match)
-        .where(Match.tournament_id == tournament_id)
-        .where(or_(Match.poule_number != None, Match.round_number != None)) 
-    ).all()
+    reject_double_elimination_swap(tournament)
 
     is_doubles = tournament.mode == "doubles"
     id1, id2 = swap_data.entity_id_1, swap_data.entity_id_2
-    has_started = False
-    
-    # Variabele om bij te houden wat de laagste KO ronde is die we aanraken
-    affected_ko_round = None
+    ids = [id1, id2]
+
+    prefix = "team" if is_doubles else "player"
+    col_1 = getattr(Match, f"{prefix}1_id")
+    col_2 = getattr(Match, f"{prefix}2_id")
+    involved = and_(
+        Match.tournament_id == tournament_id,
+        or_(col_1.in_(ids), col_2.in_(ids))
+    )
+
+    # Laagste KO ronde die we aanraken (None als de spelers nog niet in de KO zitten)
+    affected_ko_round = session.exec(
+        select(func.min(Match.round_number))
+        .where(involved)
+        .where(Match.poule_number == None)
+    ).one()
 
     # Check op reeds gestarte wedstrijden
-    for m in matches:
-        p1 = m.team1_id if is_doubles else m.player1_id
-        p2 = m.team2_id if is_doubles else m.player2_id
-        
-        # Check of spelers betrokken zijn
-        if p1 in [id1, id2] or p2 in [id1, id2]:
-            # Is dit een KO match?
-            if m.poule_number is None:
-                if affected_ko_round is None or m.round_number < affected_ko_round:
-                    affected_ko_round = m.round_number
-
-            # Check of er al scores zijn (voor de waarschuwing)
-            # Byes (p2 is None) tellen niet mee als 'gestart'
-            if p2 is not None and (m.score_p1 > 0 or m.score_p2 > 0 or m.is_completed):
-                has_started = True
+    # Byes (p2 is None) tellen niet mee als 'gestart'
+    has_started = session.exec(
+        select(Match.id)
+        .where(involved)
+        .where(col_2 != None)
+        .where(or_(Match.score_p1 > 0, Match.score_p2 > 0, Match.is_completed == True))
+        .limit(1)
+    ).first() is not None
 
     # Als er toekomstige rondes bestaan die we gaan verwijderen, is dat ook een "destructieve actie"
     # Dus als affected_ko_round gevonden is, checken we of er rondes NA die ronde zijn
     if affected_ko_round is not None:
-        future_check = session.exec(select(Match).where(Match.tournament_id==tournament_id).where(Match.poule_number==None).where(Match.round_number > affected_ko_round)).first()
+        future_check = session.exec(
+            select(Match.id)
+            .where(Match.tournament_id == tournament_id)
+            .where(Match.poule_number == None)
+            .where(Match.round_number > affected_ko_round)
+            .limit(1)
+        ).first()
         if future_check:
             has_started = True # Forceer bevestiging omdat we data gaan weggooien
 
@@ -427,49 +908,39 @@ def swap_poule_participants(
             "message": "Let op: Het toernooi is al gestart of er zijn vervolgrondes. Als je doorgaat worden scores gereset en latere knockout-rondes VERWIJDERD. Doorgaan?"
         }
 
-    # Voer wissel uit
-    for m in matches:
-        curr_p1 = m.team1_id if is_doubles else m.player1_id
-        curr_p2 = m.team2_id if is_doubles else m.player2_id
-        updated = False
-
-        if curr_p1 == id1:
-            setattr(m, f"{'team' if is_doubles else 'player'}1_id", id2)
-            updated = True
-        elif curr_p1 == id2:
-            setattr(m, f"{'team' if is_doubles else 'player'}1_id", id1)
-            updated = True
-            
-        if curr_p2 == id1:
-            setattr(m, f"{'team' if is_doubles else 'player'}2_id", id2)
-            updated = True
-        elif curr_p2 == id2:
-            setattr(m, f"{'team' if is_doubles else 'player'}2_id", id1)
-            updated = True
-
-        if updated:
-            new_p2 = m.team2_id if is_doubles else m.player2_id
-            
-            # Reset Logic
-            if new_p2 is None:
-                # Het is een Bye
-                m.is_completed = True
-                m.score_p1 = math.ceil(m.best_of_legs / 2) if m.best_of_legs else 1
-                m.score_p2 = 0
-            else:
-                # Echte wedstrijd: resetten
-                m.score_p1 = 0
-                m.score_p2 = 0
-                m.is_completed = False
-            
-            session.add(m)
+    # Voer wissel uit in één UPDATE met CASE.
+    # De ids worden alleen onderling gewisseld, dus 'p2 is None' (Bye) blijft gelijk.
+    is_bye = col_2 == None
+    bye_score = case((Match.best_of_legs > 0, (Match.best_of_legs + 1) // 2), else_=1)
+    result = session.exec(
+        update(Match)
+        .where(involved)
+        .values({
+            col_1: case((col_1 == id1, id2), (col_1 == id2, id1), else_=col_1),
+            col_2: case((col_2 == id1, id2), (col_2 == id2, id1), else_=col_2),
+            # Reset Logic: Bye -> voltooid met winst, echte wedstrijd -> resetten
+            Match.is_completed: is_bye,
+            Match.score_p1: case((is_bye, bye_score), else_=0),
+            Match.score_p2: 0,
+            Match.change_seq: bump_change_seq(session, tournament_id),
+            Match.version: Match.version + 1,
+        })
+        .execution_options(synchronize_session=False)
+    )
+    swapped = result.rowcount or 0
 
     # NIEUW: Als we in de knockout fase zaten, verwijder alle rondes die hierna komen
+    removed = 0
     if affected_ko_round is not None:
-        nuke_future_knockout_rounds(session, tournament_id, affected_ko_round)
+        removed = nuke_future_knockout_rounds(session, tournament_id, affected_ko_round)
 
     session.commit()
-    return {"message": "Spelers gewisseld en schema bijgewerkt.", "require_confirmation": False}
+    return {
+        "message": "Spelers gewisseld en schema bijgewerkt.",
+        "require_confirmation": False,
+        "updated": swapped,
+        "removed": removed
+    }
 
 @router.delete("/{tournament_id}")
 def delete_tournament(
@@ -486,26 +957,57 @@ def delete_tournament(
     verify_tournament_access(tournament, current_user)
     # ----------------------
     
-    # 1. Delete Matches
-    matches = session.exec(select(Match).where(Match.tournament_id == tournament_id)).all()
-    for m in matches:
-        session.delete(m)
-        
-    # 2. Delete Teams
+    # Alle afhankelijke tabellen in één transactie leegmaken (geen ORM flush per rij)
+    counts = purge_tournament_rows(session, tournament_id)
+    session.commit()
+    
+    return {"ok": True, "deleted": counts}
+
+@router.post("/{tournament_id}/archive")
+def archive_finished_tournament(
+    tournament_id: int,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Verplaatst een afgerond toernooi naar het archief.
+    Wedstrijden, standen en teams worden gecomprimeerd opgeslagen en de wedstrijden
+    verdwijnen uit de live tabel. De publieke pagina blijft werken via het archief.
+    """
+    tournament = session.get(Tournament, tournament_id)
+    if not tournament:
+        raise HTTPException(status_code=404, detail="Toernooi niet gevonden")
+
+    # --- SECURITY CHECK ---
+    session.refresh(tournament, ["admins"])
+    verify_tournament_access(tournament, current_user)
+    # ----------------------
+
+    if tournament.status == ARCHIVED_STATUS:
+        raise HTTPException(status_code=400, detail="Toernooi is al gearchiveerd.")
+    if tournament.status != "finished":
+        raise HTTPException(status_code=400, detail="Alleen afgeronde toernooien kunnen gearchiveerd worden.")
+
     teams = session.exec(
         select(Team)
         .join(TournamentTeamLink)
         .where(TournamentTeamLink.tournament_id == tournament_id)
+        .options(selectinload(Team.players))
     ).all()
-    
-    for t in teams:
-        session.delete(t)
-        
-    # 3. Delete Tournament
-    session.delete(tournament)
-    session.commit()
-    
-    return {"ok": True}
+
+    payload = {
+        "tournament": build_public_tournament(session, tournament),
+        "standings": calculate_poule_standings(session, tournament),
+        "teams": [
+            {"id": team.id, "name": team.name, "player_ids": [p.id for p in team.players]}
+            for team in teams
+        ]
+    }
+
+    # Tijdsstatistieken nog één keer bijwerken; daarna verdwijnen de wedstrijden
+    refresh_timing_stats(session, tournament)
+    archive = archive_tournament(session, tournament, payload)
+    return {"message": f"Toernooi gearchiveerd ({archive.match_count} wedstrijden).", "match_count": archive.match_count}
 
 @router.post("/{tournament_id}/finalize")
 def finalize_tournament_setup(
@@ -525,7 +1027,9 @@ def finalize_tournament_setup(
     if tournament.mode == "singles":
         return {"message": "Already generated (singles)"}
 
-    teams = session.exec(select(Team).where(Team.tournament_id == tournament_id)).all()
+    # Teams hangen via de koppeltabel aan het toernooi (Team heeft geen tournament_id)
+    session.refresh(tournament, ["teams"])
+    teams = sorted(tournament.teams, key=lambda team: team.id)
     
     if len(teams) < 2:
         raise HTTPException(status_code=400, detail="Te weinig teams om wedstrijden te genereren.")
@@ -533,13 +1037,26 @@ def finalize_tournament_setup(
     existing_matches = session.exec(select(Match).where(Match.tournament_id == tournament_id)).all()
     for m in existing_matches:
         session.delete(m)
+
+    if tournament.format == SWISS_FORMAT:
+        session.exec(delete(SwissStanding).where(SwissStanding.tournament_id == tournament_id))
+        start_swiss(session, tournament, seeded_order(session, tournament, [t.id for t in teams]))
+        return {"message": f"Setup finalized. Swiss round 1 paired for {len(teams)} teams."}
+    if tournament.format == DOUBLE_ELIMINATION_FORMAT:
+        team_ids = seeded_order(session, tournament, [t.id for t in teams])
+        matches = generate_double_elimination(session, tournament, team_ids)
+        return {"message": f"Setup finalized. {len(matches)} matches generated for {len(teams)} teams."}
     
     num_poules = tournament.number_of_poules
     poules = [[] for _ in range(num_poules)]
     
-    for i, team in enumerate(teams):
-        poule_index = i % num_poules
-        poules[poule_index].append(team)
+    if tournament.seeding == SEEDING_RATING:
+        snake = snake_poules(teams, rating_map(session, "team", [team.id for team in teams]), num_poules)
+        poules = [snake[p_num] for p_num in range(1, num_poules + 1)]
+    else:
+        for i, team in enumerate(teams):
+            poule_index = i % num_poules
+            poules[poule_index].append(team)
 
     matches_created = []
     
@@ -567,12 +1084,23 @@ def finalize_tournament_setup(
                 )
                 poule_matches.append(match)
 
-        assign_referees(poule_matches, poule_teams, is_doubles=True)
         matches_created.extend(poule_matches)
-        session.add_all(poule_matches)
+
+    # Volgorde met zoveel mogelijk rust en daarna de referees per poule
+    ordered, quality = schedule_poule_matches(
+        matches_created,
+        {idx + 1: poule_teams for idx, poule_teams in enumerate(poules)},
+        [],
+        num_poules,
+        is_doubles=True
+    )
+    session.add_all(ordered)
 
     session.commit()
-    return {"message": f"Setup finalized. {len(matches_created)} matches generated for {len(teams)} teams."}
+    return {
+        "message": f"Setup finalized. {len(matches_created)} matches generated for {len(teams)} teams.",
+        "schedule_quality": quality
+    }
 
 
 class AddAdminRequest(BaseModel):
@@ -621,15 +1149,29 @@ def add_admin_to_tournament(
 def swap_matches_content(
     tournament_id: int,
     swap_data: SwapMatchRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, alias=IDEMPOTENCY_HEADER),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
+    # Een herhaalde wissel zou de wedstrijden terugwisselen; met dezelfde key krijgt
+    # de client het opgeslagen antwoord
+    result, replayed = idempotency_cache.run(
+        f"swap-matches:{current_user.id}:{tournament_id}", idempotency_key, swap_data,
+        lambda: perform_match_swap(tournament_id, swap_data, session, current_user)
+    )
+    if replayed:
+        response.headers[REPLAYED_HEADER] = "true"
+    return result
+
+def perform_match_swap(tournament_id: int, swap_data: SwapMatchRequest, session: Session, current_user: User) -> dict:
     tournament = session.get(Tournament, tournament_id)
     if not tournament:
         raise HTTPException(status_code=404, detail="Toernooi niet gevonden")
     
     session.refresh(tournament, ["admins"])
     verify_tournament_access(tournament, current_user)
+    reject_double_elimination_swap(tournament)
 
     m1 = session.get(Match, swap_data.match_id_1)
     m2 = session.get(Match, swap_data.match_id_2)
@@ -6,6 +6,7 @@ from sqlmodel import Session, select
 
 from app.db.session import get_session
 from app.models.user import User
+from app.core.config import settings
 from app.core.security import SECRET_KEY, ALGORITHM
 from app.schemas.token import TokenData
 
@@ -40,6 +41,14 @@ async def get_current_user(
         raise credentials_exception
     return user
 
+async def get_current_admin(
+    current_user: Annotated[User, Depends(get_current_user)]
+):
+    """Alleen accounts uit settings.ADMIN_EMAILS (beheer van de hele installatie)."""
+    if current_user.email.lower() not in {email.lower() for email in settings.ADMIN_EMAILS}:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Alleen voor beheerders")
+    return current_user
+
 @router.get("/me", response_model=User)
 async def read_users_me(
     current_user: Annotated[User, Depends(get_current_user)]
@@ -1,3 +1,5 @@
+from typing import List
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -14,6 +16,15 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440  # 24 hours
 
+    # Score submissions via één writer thread (handig bij SQLite met veel tablets)
+    SCORE_WRITE_QUEUE: bool = False
+    SCORE_WRITE_BATCH_SIZE: int = 20
+    SCORE_WRITE_BATCH_WAIT_MS: int = 5
+
+    # Accounts met beheerrechten voor de hele installatie (bijv. ratings herberekenen).
+    # Via de omgeving als JSON lijst: ADMIN_EMAILS='["beheer@example.com"]'
+    ADMIN_EMAILS: List[str] = []
+
     class Config:
         case_sensitive = True
         env_file = ".env"
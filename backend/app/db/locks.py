@@ -0,0 +1,46 @@
+from sqlalchemy import text
+from sqlmodel import Session
+
+# Eerste sleutel van de two-key advisory lock, zodat we niet botsen met andere locks in dezelfde database
+TOURNAMENT_LOCK_NAMESPACE = 4242
+# Eén globale lock voor de ratingtabel (incrementele updates vs. volledig herberekenen)
+RATING_LOCK_NAMESPACE = 4243
+
+
+def lock_tournament(session: Session, tournament_id: int) -> None:
+    """
+    Serialiseert schrijvers voor één toernooi tot het einde van de huidige transactie.
+    Postgres: transactie-gebonden advisory lock (alleen dit toernooi wacht).
+    SQLite: BEGIN IMMEDIATE; SQLite kent maar één schrijver, dus dit lockt de hele database.
+    Roep dit aan vóór de reads waarop de beslissing gebaseerd is.
+    """
+    conn = session.connection()
+    dialect = conn.dialect.name
+
+    if dialect == "postgresql":
+        conn.execute(
+            text("SELECT pg_advisory_xact_lock(:namespace, :key)"),
+            {"namespace": TOURNAMENT_LOCK_NAMESPACE, "key": tournament_id}
+        )
+    elif dialect == "sqlite":
+        # Heeft deze transactie al geschreven, dan hebben we de write lock al
+        if not conn.connection.driver_connection.in_transaction:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def lock_ratings(session: Session) -> None:
+    """
+    Serialiseert schrijvers van de ratingtabel tot het einde van de huidige transactie.
+    Zelfde opzet als lock_tournament, met één vaste sleutel.
+    """
+    conn = session.connection()
+    dialect = conn.dialect.name
+
+    if dialect == "postgresql":
+        conn.execute(
+            text("SELECT pg_advisory_xact_lock(:namespace, :key)"),
+            {"namespace": RATING_LOCK_NAMESPACE, "key": 0}
+        )
+    elif dialect == "sqlite":
+        if not conn.connection.driver_connection.in_transaction:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
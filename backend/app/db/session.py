@@ -1,3 +1,4 @@
+from sqlalchemy import inspect, text
 from sqlmodel import SQLModel, create_engine, Session
 from app.core.config import settings
 
@@ -17,9 +18,40 @@ def init_db():
     """
     # Import ALL models here so SQLModel knows about them before creating tables
     # --- FIX: Added 'dartboard' and 'links' to this list ---
-    from app.models import user, player, tournament, match, dartboard, links, team, scorer_auth # noqa: F401
+    from app.models import user, player, tournament, match, dartboard, links, team, scorer_auth, archive, outbox, timing, swiss, rating # noqa: F401
+    # Registreert de flush-hooks: wedstrijdwijzigingen stempelen (delta sync) en outbox events
+    from app.services import change_feed, outbox as outbox_service # noqa: F401
     
     SQLModel.metadata.create_all(engine)
+    add_missing_columns()
+
+def add_missing_columns():
+    """
+    create_all maakt alleen nieuwe tabellen aan. Kolommen die later aan een model
+    zijn toegevoegd, voegen we hier toe aan bestaande tabellen (met de Python default),
+    net als ontbrekende indexes.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+                default = column.default.arg if column.default is not None and column.default.is_scalar else None
+                if default is not None:
+                    ddl += f" DEFAULT {str(default).upper() if isinstance(default, bool) else repr(default)}"
+                conn.execute(text(ddl))
+
+            # Ook nieuwe indexes op bestaande tabellen aanmaken
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
 
 def get_session():
     """
@@ -5,9 +5,11 @@ from fastapi.middleware.cors import CORSMiddleware
 # Import core settings and database logic
 from app.core.config import settings
 from app.db.session import init_db
+from app.services.score_writer import score_writer
+from app.services.outbox import outbox_worker
 
 # Import API route modules
-from app.api import auth, users, players, tournaments, matches, dartboards, teams, system, scorer
+from app.api import auth, users, players, tournaments, matches, dartboards, teams, system, scorer, live
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -17,11 +19,16 @@ async def lifespan(app: FastAPI):
     # --- Startup ---
     print("Starting up Dart Tournament Manager...")
     init_db()
+    outbox_worker.start()
+    if settings.SCORE_WRITE_QUEUE:
+        score_writer.start(settings.SCORE_WRITE_BATCH_SIZE, settings.SCORE_WRITE_BATCH_WAIT_MS)
     
     yield
     
     # --- Shutdown ---
     print("Shutting down...")
+    score_writer.stop()
+    outbox_worker.stop()
 
 app = FastAPI(
     title="Dart Tournament Manager API",
@@ -58,6 +65,9 @@ app.include_router(system.router, prefix="/api/system", tags=["system"])
 app.include_router(dartboards.router, prefix="/api/dartboards", tags=["Dartboards"])
 app.include_router(scorer.router, prefix="/api/scorer", tags=["Scorer"])
 
+# --- WebSockets (nginx: /api/ws/ -> /ws/) ---
+app.include_router(live.router, prefix="/ws", tags=["Live"])
+
 # --- Root Endpoint (Health Check) ---
 @app.get("/")
 def read_root():
@@ -0,0 +1,12 @@
+from datetime import datetime
+from sqlmodel import SQLModel, Field, Column, LargeBinary
+
+class TournamentArchive(SQLModel, table=True):
+    # Eén archief per toernooi; de Tournament rij zelf blijft bestaan (status "archived")
+    tournament_id: int = Field(foreign_key="tournament.id", primary_key=True)
+    archived_at: datetime = Field(default_factory=datetime.utcnow)
+
+    match_count: int = 0
+
+    # zlib-gecomprimeerde JSON met toernooi, wedstrijden, standen en teams
+    payload: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
@@ -1,14 +1,32 @@
 from typing import Optional
+from datetime import datetime
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
+from sqlalchemy.orm import declared_attr
 from pydantic import BaseModel
 
 class Match(SQLModel, table=True):
+    # Elke plek in de knockout boom bestaat maar één keer per ronde, ook als twee
+    # requests tegelijk dezelfde ronde proberen aan te maken (poule wedstrijden hebben geen slot)
+    __table_args__ = (
+        Index("ix_match_bracket_slot", "tournament_id", "round_number", "bracket_slot", unique=True),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     
     # --- Structure info ---
     round_number: int 
     poule_number: Optional[int] = None # Als dit ingevuld is, is het een groepswedstrijd
     board_number: Optional[int] = None 
+    bracket_slot: Optional[int] = None # Positie in de KO ronde (0 = bovenaan het schema)
+
+    # --- Double elimination ---
+    # bracket: "W" (winners), "L" (losers) of "GF" (grand final); leeg voor de gewone KO.
+    # winner_to/loser_to: bestemming als bracket_slot * 2 + kant (0 = speler 1, 1 = speler 2);
+    # bij double elimination is bracket_slot uniek binnen het hele toernooi.
+    bracket: Optional[str] = None
+    winner_to: Optional[int] = None
+    loser_to: Optional[int] = None
     
     # --- Game Settings ---
     best_of_legs: int = Field(default=5) # Bijv. "5" (betekent first to 3)
@@ -63,11 +81,41 @@ class Match(SQLModel, table=True):
 
     custom_referee_name: Optional[str] = None
 
+    # --- Timing (UTC) ---
+    # called_at: wedstrijd verschijnt als actieve wedstrijd op de tablet van het bord
+    # started_at: eerste pijl (tablet meldt de start) of anders de eerste score-update
+    # completed_at: score bereikt de winnende stand (weer leeg als de uitslag heropend wordt)
+    called_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+    # --- Delta sync ---
+    # Volgnummer (Tournament.change_seq) van de laatste wijziging aan deze rij
+    change_seq: int = Field(default=0, index=True)
+
+    # --- Optimistic concurrency ---
+    # Elke ORM-update wordt 'UPDATE ... WHERE id=? AND version=?'; faalt dat, dan
+    # heeft iemand anders de wedstrijd intussen gewijzigd (StaleDataError -> 409).
+    # Set-based UPDATE statements verhogen de versie zelf.
+    version: int = Field(default=1, nullable=False)
+
+    @declared_attr
+    def __mapper_args__(cls):
+        return {"version_id_col": cls.__table__.c.version}
+
+class MatchTombstone(SQLModel, table=True):
+    """Markeert een verwijderde wedstrijd, zodat delta-clients hem ook kunnen weghalen."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    tournament_id: int = Field(foreign_key="tournament.id", index=True)
+    match_id: int
+    change_seq: int = Field(default=0, index=True)
+
 class MatchDetail(BaseModel):
     id: int
     score_p1: int
     score_p2: int
     is_completed: bool
+    version: int = 1
     
     player1_name: str
     player2_name: str
@@ -0,0 +1,24 @@
+from typing import Optional
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+
+class OutboxEvent(SQLModel, table=True):
+    """
+    Transactionele outbox: wordt in dezelfde commit als de wijziging geschreven
+    en daarna door de achtergrond-worker verwerkt (bijv. knockout progressie).
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    tournament_id: int = Field(foreign_key="tournament.id", index=True)
+    event_type: str # Bijv. "match_completed"
+
+    match_id: Optional[int] = None
+    round_number: Optional[int] = None
+    poule_number: Optional[int] = None
+
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    available_at: datetime = Field(default_factory=datetime.utcnow, index=True) # Later bij een retry (backoff)
+    locked_until: Optional[datetime] = None # Claim van een worker; verloopt vanzelf als die crasht
+    processed_at: Optional[datetime] = Field(default=None, index=True)
+
+    attempts: int = 0
+    last_error: Optional[str] = None
@@ -0,0 +1,56 @@
+from typing import Optional
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
+
+class Rating(SQLModel, table=True):
+    """
+    Glicko-achtige sterkte per speler of team, over alle toernooien heen.
+    Schaal zoals de simulatie hem gebruikt: 400 punten verschil = 10x zo grote kans op een leg.
+    """
+    __table_args__ = (
+        Index("ix_rating_entity", "entity_type", "entity_id", unique=True),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    entity_type: str # "player" of "team"
+    entity_id: int
+
+    rating: float = 1500.0
+    rd: float = 350.0 # Onzekerheid (rating deviation); daalt met elke gespeelde wedstrijd
+    matches: int = 0
+
+    # Laatst verwerkte outbox event: een herhaald event telt niet dubbel
+    last_event_id: Optional[int] = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class RatingApplication(SQLModel, table=True):
+    """
+    De ratingupdate die een live wedstrijd heeft toegepast: de waarden van beide kanten
+    ervoor en erna. Wordt de wedstrijd heropend of de uitslag gecorrigeerd, dan draait de
+    handler deze update eerst terug voordat de nieuwe uitslag telt.
+    """
+    __table_args__ = (
+        Index("ix_ratingapplication_match", "match_id", unique=True),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    match_id: int
+    tournament_id: int = Field(index=True)
+    entity_type: str
+    side_a_id: int
+    side_b_id: int
+
+    rating_a_before: float
+    rd_a_before: float
+    rating_b_before: float
+    rd_b_before: float
+    rating_a_after: float
+    rd_a_after: float
+    rating_b_after: float
+    rd_b_after: float
+
+    # Outbox event dat deze update schreef: een herhaald event telt niet dubbel
+    event_id: Optional[int] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
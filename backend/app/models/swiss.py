@@ -0,0 +1,36 @@
+from typing import Optional
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
+
+class SwissStanding(SQLModel, table=True):
+    """
+    Tie-break tabel van een Swiss toernooi (één rij per deelnemer).
+    Wordt per afgeronde ronde bijgewerkt met alleen de wedstrijden van die ronde,
+    dus een stand of een nieuwe indeling leest nooit alle wedstrijden opnieuw.
+    """
+    __table_args__ = (
+        Index("ix_swissstanding_entity", "tournament_id", "entity_id", unique=True),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    tournament_id: int = Field(foreign_key="tournament.id", index=True)
+    entity_id: int # Speler id (singles) of team id (doubles)
+    seed: int = 0 # Startvolgorde; breekt gelijke stand bij het indelen
+
+    points: int = 0 # 2 per winst, net als in de poules
+    wins: int = 0
+    legs_won: int = 0
+    legs_lost: int = 0
+
+    # Tie-breaks (na elke ronde opnieuw uit de tabel zelf berekend)
+    buchholz: int = 0 # Som van de punten van alle tegenstanders
+    sonneborn_berger: int = 0 # Som van de punten van verslagen tegenstanders
+
+    starts: int = 0 # Aantal keer als eerste aan de beurt (speler 1)
+    had_bye: bool = False
+
+    # Komma-gescheiden entity ids
+    opponents: str = ""
+    beaten: str = ""
+
+    rounds_played: int = 0 # Laatste ronde die in deze rij verwerkt is
@@ -0,0 +1,16 @@
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+
+class TournamentTimingStats(SQLModel, table=True):
+    """
+    Opgetelde tijdsstatistieken van één toernooi (zie services/match_analytics).
+    Alleen optelbare waarden, zodat een seizoensrapport de rijen kan optellen
+    zonder alle wedstrijden opnieuw te lezen.
+    """
+    tournament_id: int = Field(foreign_key="tournament.id", primary_key=True)
+    # Tournament.change_seq waarop de cijfers berekend zijn; wijkt die af, dan opnieuw berekenen
+    seq: int = 0
+    computed_at: datetime = Field(default_factory=datetime.utcnow)
+
+    # JSON met de aggregaten per bord, per best-of en per deelnemer
+    payload: str = "{}"
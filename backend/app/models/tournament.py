@@ -9,9 +9,12 @@ class Tournament(SQLModel, table=True):
     
     name: str = Field(default_factory=lambda: f"Toernooi {datetime.now().strftime('%Y-%m-%d')}")
     date: str 
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
     status: str = Field(default="draft") # draft, active, knockout_ready, finished
     
+    # Loopt op bij elke wijziging aan de wedstrijden (delta sync)
+    change_seq: int = Field(default=0)
+    
     # --- Format Settings ---
     mode: str = Field(default="singles") # "singles" of "doubles"
     format: str = Field(default="hybrid") 
@@ -22,6 +25,12 @@ class Tournament(SQLModel, table=True):
     qualifiers_per_poule: int = Field(default=2) 
 
     allow_byes: bool = Field(default=True)
+
+    # Plaatsing: "random" (loting) of "rating" (slangverdeling over de poules, KO op rating)
+    seeding: str = Field(default="random")
+
+    # Alleen voor format "swiss": aantal ronden (leeg = log2 van het aantal deelnemers)
+    swiss_rounds: Optional[int] = Field(default=None)
     
     # --- Game Settings (Best of X) ---
     starting_legs_group: int = Field(default=3) 
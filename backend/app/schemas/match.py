@@ -1,4 +1,5 @@
 from typing import Optional
+from datetime import datetime
 from pydantic import BaseModel
 
 class MatchScoreUpdate(BaseModel):
@@ -8,6 +9,8 @@ class MatchScoreUpdate(BaseModel):
     referee_id: Optional[int] = None
     referee_team_id: Optional[int] = None
     custom_referee_name: Optional[str] = None
+    # Laatst geziene versie; bij een andere versie op de server volgt een 409
+    version: Optional[int] = None
 
 class MatchRead(BaseModel):
     id: int
@@ -16,6 +19,7 @@ class MatchRead(BaseModel):
     
     poule_number: Optional[int] = None 
     board_number: Optional[int] = None  
+    bracket: Optional[str] = None # Alleen bij double elimination: W, L of GF
     best_of_legs: Optional[int] = 5
     best_of_sets: Optional[int] = 1
 
@@ -31,6 +35,28 @@ class MatchRead(BaseModel):
     score_p1: int
     score_p2: int
     is_completed: bool
+    change_seq: int = 0
+    version: int = 1
+
+    called_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class NextMatchRead(BaseModel):
+    tournament_id: int
+    entity_type: str # "player" of "team"
+    entity_id: int
+
+    match_id: int
+    round_number: int
+    poule_number: Optional[int] = None
+    player1_name: Optional[str] = "Bye"
+    player2_name: Optional[str] = "Bye"
+
+    board_number: Optional[int] = None
+    queue_position: Optional[int] = None # 0 = nu aan de beurt op dit bord
+    matches_ahead: Optional[int] = None
+    estimated_start: Optional[datetime] = None
@@ -33,4 +33,10 @@ class PlayerUpdate(BaseModel):
     def empty_to_none(cls, v):
         if v == "":
             return None
-        return v
\ No newline at end of file
+        return v
+class PlayerRatingRead(BaseModel):
+    player_id: int
+    name: str
+    rating: float
+    rd: float # Onzekerheid; hoog = nog weinig wedstrijden
+    matches: int
@@ -1,5 +1,5 @@
 # FILE: backend/app/schemas/tournament.py
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 from app.schemas.player import PlayerRead
@@ -18,6 +18,8 @@ class TournamentCreate(BaseModel):
     starting_legs_group: int = 3
     starting_legs_ko: int = 5
     sets_per_match: int = 1
+    swiss_rounds: Optional[int] = None # Alleen voor format "swiss"
+    seeding: str = "random" # "random" of "rating"
     
     # IDs voor relaties
     player_ids: List[int]
@@ -43,11 +45,14 @@ class TournamentRead(BaseModel):
     created_at: datetime
     public_uuid: str
     scorer_uuid: str
+    change_seq: int = 0
     
     # Settings terugsturen
     qualifiers_per_poule: int = 2
     starting_legs_group: int = 3
     starting_legs_ko: int = 5
+    swiss_rounds: Optional[int] = None
+    seeding: str = "random"
     
     # Counts
     player_count: int = 0
@@ -58,17 +63,35 @@ class TournamentRead(BaseModel):
     class Config:
         from_attributes = True
 
+# --- Kwaliteit van het gegenereerde schema ---
+class ScheduleQuality(BaseModel):
+    min_rest: Optional[int] = None # Minste aantal wedstrijd-slots rust tussen twee eigen wedstrijden
+    avg_rest: Optional[float] = None
+    back_to_back: int = 0 # Keren dat iemand direct weer moet spelen
+    clashes: int = 0 # Iemand tegelijk op twee borden ingepland
+    referee_spread: int = 0 # Grootste verschil in schrijfbeurten binnen een poule
+    referee_clashes: int = 0 # Schrijver is in hetzelfde slot zelf bezig
+    baseline_min_rest: Optional[int] = None # Zelfde maten voor de volgorde zonder optimalisatie
+    baseline_back_to_back: Optional[int] = None
+    baseline_referee_clashes: Optional[int] = None
+    elapsed_ms: Optional[float] = None
+
+class TournamentCreated(TournamentRead):
+    schedule_quality: Optional[ScheduleQuality] = None
+
 # --- Detailed View (Public Page) ---
 class MatchReadSimple(BaseModel):
     id: int
     round_number: int
     poule_number: Optional[int] = None
+    bracket: Optional[str] = None # Double elimination: W, L of GF
     player1_name: Optional[str] = None
     player2_name: Optional[str] = None
     score_p1: int
     score_p2: int
     is_completed: bool
     referee_name: Optional[str] = None
+    change_seq: int = 0
 
 class TournamentReadWithMatches(TournamentRead):
     matches: List[MatchReadSimple] = []
@@ -81,4 +104,117 @@ class SwapRequest(BaseModel):
 class SwapMatchRequest(BaseModel):
     """Gebruikt voor het wisselen van volledige wedstrijden"""
     match_id_1: int
-    match_id_2: int
\ No newline at end of file
+    match_id_2: int
+# --- Kansen (Monte Carlo) ---
+class ParticipantOdds(BaseModel):
+    entity_id: int
+    name: str
+    poule_number: Optional[int] = None
+    qualified: float # Kans om de KO te halen
+    title: float # Kans op toernooiwinst
+    positions: List[float] = [] # Kans op elke eindpositie in de poule (index 0 = nummer 1)
+
+class TournamentOdds(BaseModel):
+    tournament_id: int
+    seq: int
+    simulations: int
+    participants: List[ParticipantOdds] = []
+
+# --- Kwalificatie scenario's (exact) ---
+class PouleScenario(BaseModel):
+    entity_id: int
+    name: str
+    points: int
+    open_matches: int
+    status: str # qualified | eliminated | open
+    min_wins: Optional[int] = None # Minimaal aantal zeges om nog door te kunnen
+    clinch_wins: Optional[int] = None # Zoveel zeges en je bent zeker door (None = afhankelijk van anderen)
+    clinch_against: List[List[int]] = [] # Minimale sets tegenstanders (ids) die je moet verslaan
+
+# --- Swiss stand ---
+class SwissStandingRead(BaseModel):
+    rank: int
+    entity_id: int
+    name: str
+    points: int
+    wins: int
+    legs_won: int
+    legs_lost: int
+    buchholz: int
+    sonneborn_berger: int
+    rounds_played: int
+    had_bye: bool = False
+
+# --- Duurschatting (discrete-event simulatie) ---
+class BoardUsage(BaseModel):
+    board_number: int
+    utilization: float # Fractie van de tijd dat er gespeeld wordt
+    idle_minutes: float
+    matches: float # Gemiddeld aantal wedstrijden op dit bord
+
+class DurationEstimate(BaseModel):
+    tournament_id: int
+    now: datetime
+    replications: int
+    matches_remaining: int
+    finish: Dict[str, datetime] # p10 / p50 / p90 / mean
+    finish_minutes: Dict[str, float]
+    poules_finish: Optional[datetime] = None
+    boards: List[BoardUsage] = []
+
+# --- Planner (welk format past in het tijdslot?) ---
+class PlanRequest(BaseModel):
+    player_count: int
+    mode: str = "singles" # Bij doubles wordt het aantal teams de helft van het aantal spelers
+    boards: int
+    time_budget_minutes: int
+    minutes_per_leg: Optional[float] = None
+    limit: int = 10
+
+class FormatOption(BaseModel):
+    number_of_poules: int
+    qualifiers_per_poule: int
+    starting_legs_group: int
+    starting_legs_ko: int
+    poule_sizes: List[int]
+    knockout_size: int
+    expected_minutes: float
+    p90_minutes: Optional[float] = None # Alleen als het format is nagesimuleerd
+    poule_phase_minutes: float
+    utilization: float
+    legs_per_participant: float
+    simulated: bool
+    fits: bool
+
+# --- Timing analytics (bezetting, wedstrijdduur, wachttijd) ---
+class BoardTiming(BaseModel):
+    board_number: int
+    matches: int
+    busy_minutes: float
+    span_minutes: float # Eerste start tot laatste einde op dit bord
+    idle_minutes: float
+    utilization: float
+
+class BestOfTiming(BaseModel):
+    best_of_legs: int
+    matches: int
+    avg_minutes: float
+    std_minutes: float
+    avg_leg_minutes: Optional[float] = None
+
+class WaitingTime(BaseModel):
+    entity_type: str # "player" of "team"
+    entity_id: int
+    name: Optional[str] = None
+    waits: int # Aantal pauzes tussen twee eigen wedstrijden
+    avg_minutes: float
+    max_minutes: float
+
+class TimingReport(BaseModel):
+    tournament_ids: List[int]
+    matches: int
+    timed_matches: int # Afgerond én met start- en eindtijd
+    boards: List[BoardTiming] = []
+    best_of: List[BestOfTiming] = []
+    call_to_start_minutes: Optional[float] = None
+    waiting: List[WaitingTime] = []
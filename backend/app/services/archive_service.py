@@ -0,0 +1,76 @@
+import json
+import zlib
+from typing import Any, Dict, Optional
+from sqlmodel import Session
+from sqlalchemy import delete
+
+from app.models.archive import TournamentArchive
+from app.models.match import Match, MatchTombstone
+from app.models.rating import RatingApplication
+from app.models.scorer_auth import ScorerAccessCode
+from app.models.tournament import Tournament
+from app.services.change_feed import bump_change_seq
+
+ARCHIVED_STATUS = "archived"
+
+
+def compress_payload(data: Dict[str, Any]) -> bytes:
+    """JSON -> zlib. Datetimes e.d. worden als string opgeslagen."""
+    raw = json.dumps(data, default=str, separators=(",", ":")).encode("utf-8")
+    return zlib.compress(raw, level=9)
+
+
+def decompress_payload(blob: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def archive_tournament(session: Session, tournament: Tournament, payload: Dict[str, Any]) -> TournamentArchive:
+    """
+    Slaat de (publieke) snapshot van een afgerond toernooi gecomprimeerd op
+    en verwijdert daarna de 'hete' rijen (wedstrijden, tombstones en scorer codes).
+    Alles gebeurt in één transactie.
+    """
+    archive = TournamentArchive(
+        tournament_id=tournament.id,
+        match_count=len(payload.get("tournament", {}).get("matches", [])),
+        payload=compress_payload(payload)
+    )
+    session.merge(archive)
+
+    session.exec(
+        delete(Match)
+        .where(Match.tournament_id == tournament.id)
+        .execution_options(synchronize_session=False)
+    )
+    session.exec(
+        delete(MatchTombstone)
+        .where(MatchTombstone.tournament_id == tournament.id)
+        .execution_options(synchronize_session=False)
+    )
+    session.exec(
+        delete(ScorerAccessCode)
+        .where(ScorerAccessCode.tournament_id == tournament.id)
+        .execution_options(synchronize_session=False)
+    )
+    # De ratings blijven staan; zonder live wedstrijden valt er niets meer terug te draaien
+    session.exec(
+        delete(RatingApplication)
+        .where(RatingApplication.tournament_id == tournament.id)
+        .execution_options(synchronize_session=False)
+    )
+
+    # Delta-clients moeten na archivering opnieuw de volledige lijst ophalen
+    bump_change_seq(session, tournament.id)
+    tournament.status = ARCHIVED_STATUS
+    session.add(tournament)
+    session.commit()
+    session.refresh(tournament)
+    return archive
+
+
+def load_archive(session: Session, tournament_id: int) -> Optional[Dict[str, Any]]:
+    """Geeft de uitgepakte snapshot terug, of None als er geen archief is."""
+    archive = session.get(TournamentArchive, tournament_id)
+    if not archive:
+        return None
+    return decompress_payload(archive.payload)
@@ -0,0 +1,205 @@
+import logging
+from typing import Any, Callable, Dict, List, Tuple
+from sqlalchemy import event, insert, literal, select as sa_select, update
+from sqlmodel import Session, select
+
+from app.models.match import Match, MatchTombstone
+from app.models.tournament import Tournament
+from app.services.live_hub import live_hub
+
+logger = logging.getLogger("dart_app")
+
+# ==========================================
+# DELTA SYNC: VOLGNUMMERS PER TOERNOOI
+# ==========================================
+# Elk toernooi heeft een oplopend 'change_seq'. Elke wijziging aan een Match
+# krijgt het nieuwe volgnummer mee; verwijderde wedstrijden krijgen een tombstone.
+# ORM-wijzigingen worden automatisch gestempeld (before_flush hook hieronder),
+# set-based UPDATE/DELETE statements roepen bump_change_seq zelf aan.
+# Na de commit gaat er per toernooi één compact event naar de LiveHub (websockets).
+
+# Header met het huidige volgnummer bij volledige lijsten (startpunt voor '?since=')
+CHANGE_SEQ_HEADER = "X-Change-Seq"
+
+
+def bump_change_seq(session: Session, tournament_id: int, partial: bool = True) -> int:
+    """
+    Verhoogt het volgnummer van het toernooi en geeft de nieuwe waarde terug.
+    'partial' betekent dat het live event niet alle wijzigingen bevat (set-based statements),
+    live clients halen dan zelf de delta op.
+    """
+    conn = session.connection()
+    conn.execute(
+        update(Tournament.__table__)
+        .where(Tournament.__table__.c.id == tournament_id)
+        .values(change_seq=Tournament.__table__.c.change_seq + 1)
+    )
+    seq = conn.execute(
+        sa_select(Tournament.__table__.c.change_seq).where(Tournament.__table__.c.id == tournament_id)
+    ).scalar() or 0
+
+    # Onthouden voor het live event dat na de commit verstuurd wordt
+    pending = _live_events(session).setdefault(
+        tournament_id, {"first_seq": seq, "seq": seq, "partial": False, "matches": {}, "deleted": set()}
+    )
+    pending["seq"] = seq
+    pending["partial"] = pending["partial"] or partial
+    return seq
+
+
+def tombstone_matches(session: Session, seq: int, *criteria) -> None:
+    """Schrijft tombstones voor alle wedstrijden die aan 'criteria' voldoen (vóór een bulk DELETE)."""
+    session.connection().execute(
+        insert(MatchTombstone.__table__).from_select(
+            ["tournament_id", "match_id", "change_seq"],
+            sa_select(Match.__table__.c.tournament_id, Match.__table__.c.id, literal(seq)).where(*criteria)
+        )
+    )
+
+
+def current_seq(session: Session, tournament_id: int) -> int:
+    return session.exec(select(Tournament.change_seq).where(Tournament.id == tournament_id)).first() or 0
+
+
+def get_changes(session: Session, tournament_id: int, since: int, *options) -> Tuple[int, List[Match], List[int]]:
+    """
+    Geeft (huidig volgnummer, gewijzigde wedstrijden, verwijderde match ids) sinds 'since'.
+    Ids die verwijderd én opnieuw aangemaakt zijn, staan alleen bij de wedstrijden.
+    'options' zijn loader options (bijv. selectinload) voor de wedstrijden.
+    """
+    seq = current_seq(session, tournament_id)
+
+    changed = session.exec(
+        select(Match)
+        .where(Match.tournament_id == tournament_id)
+        .where(Match.change_seq > since)
+        .options(*options)
+        .order_by(Match.id)
+    ).all()
+
+    changed_ids = {m.id for m in changed}
+    deleted = session.exec(
+        select(MatchTombstone.match_id)
+        .where(MatchTombstone.tournament_id == tournament_id)
+        .where(MatchTombstone.change_seq > since)
+        .distinct()
+    ).all()
+
+    return seq, changed, sorted(mid for mid in deleted if mid not in changed_ids)
+
+
+def build_delta(
+    session: Session,
+    tournament_id: int,
+    since: int,
+    formatter: Callable[[List[Match]], List[Dict[str, Any]]],
+    *options
+) -> Dict[str, Any]:
+    """
+    Response voor '?since=<seq>'. Clients verwerken eerst 'deleted', daarna 'matches'.
+    'reset' betekent: gooi je lokale lijst weg en haal alles opnieuw op
+    (bijv. als de client een hoger volgnummer heeft dan de server).
+    """
+    seq, changed, deleted = get_changes(session, tournament_id, since, *options)
+    if since > seq:
+        return {"seq": seq, "reset": True, "matches": [], "deleted": []}
+    return {"seq": seq, "reset": False, "matches": formatter(changed), "deleted": deleted}
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_match_changes(session: Session, flush_context, instances) -> None:
+    """Stempelt nieuwe/gewijzigde wedstrijden en maakt tombstones voor verwijderde."""
+    touched: Dict[int, List[Match]] = {}
+    removed: Dict[int, List[Match]] = {}
+
+    for obj in session.new:
+        if isinstance(obj, Match) and obj.tournament_id is not None:
+            touched.setdefault(obj.tournament_id, []).append(obj)
+
+    for obj in session.dirty:
+        if isinstance(obj, Match) and obj.tournament_id is not None and session.is_modified(obj):
+            touched.setdefault(obj.tournament_id, []).append(obj)
+
+    for obj in session.deleted:
+        if isinstance(obj, Match) and obj.tournament_id is not None:
+            removed.setdefault(obj.tournament_id, []).append(obj)
+
+    for t_id in set(touched) | set(removed):
+        # Nieuwe wedstrijden hebben namen nodig die niet in het compacte event zitten
+        has_new = any(m in session.new for m in touched.get(t_id, []))
+        seq = bump_change_seq(session, t_id, partial=has_new)
+        for m in touched.get(t_id, []):
+            m.change_seq = seq
+        for m in removed.get(t_id, []):
+            session.add(MatchTombstone(tournament_id=t_id, match_id=m.id, change_seq=seq))
+            _live_events(session)[t_id]["deleted"].add(m.id)
+
+    # Na de flush (ids bekend) zetten we deze om naar compacte dicts
+    session.info.setdefault(_LIVE_FLUSHED_KEY, []).extend(m for ms in touched.values() for m in ms)
+
+
+# ==========================================
+# LIVE EVENTS (na commit naar de LiveHub)
+# ==========================================
+
+_LIVE_EVENTS_KEY = "live_events"
+_LIVE_FLUSHED_KEY = "live_flushed_matches"
+
+# Velden die in het compacte live event meegaan
+LIVE_MATCH_FIELDS = (
+    "id", "round_number", "poule_number", "board_number", "best_of_legs",
+    "score_p1", "score_p2", "is_completed",
+    "player1_id", "player2_id", "team1_id", "team2_id", "version",
+)
+
+
+def _live_events(session: Session) -> Dict[int, Dict[str, Any]]:
+    return session.info.setdefault(_LIVE_EVENTS_KEY, {})
+
+
+def compact_match(m: Match) -> Dict[str, Any]:
+    return {field: getattr(m, field) for field in LIVE_MATCH_FIELDS}
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_live_matches(session: Session, flush_context) -> None:
+    flushed = session.info.pop(_LIVE_FLUSHED_KEY, [])
+    events = _live_events(session)
+    for m in flushed:
+        if m.tournament_id in events:
+            events[m.tournament_id]["matches"][m.id] = compact_match(m)
+
+
+# Functies (tournament_id, event) die na elke commit met wijzigingen aangeroepen worden
+_commit_listeners: List[Callable[[int, Dict[str, Any]], None]] = [live_hub.publish]
+
+
+def register_commit_listener(listener: Callable[[int, Dict[str, Any]], None]) -> None:
+    if listener not in _commit_listeners:
+        _commit_listeners.append(listener)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_live_events(session: Session) -> None:
+    events = session.info.pop(_LIVE_EVENTS_KEY, {})
+    for t_id, pending in events.items():
+        change_event = {
+            "type": "changes",
+            "seq": pending["seq"],
+            "first_seq": pending["first_seq"], # Eén transactie kan meerdere volgnummers gebruiken
+            "partial": pending["partial"],
+            "matches": list(pending["matches"].values()),
+            "deleted": sorted(pending["deleted"]),
+        }
+        for listener in _commit_listeners:
+            # Een fout in een listener mag de (al gecommitte) request niet laten falen
+            try:
+                listener(t_id, change_event)
+            except Exception:
+                logger.exception(f"Commit listener faalde voor toernooi {t_id}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_live_events(session: Session) -> None:
+    session.info.pop(_LIVE_EVENTS_KEY, None)
+    session.info.pop(_LIVE_FLUSHED_KEY, None)
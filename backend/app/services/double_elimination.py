@@ -0,0 +1,266 @@
+import functools
+from typing import Dict, List, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from app.models.match import Match
+from app.models.tournament import Tournament
+from app.services.seeding import bracket_size_for, seed_order
+
+# ==========================================
+# DOUBLE ELIMINATION
+# ==========================================
+# Per bracketgrootte (macht van 2) wordt één keer de volledige routeringstabel opgebouwd:
+# voor elke wedstrijd de plek (wedstrijd + kant) waar de winnaar en de verliezer heen gaan.
+#   - Winners bracket (W): rondes 1..k, zoals de gewone KO.
+#   - Losers bracket (L): 2(k-1) rondes. Oneven L-rondes spelen de overlevers onderling,
+#     even L-rondes krijgen de verliezers van de volgende W-ronde erbij (in omgekeerde
+#     volgorde, zodat een rematch uit dezelfde W-ronde zo laat mogelijk komt).
+#   - Grand final (GF): winnaar W tegen winnaar L (zonder 'bracket reset').
+#
+# Bij het aanmaken worden alle wedstrijden meteen in de database gezet. Byes (topseeds) worden
+# vooraf weggewerkt: wedstrijden met een bye-kant bestaan niet, hun route wordt doorgetrokken.
+# Elke wedstrijd kent zo zijn eigen bestemmingen (winner_to/loser_to) en de voortgang is per
+# uitslag één opzoeking plus één update.
+
+DOUBLE_ELIMINATION_FORMAT = "double_elimination"
+
+WINNERS = "W"
+LOSERS = "L"
+GRAND_FINAL = "GF"
+
+_BYE = "bye"
+
+
+def encode_target(slot: int, side: int) -> int:
+    """Bestemming als één getal: bracket_slot * 2 + kant (0 = speler 1, 1 = speler 2)."""
+    return slot * 2 + side
+
+
+def decode_target(target: int) -> Tuple[int, int]:
+    return target // 2, target % 2
+
+
+@functools.lru_cache(maxsize=None)
+def routing_table(bracket_size: int) -> Tuple[Tuple[str, int, Optional[int], Optional[int]], ...]:
+    """
+    Routering voor een volle bracket: per wedstrijd (in speelbare volgorde)
+    (bracket, ronde, winner_to, loser_to), met de bestemmingen als encode_target.
+    """
+    k = bracket_size.bit_length() - 1
+    if bracket_size < 2 or bracket_size != 1 << k:
+        raise ValueError("Bracketgrootte moet een macht van 2 zijn (minimaal 2)")
+
+    # Eerst alle wedstrijden nummeren: W-rondes, dan L-rondes, dan de grand final
+    index: Dict[Tuple[str, int, int], int] = {}
+    specs: List[List] = []
+
+    def add(bracket: str, round_number: int, position: int) -> None:
+        index[(bracket, round_number, position)] = len(specs)
+        specs.append([bracket, round_number, None, None])
+
+    for r in range(1, k + 1):
+        for i in range(bracket_size >> r):
+            add(WINNERS, r, i)
+    for lr in range(1, 2 * (k - 1) + 1):
+        for i in range(bracket_size >> ((lr + 1) // 2 + 1)):
+            add(LOSERS, lr, i)
+    add(GRAND_FINAL, 1, 0)
+    final = index[(GRAND_FINAL, 1, 0)]
+
+    # Winners bracket: winnaar naar de volgende W-ronde, de W-finale naar de grand final
+    for r in range(1, k + 1):
+        count = bracket_size >> r
+        for i in range(count):
+            slot = index[(WINNERS, r, i)]
+            if r < k:
+                specs[slot][2] = encode_target(index[(WINNERS, r + 1, i // 2)], i % 2)
+            else:
+                specs[slot][2] = encode_target(final, 0)
+
+            # Verliezer: W1 naar L1 (paarsgewijs), W(r) naar L-ronde 2(r-1) (tegen een L-overlever)
+            if k == 1:
+                specs[slot][3] = encode_target(final, 1)
+            elif r == 1:
+                specs[slot][3] = encode_target(index[(LOSERS, 1, i // 2)], i % 2)
+            else:
+                target = count - 1 - i if r % 2 == 0 else i
+                specs[slot][3] = encode_target(index[(LOSERS, 2 * (r - 1), target)], 1)
+
+    # Losers bracket: oneven ronde -> zelfde positie in de volgende (drop-in) ronde,
+    # even ronde -> paarsgewijs naar de volgende ronde, laatste ronde naar de grand final
+    last = 2 * (k - 1)
+    for lr in range(1, last + 1):
+        for i in range(bracket_size >> ((lr + 1) // 2 + 1)):
+            slot = index[(LOSERS, lr, i)]
+            if lr == last:
+                specs[slot][2] = encode_target(final, 1)
+            elif lr % 2:
+                specs[slot][2] = encode_target(index[(LOSERS, lr + 1, i)], 0)
+            else:
+                specs[slot][2] = encode_target(index[(LOSERS, lr + 1, i // 2)], i % 2)
+
+    return tuple(tuple(spec) for spec in specs)
+
+
+def _real(source: int, kind: int) -> Tuple[str, int, int]:
+    return ("real", source, kind) # kind 0 = winnaar, 1 = verliezer van wedstrijd 'source'
+
+
+@functools.lru_cache(maxsize=None)
+def bye_plan(entity_count: int) -> Tuple[Tuple, ...]:
+    """
+    Routering voor een veld van 'entity_count' deelnemers (seeds 0..n-1, byes voor de topseeds).
+    Per echte wedstrijd: (tabel-index, bracket, ronde, kant-1, kant-2, winner_to, loser_to).
+    Een kant is een seed (int) als die al bij het aanmaken vastligt, anders None.
+    Bestemmingen verwijzen naar de positie in deze lijst (encode_target).
+    """
+    bracket_size = bracket_size_for(entity_count)
+    table = routing_table(bracket_size)
+
+    # Wat staat er op elke kant: een seed, een bye, of het resultaat van een echte wedstrijd
+    sides: List[List] = [[None, None] for _ in table]
+    order = seed_order(bracket_size)
+    for pos, seed in enumerate(order):
+        sides[pos // 2][pos % 2] = seed if seed < entity_count else _BYE
+
+    real: List[int] = [] # Tabel-indexen van de echte wedstrijden
+    routes: Dict[int, List[Optional[Tuple[int, int]]]] = {} # Echte wedstrijd -> [winner_to, loser_to]
+
+    def deliver(value, target: Optional[int]) -> None:
+        if target is None:
+            return
+        slot, side = decode_target(target)
+        sides[slot][side] = value
+        if isinstance(value, tuple):
+            # Resultaat van een echte wedstrijd: die route wijst nu rechtstreeks hierheen
+            routes[value[1]][value[2]] = (slot, side)
+
+    for slot, (_, _, winner_to, loser_to) in enumerate(table):
+        a, b = sides[slot]
+        if a == _BYE or b == _BYE:
+            # Geen wedstrijd: de andere kant gaat door, de 'verliezer' is weer een bye
+            deliver(b if a == _BYE else a, winner_to)
+            deliver(_BYE, loser_to)
+            continue
+        real.append(slot)
+        routes[slot] = [None, None]
+        deliver(_real(slot, 0), winner_to)
+        deliver(_real(slot, 1), loser_to)
+
+    position = {slot: pos for pos, slot in enumerate(real)}
+    plan = []
+    for slot in real:
+        bracket, round_number, _, _ = table[slot]
+        a, b = sides[slot]
+        winner_to, loser_to = routes[slot]
+        plan.append((
+            slot,
+            bracket,
+            round_number,
+            a if isinstance(a, int) else None,
+            b if isinstance(b, int) else None,
+            encode_target(position[winner_to[0]], winner_to[1]) if winner_to else None,
+            encode_target(position[loser_to[0]], loser_to[1]) if loser_to else None,
+        ))
+    return tuple(plan)
+
+
+def display_round(bracket: str, round_number: int, bracket_size: int) -> int:
+    """Rondenummer in Match.round_number: W en L lopen parallel, de grand final komt erna."""
+    if bracket == GRAND_FINAL:
+        k = bracket_size.bit_length() - 1
+        return max(k, 2 * (k - 1)) + 1
+    return round_number
+
+
+def generate_double_elimination(session: Session, tournament: Tournament, entity_ids: List[int]) -> List[Match]:
+    """
+    Zet de volledige double elimination bracket in de database.
+    entity_ids staat op volgorde van plaatsing (seed 1 eerst).
+    """
+    is_doubles = tournament.mode == "doubles"
+    n = len(entity_ids)
+    bracket_size = bracket_size_for(n)
+
+    matches = []
+    for pos, (_, bracket, round_number, seed_a, seed_b, winner_to, loser_to) in enumerate(bye_plan(n)):
+        legs = tournament.starting_legs_ko
+        match = Match(
+            tournament_id=tournament.id,
+            round_number=display_round(bracket, round_number, bracket_size),
+            poule_number=None,
+            bracket_slot=pos,
+            bracket=bracket,
+            winner_to=winner_to,
+            loser_to=loser_to,
+            best_of_legs=legs,
+            best_of_sets=tournament.sets_per_match,
+            is_completed=False,
+            score_p1=0, score_p2=0
+        )
+        a = entity_ids[seed_a] if seed_a is not None else None
+        b = entity_ids[seed_b] if seed_b is not None else None
+        if is_doubles:
+            match.team1_id, match.team2_id = a, b
+        else:
+            match.player1_id, match.player2_id = a, b
+        matches.append(match)
+
+    session.add_all(matches)
+    session.commit()
+    return matches
+
+
+def _place(session: Session, tournament: Tournament, target: Optional[int], entity_id: Optional[int]) -> None:
+    if target is None:
+        return
+    slot, side = decode_target(target)
+    destination = session.exec(
+        select(Match)
+        .where(Match.tournament_id == tournament.id)
+        .where(Match.poule_number == None)
+        .where(Match.bracket_slot == slot)
+        .where(Match.bracket != None)
+    ).first()
+    if destination is None or destination.is_completed:
+        return # Vervolgwedstrijd is al gespeeld; een late correctie verandert die niet meer
+    field = ("team1_id", "team2_id")[side] if tournament.mode == "doubles" else ("player1_id", "player2_id")[side]
+    if getattr(destination, field) != entity_id:
+        setattr(destination, field, entity_id)
+        session.add(destination)
+
+
+def route_result(session: Session, tournament: Tournament, match: Match) -> None:
+    """Winnaar en verliezer van een afgeronde wedstrijd naar hun volgende wedstrijd (commit niet)."""
+    if not match.is_completed or match.score_p1 == match.score_p2:
+        return
+    if tournament.mode == "doubles":
+        first, second = match.team1_id, match.team2_id
+    else:
+        first, second = match.player1_id, match.player2_id
+    winner, loser = (first, second) if match.score_p1 > match.score_p2 else (second, first)
+    _place(session, tournament, match.winner_to, winner)
+    _place(session, tournament, match.loser_to, loser)
+
+
+def advance_double_elimination(session: Session, tournament: Tournament, current_round: int, match_id: Optional[int] = None) -> None:
+    """
+    Progressie (aangeroepen door check_and_advance_knockout, binnen de toernooi-lock).
+    Met een match_id alleen die uitslag; anders alle afgeronde wedstrijden van de ronde.
+    Opnieuw routeren zet dezelfde speler op dezelfde plek, dus herhalen is veilig.
+    """
+    statement = (
+        select(Match)
+        .where(Match.tournament_id == tournament.id)
+        .where(Match.poule_number == None)
+        .execution_options(populate_existing=True)
+    )
+    if match_id is not None:
+        statement = statement.where(Match.id == match_id)
+    else:
+        statement = statement.where(Match.round_number == current_round)
+
+    for match in session.exec(statement).all():
+        route_result(session, tournament, match)
+    session.commit()
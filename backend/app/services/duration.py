@@ -0,0 +1,316 @@
+import heapq
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.match import Match
+from app.models.tournament import Tournament
+from app.services.schedule_index import MINUTES_PER_LEG
+from app.services.simulation import score_distribution
+
+# ==========================================
+# DISCRETE-EVENT SIMULATIE: EINDTIJD EN BORDBEZETTING
+# ==========================================
+# Speelt het schema een paar honderd keer na met willekeurige legduren. Een wedstrijd
+# start pas als het bord vrij is, beide deelnemers vrij zijn en de scheidsrechter
+# (ook een deelnemer) niet zelf speelt of schrijft. Elk bord volgt zijn eigen wachtrij
+# (op id, zoals de scorer tablets), met een klein beetje vrijheid om een wedstrijd
+# waarvan de spelers nog bezig zijn over te slaan. Wedstrijden zonder bord gaan naar
+# het eerste vrije bord.
+#
+# Na de poules volgt de KO zoals generate_knockout_bracket die maakt: eerst alle
+# poules klaar, daarna ronde voor ronde (check_and_advance_knockout wacht op de hele
+# ronde). Halverwege het toernooi draait de simulatie vanaf de live stand: voltooide
+# wedstrijden tellen niet meer, lopende wedstrijden gaan verder vanaf de huidige stand.
+# Een round robin (één competitie, zonder poulenummer) is één poulefase zonder KO.
+
+DEFAULT_REPLICATIONS = 300
+MAX_REPLICATIONS = 2000
+
+# Spreiding van de legduur (standaarddeviatie / gemiddelde), lognormaal verdeeld
+DEFAULT_LEG_CV = 0.35
+# Wisselen van spelers, scheidsrechter en scorebord tussen twee wedstrijden
+DEFAULT_CHANGEOVER_MINUTES = 1.0
+# Hoeveel wedstrijden een bord vooruit mag kijken als de volgende spelers nog bezig zijn
+BOARD_LOOKAHEAD = 3
+
+ROUND_ROBIN_FORMAT = "round_robin"
+
+
+def _participants(match: Match, is_doubles: bool) -> Tuple[Optional[int], Optional[int]]:
+    return (match.team1_id, match.team2_id) if is_doubles else (match.player1_id, match.player2_id)
+
+
+class _SimMatch:
+    """Een (echte of nog te genereren) wedstrijd, met alles wat de simulatie nodig heeft."""
+
+    def __init__(self, key: Any, phase: int, board: Optional[int], people: List[int],
+                 leg_counts: List[int], leg_weights: List[float], in_progress: bool = False):
+        self.key = key
+        self.phase = phase # 0 = poules, daarna 1, 2, ... voor de KO rondes
+        self.board = board
+        self.people = people # Spelers/teams en scheidsrechter die vrij moeten zijn
+        self.leg_counts = leg_counts # Mogelijk aantal nog te spelen legs ...
+        self.leg_weights = leg_weights # ... met bijbehorende kans
+        self.in_progress = in_progress
+
+
+def _remaining_legs(best_of_legs: Optional[int], score_1: int = 0, score_2: int = 0) -> Tuple[List[int], List[float]]:
+    """Verdeling van het aantal nog te spelen legs (gelijk opgaande spelers)."""
+    probs, legs_1, legs_2 = score_distribution(0.5, best_of_legs, score_1, score_2)
+    counts: Dict[int, float] = {}
+    for p, l_1, l_2 in zip(probs, legs_1, legs_2):
+        left = int(l_1 + l_2) - score_1 - score_2
+        counts[left] = counts.get(left, 0.0) + float(p)
+    return list(counts), list(counts.values())
+
+
+class DurationSimulator:
+    def __init__(
+        self,
+        tournament: Tournament,
+        matches: List[Match],
+        board_numbers: List[int],
+        minutes_per_leg: float = MINUTES_PER_LEG,
+        leg_cv: float = DEFAULT_LEG_CV,
+        changeover_minutes: float = DEFAULT_CHANGEOVER_MINUTES,
+        seed: Optional[int] = None
+    ):
+        self.tournament = tournament
+        self.is_doubles = tournament.mode == "doubles"
+        self.boards = sorted(set(board_numbers) | {m.board_number for m in matches if m.board_number is not None}) or [1]
+        self.minutes_per_leg = minutes_per_leg
+        self.changeover = changeover_minutes
+        self.rng = random.Random(seed)
+
+        # Lognormaal met het gevraagde gemiddelde en de gevraagde spreiding
+        self.sigma = math.sqrt(math.log(1 + leg_cv ** 2))
+        self.mu = math.log(minutes_per_leg) - self.sigma ** 2 / 2
+
+        self.sim_matches = self._build(matches)
+
+    # --- Opbouw van het (resterende) schema ---
+
+    def _build(self, matches: List[Match]) -> List[_SimMatch]:
+        result: List[_SimMatch] = []
+        if self.tournament.format == ROUND_ROBIN_FORMAT:
+            for m in sorted(matches, key=lambda m: m.id):
+                if not m.is_completed:
+                    result.append(self._from_match(m, phase=0))
+            return result
+
+        poule_matches = sorted((m for m in matches if m.poule_number is not None), key=lambda m: m.id)
+        ko_matches = [m for m in matches if m.poule_number is None]
+
+        for m in poule_matches:
+            if not m.is_completed:
+                result.append(self._from_match(m, phase=0))
+
+        if ko_matches:
+            ko_rounds = sorted({m.round_number for m in ko_matches})
+            latest = ko_rounds[-1]
+            for phase, round_number in enumerate(ko_rounds, start=1):
+                for m in sorted((x for x in ko_matches if x.round_number == round_number), key=lambda x: x.id):
+                    id_1, id_2 = _participants(m, self.is_doubles)
+                    if m.is_completed or not id_1 or not id_2:
+                        continue # Gespeeld of een bye
+                    result.append(self._from_match(m, phase=phase))
+            # Volgende rondes bestaan nog niet: half zoveel wedstrijden per ronde
+            remaining = len([m for m in ko_matches if m.round_number == latest])
+            if remaining > 1 and remaining % 2:
+                remaining -= 1 # Zelfde gedrag als check_and_advance_knockout
+            result.extend(self._future_rounds(remaining // 2, len(ko_rounds) + 1))
+        else:
+            result.extend(self._planned_knockout(poule_matches))
+        return result
+
+    def _from_match(self, m: Match, phase: int) -> _SimMatch:
+        people = [e for e in _participants(m, self.is_doubles) if e]
+        referee = m.referee_team_id if self.is_doubles else m.referee_id
+        if referee:
+            people.append(referee)
+        in_progress = bool(m.score_p1 or m.score_p2)
+        counts, weights = _remaining_legs(m.best_of_legs, m.score_p1, m.score_p2)
+        return _SimMatch(m.id, phase, m.board_number, people, counts, weights, in_progress)
+
+    def _planned_knockout(self, poule_matches: List[Match]) -> List[_SimMatch]:
+        """KO die generate_knockout_bracket straks maakt (nog geen wedstrijden in de database)."""
+        if not poule_matches:
+            return []
+        poules: Dict[int, set] = {}
+        for m in poule_matches:
+            poules.setdefault(m.poule_number, set()).update(e for e in _participants(m, self.is_doubles) if e)
+        q = self.tournament.qualifiers_per_poule or 2
+        total = sum(min(q, len(entities)) for entities in poules.values())
+        if total < 2:
+            return []
+
+        bracket_size = 2
+        while bracket_size < total:
+            bracket_size *= 2
+        # Eerste ronde: echte wedstrijden (de byes zijn direct voltooid)
+        first_round = total - bracket_size // 2
+        result = self._ko_round(first_round, 1)
+        result.extend(self._future_rounds(bracket_size // 4, 2))
+        return result
+
+    def _future_rounds(self, count: int, phase: int) -> List[_SimMatch]:
+        result = []
+        while count >= 1:
+            result.extend(self._ko_round(count, phase))
+            count //= 2
+            phase += 1
+        return result
+
+    def _ko_round(self, count: int, phase: int) -> List[_SimMatch]:
+        # Deelnemers zijn nog onbekend; binnen een ronde speelt iedereen maar één wedstrijd
+        counts, weights = _remaining_legs(self.tournament.starting_legs_ko)
+        return [_SimMatch(("ko", phase, k), phase, None, [], counts, weights) for k in range(count)]
+
+    # --- Simulatie ---
+
+    def _duration(self, match: _SimMatch) -> float:
+        legs = self.rng.choices(match.leg_counts, weights=match.leg_weights)[0]
+        return sum(self.rng.lognormvariate(self.mu, self.sigma) for _ in range(legs))
+
+    def replicate(self) -> Dict[str, Any]:
+        """Eén doorloop; tijden in minuten vanaf nu."""
+        busy = {b: 0.0 for b in self.boards}
+        played = {b: 0 for b in self.boards}
+        person_free: Dict[int, float] = {}
+        phase_end: Dict[int, float] = {}
+        clock = 0.0
+
+        phases = sorted({m.phase for m in self.sim_matches})
+        board_free = {b: 0.0 for b in self.boards}
+        for phase in phases:
+            # Een fase start pas als de vorige helemaal klaar is
+            start = phase_end.get(phase - 1, clock) if phase else clock
+            for b in self.boards:
+                board_free[b] = max(board_free[b], start)
+
+            queues: Dict[Optional[int], List[_SimMatch]] = {}
+            for m in self.sim_matches:
+                if m.phase == phase:
+                    queues.setdefault(m.board if m.board in board_free else None, []).append(m)
+
+            # Lopende wedstrijden eerst: die staan al op hun bord
+            for b, queue in queues.items():
+                for m in [x for x in queue if x.in_progress and b is not None]:
+                    queue.remove(m)
+                    end = self._play(m, b, board_free[b], busy, played, person_free)
+                    board_free[b] = end + self.changeover
+
+            heap = [(board_free[b], b) for b in self.boards]
+            heapq.heapify(heap)
+            end_of_phase = start
+            while any(queues.values()):
+                free_at, b = heapq.heappop(heap)
+                candidates = [(b, m) for m in queues.get(b, [])[:BOARD_LOOKAHEAD]]
+                candidates += [(None, m) for m in queues.get(None, [])[:BOARD_LOOKAHEAD]]
+                if not candidates:
+                    continue # Dit bord heeft niets meer te doen in deze fase
+
+                def ready(m: _SimMatch) -> float:
+                    return max([free_at] + [person_free.get(p, 0.0) for p in m.people])
+
+                # min() houdt bij gelijke starttijd de volgorde van de wachtrij aan
+                queue_key, match = min(candidates, key=lambda c: ready(c[1]))
+                queues[queue_key].remove(match)
+                end = self._play(match, b, ready(match), busy, played, person_free)
+                end_of_phase = max(end_of_phase, end)
+                heapq.heappush(heap, (end + self.changeover, b))
+                board_free[b] = end + self.changeover
+
+            phase_end[phase] = end_of_phase
+
+        finish = max(phase_end.values(), default=clock)
+        return {
+            "finish": finish,
+            "poules_finish": phase_end.get(0), # None als de poules al klaar zijn
+            "busy": busy,
+            "played": played,
+        }
+
+    def _play(self, match: _SimMatch, board: int, start: float, busy, played, person_free) -> float:
+        duration = self._duration(match)
+        end = start + duration
+        busy[board] += duration
+        played[board] += 1
+        for p in match.people:
+            person_free[p] = end
+        return end
+
+    def run(self, replications: int = DEFAULT_REPLICATIONS, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Speelt het schema 'replications' keer na. Met een deadline (time.monotonic) stopt hij
+        eerder; 'replications' in het resultaat is dan het aantal dat echt gedraaid heeft.
+        """
+        replications = max(1, min(replications, MAX_REPLICATIONS))
+        runs = []
+        while len(runs) < replications:
+            runs.append(self.replicate())
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+        replications = len(runs)
+        finishes = sorted(r["finish"] for r in runs)
+        poules = sorted(r["poules_finish"] for r in runs if r["poules_finish"] is not None)
+
+        boards = []
+        for b in self.boards:
+            utilization = [r["busy"][b] / r["finish"] if r["finish"] > 0 else 0.0 for r in runs]
+            idle = [r["finish"] - r["busy"][b] for r in runs]
+            boards.append({
+                "board_number": b,
+                "utilization": sum(utilization) / replications,
+                "idle_minutes": sum(idle) / replications,
+                "matches": sum(r["played"][b] for r in runs) / replications,
+            })
+
+        return {
+            "replications": replications,
+            "matches_remaining": len(self.sim_matches),
+            "finish_minutes": {
+                "p10": _quantile(finishes, 0.10),
+                "p50": _quantile(finishes, 0.50),
+                "p90": _quantile(finishes, 0.90),
+                "mean": sum(finishes) / replications,
+            },
+            "poules_finish_minutes": _quantile(poules, 0.50) if poules else None,
+            "boards": boards,
+        }
+
+
+def _quantile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+def estimate_duration(
+    tournament: Tournament,
+    matches: List[Match],
+    board_numbers: List[int],
+    replications: int = DEFAULT_REPLICATIONS,
+    minutes_per_leg: float = MINUTES_PER_LEG,
+    leg_cv: float = DEFAULT_LEG_CV,
+    changeover_minutes: float = DEFAULT_CHANGEOVER_MINUTES,
+    now: Optional[datetime] = None,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Geschatte eindtijd (p10/p50/p90) en bezetting per bord voor het resterende schema.
+    'now' is het startpunt van de simulatie (standaard: nu).
+    """
+    now = now or datetime.utcnow()
+    result = DurationSimulator(
+        tournament, matches, board_numbers, minutes_per_leg, leg_cv, changeover_minutes, seed
+    ).run(replications)
+    result["now"] = now
+    result["finish"] = {k: now + timedelta(minutes=v) for k, v in result["finish_minutes"].items()}
+    poules = result["poules_finish_minutes"]
+    result["poules_finish"] = now + timedelta(minutes=poules) if poules is not None else None
+    return result
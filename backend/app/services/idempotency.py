@@ -0,0 +1,119 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+
+# ==========================================
+# IDEMPOTENCY-KEY VOOR SCHRIJF-ENDPOINTS
+# ==========================================
+# Tablets op wankele Wi-Fi sturen een request opnieuw als het antwoord niet aankomt.
+# Met een 'Idempotency-Key' header geven we bij een herhaling het opgeslagen antwoord
+# terug, zonder de write (en de knockout-check) nog eens uit te voeren.
+# Alleen geslaagde antwoorden worden bewaard; een fout mag gewoon opnieuw geprobeerd worden.
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# Een tablet probeert binnen minuten opnieuw, niet na uren
+IDEMPOTENCY_TTL_SECONDS = 15 * 60
+IDEMPOTENCY_MAX_KEYS = 2048
+
+# Max. wachttijd als dezelfde key nog in behandeling is (retry tijdens de eerste poging)
+IN_FLIGHT_WAIT_SECONDS = 30
+
+
+class _Entry:
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        self.result: Any = None
+        self.succeeded = False
+        self.expires_at = 0.0
+
+
+class IdempotencyCache:
+    """Begrensde LRU met TTL, thread-safe (de endpoints draaien in de threadpool)."""
+
+    def __init__(self, max_keys: int = IDEMPOTENCY_MAX_KEYS, ttl: float = IDEMPOTENCY_TTL_SECONDS):
+        self.max_keys = max_keys
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def run(self, scope: str, key: Optional[str], payload: Any, action: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Voert 'action' hooguit één keer uit per (scope, key).
+        Geeft (resultaat, replayed) terug. Zonder key wordt 'action' gewoon uitgevoerd.
+        """
+        if not key:
+            return action(), False
+
+        cache_key = (scope, key)
+        fingerprint = _fingerprint(payload)
+
+        with self._lock:
+            self._evict_expired()
+            entry = self._entries.get(cache_key)
+            owner = entry is None
+            if owner:
+                entry = _Entry(fingerprint)
+                self._entries[cache_key] = entry
+                self._evict_oldest()
+            else:
+                self._entries.move_to_end(cache_key)
+
+        if entry.fingerprint != fingerprint:
+            raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_HEADER} is al gebruikt voor een ander verzoek")
+
+        if not owner:
+            # Herhaling: wachten tot de eerste poging klaar is en diens antwoord teruggeven
+            if not entry.done.wait(IN_FLIGHT_WAIT_SECONDS):
+                raise HTTPException(status_code=409, detail="Dit verzoek wordt nog verwerkt, probeer het later opnieuw")
+            if not entry.succeeded:
+                # Eerste poging faalde; deze herhaling mag het zelf opnieuw proberen
+                return self.run(scope, key, payload, action)
+            return entry.result, True
+
+        try:
+            result = jsonable_encoder(action())
+        except BaseException:
+            with self._lock:
+                if self._entries.get(cache_key) is entry:
+                    del self._entries[cache_key]
+            entry.done.set()
+            raise
+
+        with self._lock:
+            entry.result = result
+            entry.succeeded = True
+            entry.expires_at = time.monotonic() + self.ttl
+        entry.done.set()
+        return result, False
+
+    def _evict_expired(self) -> None:
+        now = time.monotonic()
+        expired = [k for k, e in self._entries.items() if e.done.is_set() and e.expires_at <= now]
+        for k in expired:
+            del self._entries[k]
+
+    def _evict_oldest(self) -> None:
+        """Minst recent gebruikte afgeronde keys eruit; keys die nog in behandeling zijn blijven staan."""
+        excess = len(self._entries) - self.max_keys
+        if excess <= 0:
+            return
+        done = [k for k, e in self._entries.items() if e.done.is_set()][:excess]
+        for k in done:
+            del self._entries[k]
+
+
+def _fingerprint(payload: Any) -> str:
+    raw = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+idempotency_cache = IdempotencyCache()
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Optional, Set
+
+logger = logging.getLogger("dart_app")
+
+# Max aantal berichten dat per client in de wachtrij mag staan.
+# Loopt een (trage) telefoon verder achter, dan vervangen we de wachtrij door één 'resync'.
+CLIENT_QUEUE_SIZE = 32
+
+# Na zoveel resyncs achter elkaar zonder dat de client iets heeft opgehaald, verbreken we de verbinding
+MAX_RESYNCS = 3
+
+
+class LiveSubscriber:
+    def __init__(self, tournament_id: int):
+        self.tournament_id = tournament_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self.resyncs = 0
+        self.dropped = False
+
+
+class LiveHub:
+    """
+    Broadcast kanaal per toernooi voor de publieke scoreborden.
+    Events worden één keer naar JSON omgezet en daarna in de (begrensde) wachtrij
+    van elke subscriber gezet; de publisher wacht nooit op een trage client.
+    """
+
+    def __init__(self):
+        self._channels: Dict[int, Set[LiveSubscriber]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def subscribe(self, tournament_id: int) -> LiveSubscriber:
+        # Moet vanuit de event loop aangeroepen worden (websocket handler)
+        self._loop = asyncio.get_running_loop()
+        subscriber = LiveSubscriber(tournament_id)
+        self._channels.setdefault(tournament_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: LiveSubscriber) -> None:
+        channel = self._channels.get(subscriber.tournament_id)
+        if channel is None:
+            return
+        channel.discard(subscriber)
+        if not channel:
+            del self._channels[subscriber.tournament_id]
+
+    def subscriber_count(self, tournament_id: Optional[int] = None) -> int:
+        if tournament_id is not None:
+            return len(self._channels.get(tournament_id, ()))
+        return sum(len(c) for c in self._channels.values())
+
+    def publish(self, tournament_id: int, event: Dict[str, Any]) -> None:
+        """
+        Thread-safe: wordt aangeroepen vanuit de (sync) endpoints na een commit.
+        Doet niets als er niemand luistert.
+        """
+        if tournament_id not in self._channels or self._loop is None or self._loop.is_closed():
+            return
+
+        message = json.dumps(event, default=str, separators=(",", ":"))
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is self._loop:
+            self._fan_out(tournament_id, message, event.get("seq"))
+        else:
+            self._loop.call_soon_threadsafe(self._fan_out, tournament_id, message, event.get("seq"))
+
+    def _fan_out(self, tournament_id: int, message: str, seq: Optional[int]) -> None:
+        for subscriber in list(self._channels.get(tournament_id, ())):
+            try:
+                subscriber.queue.put_nowait(message)
+                continue
+            except asyncio.QueueFull:
+                pass
+
+            # Trage client: wachtrij samenvoegen tot één resync (client haalt delta op via ?since)
+            subscriber.resyncs += 1
+            if subscriber.resyncs > MAX_RESYNCS:
+                logger.info(f"Live: trage client losgekoppeld (toernooi {tournament_id})")
+                subscriber.dropped = True
+                self.unsubscribe(subscriber)
+
+            while not subscriber.queue.empty():
+                subscriber.queue.get_nowait()
+            subscriber.queue.put_nowait(json.dumps({"type": "resync", "seq": seq}))
+
+
+live_hub = LiveHub()
@@ -0,0 +1,211 @@
+import json
+import math
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlmodel import Session, select
+from sqlalchemy.exc import IntegrityError
+
+from app.models.match import Match
+from app.models.player import Player
+from app.models.team import Team
+from app.models.timing import TournamentTimingStats
+from app.models.tournament import Tournament
+from app.services.archive_service import ARCHIVED_STATUS
+
+# ==========================================
+# TIMING ANALYTICS (BORDEN, WEDSTRIJDDUUR, WACHTTIJD)
+# ==========================================
+# Per toernooi worden de tijdstempels van de afgeronde wedstrijden (called_at, started_at,
+# completed_at) samengevat in optelbare aggregaten en opgeslagen in TournamentTimingStats.
+# Die rij wordt alleen opnieuw berekend als Tournament.change_seq veranderd is; bij het
+# archiveren (wedstrijden verdwijnen dan) wordt hij nog één keer bijgewerkt en ligt daarna vast.
+# Een seizoensrapport telt de opgeslagen rijen op en leest geen wedstrijden.
+#
+# Alleen afgeronde wedstrijden tellen mee: afronden verhoogt change_seq, dus de opgeslagen
+# cijfers zijn precies zo oud als de laatste uitslag.
+
+def _minutes(start: datetime, end: datetime) -> float:
+    return max(0.0, (end - start).total_seconds() / 60)
+
+
+def _entities(match: Match, is_doubles: bool) -> List[str]:
+    if is_doubles:
+        return [f"team:{t}" for t in (match.team1_id, match.team2_id) if t]
+    return [f"player:{p}" for p in (match.player1_id, match.player2_id) if p]
+
+
+def compute_timing_aggregates(matches: List[Match], is_doubles: bool) -> Dict[str, Any]:
+    """Optelbare aggregaten van één toernooi (alle tijden in minuten)."""
+    done = [m for m in matches if m.is_completed and m.started_at and m.completed_at]
+
+    boards: Dict[str, Dict[str, float]] = {}
+    per_board: Dict[int, List[Match]] = {}
+    for m in done:
+        if m.board_number is not None:
+            per_board.setdefault(m.board_number, []).append(m)
+    for number, board_matches in per_board.items():
+        busy = sum(_minutes(m.started_at, m.completed_at) for m in board_matches)
+        span = _minutes(min(m.started_at for m in board_matches), max(m.completed_at for m in board_matches))
+        boards[str(number)] = {"matches": len(board_matches), "busy": busy, "span": max(span, busy)}
+
+    best_of: Dict[str, Dict[str, float]] = {}
+    call_delay = {"count": 0, "minutes": 0.0}
+    for m in done:
+        minutes = _minutes(m.started_at, m.completed_at)
+        agg = best_of.setdefault(str(m.best_of_legs), {"count": 0, "minutes": 0.0, "minutes_sq": 0.0, "legs": 0})
+        agg["count"] += 1
+        agg["minutes"] += minutes
+        agg["minutes_sq"] += minutes * minutes
+        agg["legs"] += m.score_p1 + m.score_p2
+        if m.called_at and m.called_at < m.started_at:
+            call_delay["count"] += 1
+            call_delay["minutes"] += _minutes(m.called_at, m.started_at)
+
+    # Wachttijd: einde van de vorige wedstrijd tot de start van de volgende (per deelnemer)
+    timeline: Dict[str, List[Match]] = {}
+    for m in done:
+        for key in _entities(m, is_doubles):
+            timeline.setdefault(key, []).append(m)
+    waiting: Dict[str, Dict[str, float]] = {}
+    for key, entity_matches in timeline.items():
+        entity_matches.sort(key=lambda m: m.started_at)
+        agg = {"count": 0, "minutes": 0.0, "max": 0.0}
+        for prev, nxt in zip(entity_matches, entity_matches[1:]):
+            gap = _minutes(prev.completed_at, nxt.started_at)
+            agg["count"] += 1
+            agg["minutes"] += gap
+            agg["max"] = max(agg["max"], gap)
+        if agg["count"]:
+            waiting[key] = agg
+
+    return {
+        "matches": sum(1 for m in matches if m.is_completed),
+        "timed_matches": len(done),
+        "boards": boards,
+        "best_of": best_of,
+        "call_delay": call_delay,
+        "waiting": waiting,
+    }
+
+
+def merge_timing_aggregates(aggregates: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Telt aggregaten van meerdere toernooien op (borden en deelnemers op nummer/id)."""
+    total: Dict[str, Any] = {
+        "matches": 0, "timed_matches": 0, "boards": {}, "best_of": {},
+        "call_delay": {"count": 0, "minutes": 0.0}, "waiting": {}
+    }
+    for agg in aggregates:
+        total["matches"] += agg.get("matches", 0)
+        total["timed_matches"] += agg.get("timed_matches", 0)
+        for section in ("boards", "best_of", "waiting"):
+            for key, values in agg.get(section, {}).items():
+                target = total[section].setdefault(key, {k: 0 for k in values})
+                for k, v in values.items():
+                    target[k] = max(target.get(k, 0), v) if k == "max" else target.get(k, 0) + v
+        for k in ("count", "minutes"):
+            total["call_delay"][k] += agg.get("call_delay", {}).get(k, 0)
+    return total
+
+
+def refresh_timing_stats(session: Session, tournament: Tournament) -> TournamentTimingStats:
+    """
+    Geeft de opgeslagen aggregaten van een toernooi terug en berekent ze opnieuw als
+    het toernooi sindsdien gewijzigd is. Commit niet; de aanroeper doet dat.
+    """
+    stats = session.get(TournamentTimingStats, tournament.id)
+    if stats and (stats.seq == tournament.change_seq or tournament.status == ARCHIVED_STATUS):
+        return stats
+
+    matches = session.exec(select(Match).where(Match.tournament_id == tournament.id)).all()
+    payload = compute_timing_aggregates(matches, tournament.mode == "doubles")
+
+    if not stats:
+        stats = TournamentTimingStats(tournament_id=tournament.id)
+    stats.seq = tournament.change_seq
+    stats.computed_at = datetime.utcnow()
+    stats.payload = json.dumps(payload, separators=(",", ":"))
+    session.add(stats)
+    return stats
+
+
+def load_timing_aggregates(session: Session, tournaments: List[Tournament]) -> Dict[str, Any]:
+    """Aggregaten van een reeks toernooien; verouderde rijen worden bijgewerkt en opgeslagen."""
+    rows = [refresh_timing_stats(session, t) for t in tournaments]
+    try:
+        session.commit()
+    except IntegrityError:
+        # Een parallel verzoek sloeg dezelfde rij net eerder op; de berekende cijfers zijn gelijk
+        session.rollback()
+        rows = [refresh_timing_stats(session, t) for t in tournaments]
+    return merge_timing_aggregates(json.loads(row.payload) for row in rows)
+
+
+def _names(session: Session, keys: Iterable[str]) -> Dict[str, str]:
+    ids: Dict[str, List[int]] = {"player": [], "team": []}
+    for key in keys:
+        kind, _, raw_id = key.partition(":")
+        ids[kind].append(int(raw_id))
+    names: Dict[str, str] = {}
+    if ids["player"]:
+        for p in session.exec(select(Player).where(Player.id.in_(ids["player"]))).all():
+            names[f"player:{p.id}"] = p.name
+    if ids["team"]:
+        for t in session.exec(select(Team).where(Team.id.in_(ids["team"]))).all():
+            names[f"team:{t.id}"] = t.name
+    return names
+
+
+def build_timing_report(session: Session, tournaments: List[Tournament], waiting_limit: Optional[int] = None) -> Dict[str, Any]:
+    """Leesbaar rapport: bezetting per bord, duur per best-of en wachttijd per deelnemer."""
+    agg = load_timing_aggregates(session, tournaments)
+
+    boards = []
+    for number, b in sorted(agg["boards"].items(), key=lambda item: int(item[0])):
+        boards.append({
+            "board_number": int(number),
+            "matches": b["matches"],
+            "busy_minutes": b["busy"],
+            "span_minutes": b["span"],
+            "idle_minutes": b["span"] - b["busy"],
+            "utilization": b["busy"] / b["span"] if b["span"] else 0.0,
+        })
+
+    best_of = []
+    for legs, b in sorted(agg["best_of"].items(), key=lambda item: int(item[0])):
+        mean = b["minutes"] / b["count"]
+        variance = max(0.0, b["minutes_sq"] / b["count"] - mean * mean)
+        best_of.append({
+            "best_of_legs": int(legs),
+            "matches": b["count"],
+            "avg_minutes": mean,
+            "std_minutes": math.sqrt(variance),
+            "avg_leg_minutes": b["minutes"] / b["legs"] if b["legs"] else None,
+        })
+
+    waiting = sorted(agg["waiting"].items(), key=lambda item: -item[1]["minutes"] / item[1]["count"])
+    if waiting_limit is not None:
+        waiting = waiting[:waiting_limit]
+    names = _names(session, (key for key, _ in waiting))
+    waiting_rows = []
+    for key, w in waiting:
+        kind, _, raw_id = key.partition(":")
+        waiting_rows.append({
+            "entity_type": kind,
+            "entity_id": int(raw_id),
+            "name": names.get(key),
+            "waits": w["count"],
+            "avg_minutes": w["minutes"] / w["count"],
+            "max_minutes": w["max"],
+        })
+
+    delay = agg["call_delay"]
+    return {
+        "tournament_ids": [t.id for t in tournaments],
+        "matches": agg["matches"],
+        "timed_matches": agg["timed_matches"],
+        "boards": boards,
+        "best_of": best_of,
+        "call_to_start_minutes": delay["minutes"] / delay["count"] if delay["count"] else None,
+        "waiting": waiting_rows,
+    }
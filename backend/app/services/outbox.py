@@ -0,0 +1,212 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import delete, event, or_, update
+from sqlalchemy.orm.attributes import get_history
+from sqlmodel import Session, select
+
+from app.db.session import engine
+from app.models.match import Match
+from app.models.outbox import OutboxEvent
+from app.services.change_feed import register_commit_listener
+from app.services.tournament_gen import check_and_advance_knockout
+from app.services.rating import update_ratings_for_event
+
+logger = logging.getLogger("dart_app")
+
+# ==========================================
+# TRANSACTIONELE OUTBOX + ACHTERGROND WORKER
+# ==========================================
+# Wordt een wedstrijd voltooid, dan schrijft de flush-hook hieronder een OutboxEvent
+# in dezelfde transactie als de score. De worker (gestart in de lifespan) verwerkt
+# die events los van het request: de tablet krijgt direct antwoord, en faalt de
+# verwerking dan wordt het event later opnieuw geprobeerd (met backoff).
+# Handlers moeten daarom veilig herhaald kunnen worden.
+
+MATCH_COMPLETED = "match_completed"
+# Voltooide wedstrijd heropend, of de uitslag gecorrigeerd terwijl hij voltooid bleef
+MATCH_RESULT_CHANGED = "match_result_changed"
+
+# Zonder commit in dit proces (bijv. een andere worker) kijken we toch periodiek
+OUTBOX_POLL_SECONDS = 2.0
+OUTBOX_BATCH_SIZE = 50
+
+# Hoe lang een worker een event 'claimt'; daarna mag een ander het overnemen
+OUTBOX_LEASE_SECONDS = 60
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_MAX_BACKOFF_SECONDS = 300
+
+# Verwerkte events bewaren we nog even voor debugging
+OUTBOX_RETENTION = timedelta(days=1)
+
+OutboxHandler = Callable[[Session, OutboxEvent], None]
+_handlers: Dict[str, List[OutboxHandler]] = {}
+
+
+def register_outbox_handler(event_type: str, handler: OutboxHandler) -> None:
+    handlers = _handlers.setdefault(event_type, [])
+    if handler not in handlers:
+        handlers.append(handler)
+
+
+@event.listens_for(Session, "before_flush")
+def _record_completed_matches(session: Session, flush_context, instances) -> None:
+    """
+    Schrijft een outbox event voor elke wedstrijd die in deze flush voltooid wordt, en voor
+    elke voltooide wedstrijd die heropend of gecorrigeerd wordt (de ratings moeten mee).
+    """
+    for obj in session.dirty:
+        if not isinstance(obj, Match) or obj.tournament_id is None:
+            continue
+        history = get_history(obj, "is_completed")
+        if history.added and history.added[0] is True:
+            event_type = MATCH_COMPLETED
+        elif history.added and history.deleted and history.deleted[0] is True:
+            event_type = MATCH_RESULT_CHANGED
+        elif obj.is_completed and any(_value_changed(obj, name) for name in ("score_p1", "score_p2")):
+            event_type = MATCH_RESULT_CHANGED
+        else:
+            continue
+        session.add(OutboxEvent(
+            tournament_id=obj.tournament_id,
+            event_type=event_type,
+            match_id=obj.id,
+            round_number=obj.round_number,
+            poule_number=obj.poule_number
+        ))
+
+
+def _value_changed(obj: Match, name: str) -> bool:
+    history = get_history(obj, name)
+    return bool(history.added and history.deleted and history.added[0] != history.deleted[0])
+
+
+def _advance_knockout(session: Session, outbox_event: OutboxEvent) -> None:
+    # Poule wedstrijden hebben (nog) geen vervolg; de KO wordt handmatig gestart
+    if outbox_event.poule_number is not None:
+        return
+    check_and_advance_knockout(outbox_event.tournament_id, outbox_event.round_number, session, outbox_event.match_id)
+
+
+register_outbox_handler(MATCH_COMPLETED, _advance_knockout)
+register_outbox_handler(MATCH_COMPLETED, update_ratings_for_event)
+register_outbox_handler(MATCH_RESULT_CHANGED, update_ratings_for_event)
+
+
+class OutboxWorker:
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=10)
+        self._thread = None
+
+    def notify(self, tournament_id: int, change_event: Dict[str, Any]) -> None:
+        """Commit listener: er is iets gewijzigd, misschien staat er werk klaar."""
+        self._wake.set()
+
+    def _run(self) -> None:
+        last_cleanup = datetime.min
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                processed = self.process_pending()
+                if datetime.utcnow() - last_cleanup > timedelta(hours=1):
+                    self.cleanup()
+                    last_cleanup = datetime.utcnow()
+            except Exception:
+                logger.exception("Outbox worker: verwerken mislukt")
+                processed = 0
+            if processed < OUTBOX_BATCH_SIZE:
+                self._wake.wait(OUTBOX_POLL_SECONDS)
+
+    def process_pending(self) -> int:
+        """Verwerkt de events die klaarstaan; geeft het aantal geprobeerde events terug."""
+        now = datetime.utcnow()
+        with Session(engine) as session:
+            event_ids = session.exec(
+                select(OutboxEvent.id)
+                .where(OutboxEvent.processed_at == None)
+                .where(OutboxEvent.available_at <= now)
+                .where(or_(OutboxEvent.locked_until == None, OutboxEvent.locked_until < now))
+                .order_by(OutboxEvent.id)
+                .limit(OUTBOX_BATCH_SIZE)
+            ).all()
+
+        for event_id in event_ids:
+            self._process_one(event_id)
+        return len(event_ids)
+
+    def _process_one(self, event_id: int) -> None:
+        with Session(engine) as session:
+            # Claimen met compare-and-set, zodat twee workers (processen) niet hetzelfde event pakken
+            now = datetime.utcnow()
+            claimed = session.exec(
+                update(OutboxEvent)
+                .where(OutboxEvent.id == event_id)
+                .where(OutboxEvent.processed_at == None)
+                .where(or_(OutboxEvent.locked_until == None, OutboxEvent.locked_until < now))
+                .values(locked_until=now + timedelta(seconds=OUTBOX_LEASE_SECONDS))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            session.commit()
+            if not claimed:
+                return
+
+            outbox_event = session.get(OutboxEvent, event_id)
+            try:
+                for handler in _handlers.get(outbox_event.event_type, []):
+                    handler(session, outbox_event)
+                outbox_event.processed_at = datetime.utcnow()
+                outbox_event.locked_until = None
+                session.add(outbox_event)
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                self._schedule_retry(session, event_id, e)
+
+    def _schedule_retry(self, session: Session, event_id: int, error: Exception) -> None:
+        outbox_event = session.get(OutboxEvent, event_id)
+        outbox_event.attempts += 1
+        outbox_event.last_error = repr(error)[:500]
+        outbox_event.locked_until = None
+        if outbox_event.attempts >= OUTBOX_MAX_ATTEMPTS:
+            # Opgeven; staat nog wel in de tabel (last_error) voor handmatige controle
+            outbox_event.processed_at = datetime.utcnow()
+            logger.error(f"Outbox event {event_id} opgegeven na {outbox_event.attempts} pogingen: {error!r}")
+        else:
+            backoff = min(2 ** outbox_event.attempts, OUTBOX_MAX_BACKOFF_SECONDS)
+            outbox_event.available_at = datetime.utcnow() + timedelta(seconds=backoff)
+            logger.warning(f"Outbox event {event_id} mislukt (poging {outbox_event.attempts}), retry over {backoff}s: {error!r}")
+        session.add(outbox_event)
+        session.commit()
+
+    def cleanup(self) -> int:
+        with Session(engine) as session:
+            result = session.exec(
+                delete(OutboxEvent)
+                .where(OutboxEvent.processed_at != None)
+                .where(OutboxEvent.processed_at < datetime.utcnow() - OUTBOX_RETENTION)
+                .execution_options(synchronize_session=False)
+            )
+            session.commit()
+            return result.rowcount or 0
+
+
+outbox_worker = OutboxWorker()
+register_commit_listener(outbox_worker.notify)
@@ -0,0 +1,312 @@
+import heapq
+import itertools
+import math
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from app.models.match import Match
+from app.models.tournament import Tournament
+from app.services.duration import BOARD_LOOKAHEAD, DEFAULT_CHANGEOVER_MINUTES, DurationSimulator
+from app.services.schedule_index import MINUTES_PER_LEG
+from app.services.simulation import score_distribution
+from app.services.tournament_gen import _create_round_robin_matches, assign_poule_boards, schedule_poule_matches
+
+# ==========================================
+# PLANNER: WELK FORMAT PAST IN HET TIJDSLOT?
+# ==========================================
+# Loopt alle combinaties van poules, qualifiers en best-of (poule/KO) af met een snelle
+# analytische schatting, en rekent de beste kandidaten daarna na met de discrete-event
+# simulatie (zelfde schema als generate_poule_phase zou maken). De simulatie krijgt een
+# vast tijdsbudget, bewaakt per replicatie; kandidaten die niet meer aan de beurt komen
+# (of niet genoeg replicaties haalden) houden hun schatting, bijgesteld met de afwijking
+# die de nagerekende kandidaten in dezelfde run lieten zien.
+
+MAX_POULE_SIZE = 7 # Zelfde grens als create_tournament
+MIN_POULE_SIZE = 3 # Kleiner heeft geen schrijver uit de eigen poule (zie assign_referees)
+LEGS_GROUP_OPTIONS = (1, 3, 5, 7)
+LEGS_KO_OPTIONS = (3, 5, 7, 9)
+QUALIFIER_OPTIONS = (1, 2, 3, 4)
+
+# Correctie op de schatting: wachten op spelers/scheidsrechters en uitloop van de
+# langste wedstrijd per ronde (gekalibreerd tegen de simulatie)
+POULE_EFFICIENCY = 1.0
+# Met een vooraf vastgelegde schrijver lukken twee wedstrijden tegelijk in de simulatie pas vanaf 7 spelers
+POULE_CONCURRENCY_DIVISOR = 3.5
+KO_EFFICIENCY = 1.1
+# Marge voor de onzekerheid: 'past' betekent dat ook de p90 binnen het tijdslot blijft
+P90_MARGIN = 1.1
+
+PLANNER_REPLICATIONS = 20
+# Minder replicaties dan dit binnen het budget: te weinig voor een p90, schatting houden
+PLANNER_MIN_REPLICATIONS = 5
+SIMULATION_BUDGET_SECONDS = 0.4
+
+
+def expected_legs_played(best_of_legs: int) -> float:
+    probs, legs_1, legs_2 = score_distribution(0.5, best_of_legs)
+    return float((probs * (legs_1 + legs_2)).sum())
+
+
+def _poule_sizes(entity_count: int, num_poules: int) -> List[int]:
+    # Zelfde verdeling als generate_poule_phase (speler i -> poule i % N)
+    return [entity_count // num_poules + (1 if p < entity_count % num_poules else 0) for p in range(num_poules)]
+
+
+def _poule_concurrency(size: int) -> int:
+    """Wedstrijden die een poule tegelijk kan spelen (twee spelers plus de vooraf gekozen schrijver)."""
+    return max(1, int(size / POULE_CONCURRENCY_DIVISOR)) if size >= 3 else 1
+
+
+def poule_phase_slots(sizes: List[int], boards: int) -> float:
+    """
+    Lengte van de poulefase in wedstrijden (elke wedstrijd duurt 1), zoals de simulatie het
+    schema van assign_poule_boards afspeelt:
+    - borden <= poules: poule p speelt achter elkaar op bord p. De poules zonder eigen bord
+      staan poule voor poule in de gedeelde wachtrij en komen pas aan de beurt als een bord
+      zijn eigen poule af heeft.
+    - meer borden dan poules: één gedeelde wachtrij waarin de poules om en om staan.
+    Een vrij bord kijkt BOARD_LOOKAHEAD wedstrijden vooruit en neemt degene die het eerst
+    kan beginnen; per poule lopen er hoogstens _poule_concurrency wedstrijden tegelijk.
+    """
+    counts = [s * (s - 1) // 2 for s in sizes]
+    if boards > len(sizes):
+        own = [0] * boards
+        left = list(counts)
+        queue = []
+        while len(queue) < sum(counts):
+            for p in range(len(left)):
+                if left[p]:
+                    queue.append(p)
+                    left[p] -= 1
+    else:
+        own = counts[:boards]
+        queue = [p for p in range(boards, len(sizes)) for _ in range(counts[p])]
+
+    # Per poule de tijden waarop een 'plek' (spelers + schrijver) weer vrij is
+    poule_free = [[0.0] * _poule_concurrency(s) for s in sizes]
+    board_free = [(float(t), b) for b, t in enumerate(own)]
+    heapq.heapify(board_free)
+    finish = float(max(own, default=0))
+
+    pending = iter(queue)
+    window = list(itertools.islice(pending, BOARD_LOOKAHEAD))
+    while window:
+        now, board = heapq.heappop(board_free)
+        # min() houdt bij gelijke starttijd de volgorde van de wachtrij aan
+        pick = min(range(len(window)), key=lambda i: max(now, min(poule_free[window[i]])))
+        slots = poule_free[window.pop(pick)]
+        start = max(now, min(slots))
+        slots[slots.index(min(slots))] = start + 1
+        finish = max(finish, start + 1)
+        heapq.heappush(board_free, (start + 1, board))
+        window.extend(itertools.islice(pending, 1))
+    return finish
+
+
+def _ko_rounds(qualifiers: int) -> List[int]:
+    """Aantal echte wedstrijden per KO ronde (byes voor de topseeds, zoals generate_knockout_bracket)."""
+    if qualifiers < 2:
+        return []
+    bracket_size = 2
+    while bracket_size < qualifiers:
+        bracket_size *= 2
+    rounds = [qualifiers - bracket_size // 2]
+    count = bracket_size // 4
+    while count >= 1:
+        rounds.append(count)
+        count //= 2
+    return [r for r in rounds if r > 0]
+
+
+class FormatPlanner:
+    def __init__(
+        self,
+        entity_count: int,
+        boards: int,
+        time_budget_minutes: float,
+        minutes_per_leg: float = MINUTES_PER_LEG,
+        changeover_minutes: float = DEFAULT_CHANGEOVER_MINUTES
+    ):
+        self.entity_count = entity_count
+        self.boards = max(1, boards)
+        self.budget = time_budget_minutes
+        self.minutes_per_leg = minutes_per_leg
+        self.changeover = changeover_minutes
+        self._legs = {bo: expected_legs_played(bo) for bo in set(LEGS_GROUP_OPTIONS) | set(LEGS_KO_OPTIONS)}
+        self._poule_slots: Dict[int, float] = {} # Aantal poules -> poule_phase_slots (los van best-of en q)
+
+    def _match_minutes(self, best_of_legs: int) -> float:
+        return self._legs[best_of_legs] * self.minutes_per_leg + self.changeover
+
+    # --- Kandidaten ---
+
+    def candidates(self) -> List[Dict[str, Any]]:
+        result = []
+        min_poules = math.ceil(self.entity_count / MAX_POULE_SIZE)
+        for num_poules in range(max(1, min_poules), self.entity_count // 2 + 1):
+            sizes = _poule_sizes(self.entity_count, num_poules)
+            if num_poules > 1 and min(sizes) < MIN_POULE_SIZE:
+                break # Meer poules maakt ze alleen nog kleiner
+            for q in QUALIFIER_OPTIONS:
+                if q > min(sizes) or (q == min(sizes) and num_poules > 1):
+                    # Meer dan de poule groot is geeft dezelfde KO nog een keer; met meerdere
+                    # poules gaat bij q == poulegrootte (bijna) iedereen door
+                    continue
+                knockout_size = sum(min(q, s) for s in sizes)
+                if knockout_size < 2:
+                    continue
+                for legs_group in LEGS_GROUP_OPTIONS:
+                    for legs_ko in LEGS_KO_OPTIONS:
+                        if legs_ko < legs_group:
+                            continue
+                        result.append(self._estimate(num_poules, sizes, q, knockout_size, legs_group, legs_ko))
+        return result
+
+    def _estimate(self, num_poules, sizes, q, knockout_size, legs_group, legs_ko) -> Dict[str, Any]:
+        group_minutes = self._match_minutes(legs_group)
+        ko_minutes = self._match_minutes(legs_ko)
+
+        work = sum(s * (s - 1) // 2 for s in sizes) * group_minutes
+        if num_poules not in self._poule_slots:
+            self._poule_slots[num_poules] = poule_phase_slots(sizes, self.boards)
+        poule_phase = self._poule_slots[num_poules] * group_minutes * POULE_EFFICIENCY
+
+        ko_rounds = _ko_rounds(knockout_size)
+        ko_phase = sum(math.ceil(k / self.boards) for k in ko_rounds) * ko_minutes * KO_EFFICIENCY
+        ko_work = sum(ko_rounds) * ko_minutes
+        total = poule_phase + ko_phase
+
+        # Gemiddeld aantal gespeelde legs per deelnemer (hoeveel darts krijgt iedereen?)
+        legs = sum(s * (s - 1) for s in sizes) * self._legs[legs_group] + 2 * sum(ko_rounds) * self._legs[legs_ko]
+
+        return {
+            "number_of_poules": num_poules,
+            "qualifiers_per_poule": q,
+            "starting_legs_group": legs_group,
+            "starting_legs_ko": legs_ko,
+            "poule_sizes": sizes,
+            "knockout_size": knockout_size,
+            "expected_minutes": total,
+            "p90_minutes": None,
+            "poule_phase_minutes": poule_phase,
+            "utilization": (work + ko_work) / (self.boards * total) if total else 0.0,
+            "legs_per_participant": legs / self.entity_count,
+            "simulated": False,
+            "fits": total * P90_MARGIN <= self.budget,
+        }
+
+    # --- Simulatie van de beste kandidaten ---
+
+    def _simulate(self, option: Dict[str, Any], deadline: float) -> bool:
+        """Rekent een kandidaat na binnen de deadline; False als dat niet lukte (schatting blijft)."""
+        tournament = Tournament(
+            name="plan",
+            date="",
+            mode="singles",
+            number_of_poules=option["number_of_poules"],
+            qualifiers_per_poule=option["qualifiers_per_poule"],
+            starting_legs_group=option["starting_legs_group"],
+            starting_legs_ko=option["starting_legs_ko"],
+        )
+        entities = [SimpleNamespace(id=i + 1) for i in range(self.entity_count)]
+        matches: List[Match] = []
+        members: Dict[int, List[SimpleNamespace]] = {}
+        for p_num in range(1, option["number_of_poules"] + 1):
+            members[p_num] = entities[p_num - 1::option["number_of_poules"]]
+            matches.extend(_create_round_robin_matches(0, members[p_num], p_num, option["starting_legs_group"], 1))
+
+        boards = list(range(1, self.boards + 1))
+        assign_poule_boards(matches, boards, option["number_of_poules"])
+        matches, _ = schedule_poule_matches(matches, members, boards, option["number_of_poules"], is_doubles=False)
+        for idx, m in enumerate(matches, start=1):
+            m.id = idx # Volgorde zoals ze in de database terecht zouden komen
+
+        if time.monotonic() >= deadline:
+            return False
+        result = DurationSimulator(
+            tournament, matches, boards, self.minutes_per_leg, changeover_minutes=self.changeover, seed=1
+        ).run(PLANNER_REPLICATIONS, deadline)
+        if result["replications"] < PLANNER_MIN_REPLICATIONS:
+            return False
+
+        option["expected_minutes"] = result["finish_minutes"]["p50"]
+        option["p90_minutes"] = result["finish_minutes"]["p90"]
+        option["poule_phase_minutes"] = result["poules_finish_minutes"] or 0.0
+        option["utilization"] = sum(b["utilization"] for b in result["boards"]) / len(result["boards"])
+        option["simulated"] = True
+        option["fits"] = option["p90_minutes"] <= self.budget
+        return True
+
+    def _correct_estimates(self, options: List[Dict[str, Any]], estimates: Dict[int, float]) -> None:
+        """
+        Schaalt de kandidaten die niet nagerekend zijn met de afwijking die de nagerekende
+        kandidaten in deze run lieten zien (alleen naar boven). Liefst van hetzelfde aantal
+        poules, anders de grootste afwijking; 'fits' volgt de geschaalde schatting.
+        """
+        ratios: Dict[int, float] = {}
+        for o in options:
+            if o["simulated"]:
+                estimate = estimates[id(o)]
+                ratio = max(o["expected_minutes"] / estimate, o["p90_minutes"] / (estimate * P90_MARGIN))
+                ratios[o["number_of_poules"]] = max(ratios.get(o["number_of_poules"], ratio), ratio)
+        if not ratios:
+            return
+
+        fallback = max(ratios.values())
+        for o in options:
+            ratio = ratios.get(o["number_of_poules"], fallback)
+            if o["simulated"] or ratio <= 1.0:
+                continue
+            o["expected_minutes"] *= ratio
+            o["poule_phase_minutes"] *= ratio
+            o["utilization"] /= ratio
+            o["fits"] = o["expected_minutes"] * P90_MARGIN <= self.budget
+
+    def plan(self, limit: int = 10) -> List[Dict[str, Any]]:
+        options = self.candidates()
+        # Meeste darts per deelnemer eerst; bij gelijke waarde het snelste format
+        options.sort(key=lambda o: (not o["fits"], -o["legs_per_participant"], o["expected_minutes"]))
+        if not any(o["fits"] for o in options):
+            options.sort(key=lambda o: o["expected_minutes"])
+
+        # Nasimuleren zolang het budget het toelaat; valt een kandidaat af, dan schuift de volgende door.
+        # De kosten schalen met het aantal poulewedstrijden: met de tijd per wedstrijd van de vorige
+        # simulatie slaan we kandidaten over die niet meer binnen het budget passen.
+        deadline = time.monotonic() + SIMULATION_BUDGET_SECONDS
+        seconds_per_match = 0.0
+        shortlist: List[Dict[str, Any]] = []
+        dropped: List[Dict[str, Any]] = []
+        estimates = {id(o): o["expected_minutes"] for o in options}
+        for option in options:
+            if len(shortlist) >= limit:
+                break
+            match_count = sum(s * (s - 1) // 2 for s in option["poule_sizes"])
+            started = time.monotonic()
+            if started + seconds_per_match * match_count < deadline:
+                fitted = option["fits"]
+                simulated = self._simulate(option, deadline)
+                seconds_per_match = max(seconds_per_match, (time.monotonic() - started) / max(1, match_count))
+                if simulated and fitted and not option["fits"]:
+                    dropped.append(option)
+                    continue
+            shortlist.append(option)
+        shortlist.extend(dropped[:limit - len(shortlist)])
+        self._correct_estimates(shortlist + dropped, estimates)
+
+        # Nagerekende formats gaan voor: de analytische schatting kan te optimistisch zijn
+        shortlist.sort(key=lambda o: (not o["fits"], not o["simulated"], -o["legs_per_participant"], o["expected_minutes"]))
+        return shortlist
+
+
+def plan_formats(
+    entity_count: int,
+    boards: int,
+    time_budget_minutes: float,
+    minutes_per_leg: float = MINUTES_PER_LEG,
+    limit: int = 10
+) -> List[Dict[str, Any]]:
+    """Gerangschikte lijst van formats die (naar verwachting) binnen het tijdslot passen."""
+    if entity_count < 2:
+        return []
+    return FormatPlanner(entity_count, boards, time_budget_minutes, minutes_per_leg).plan(limit)
@@ -0,0 +1,372 @@
+import math
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from app.db.locks import lock_ratings
+from app.models.archive import TournamentArchive
+from app.models.match import Match
+from app.models.outbox import OutboxEvent
+from app.models.rating import Rating, RatingApplication
+from app.models.tournament import Tournament
+from app.services.archive_service import decompress_payload
+from app.services.simulation import DEFAULT_RATING
+
+# ==========================================
+# RATINGS (GLICKO-ACHTIG, PER SPELER EN TEAM)
+# ==========================================
+# Elke afgeronde wedstrijd is één 'partij' met als uitslag het aandeel gewonnen legs
+# (3-1 -> 0.75). De verwachting is de kans op een leg uit de simulatie (400-schaal), zodat
+# de ratings daar direct in kunnen. Glicko-1 met één partij per periode: wie nog weinig
+# gespeeld heeft (hoge rd) beweegt snel, een vaste waarde beweegt weinig.
+#
+# Incrementeel: de outbox handler werkt na elke voltooide wedstrijd de twee ratings bij en
+# bewaart die update per wedstrijd (RatingApplication). Wordt de wedstrijd heropend of de
+# uitslag gecorrigeerd, dan gaat die update er eerst af en telt daarna de nieuwe uitslag.
+# Batch: recompute_ratings speelt de hele historie (live + archief) opnieuw af. Beide nemen
+# lock_ratings, zodat een herberekening nooit half over een incrementele update heen schrijft. Wedstrijden
+# zonder gedeelde deelnemer zijn onafhankelijk; die worden per laag tegelijk (numpy)
+# verwerkt. De laagindeling houdt per deelnemer de volgorde aan, dus de uitkomst is gelijk
+# aan één voor één afspelen.
+
+INITIAL_RD = 350.0
+MIN_RD = 40.0
+RD_DRIFT = 25.0 # Onzekerheid die er vóór elke wedstrijd bij komt (vorm verandert)
+
+SEEDING_RANDOM = "random"
+SEEDING_RATING = "rating"
+SEEDING_OPTIONS = (SEEDING_RANDOM, SEEDING_RATING)
+
+_Q = math.log(10) / 400.0
+
+
+def _g(rd):
+    return 1.0 / np.sqrt(1.0 + 3.0 * _Q * _Q * rd * rd / (math.pi ** 2))
+
+
+def glicko_update(r1, rd1, r2, rd2, s1):
+    """
+    Nieuwe (rating, rd) voor beide kanten na één partij met uitslag s1 voor kant 1.
+    Werkt op losse getallen en op numpy arrays (één element per wedstrijd).
+    """
+    rd1 = np.minimum(np.sqrt(rd1 * rd1 + RD_DRIFT * RD_DRIFT), INITIAL_RD)
+    rd2 = np.minimum(np.sqrt(rd2 * rd2 + RD_DRIFT * RD_DRIFT), INITIAL_RD)
+    g1, g2 = _g(rd1), _g(rd2)
+    e1 = 1.0 / (1.0 + 10.0 ** (-g2 * (r1 - r2) / 400.0))
+    e2 = 1.0 / (1.0 + 10.0 ** (-g1 * (r2 - r1) / 400.0))
+    v1 = 1.0 / (1.0 / (rd1 * rd1) + _Q * _Q * g2 * g2 * e1 * (1.0 - e1))
+    v2 = 1.0 / (1.0 / (rd2 * rd2) + _Q * _Q * g1 * g1 * e2 * (1.0 - e2))
+    new_r1 = r1 + _Q * v1 * g2 * (s1 - e1)
+    new_r2 = r2 + _Q * v2 * g1 * ((1.0 - s1) - e2)
+    return new_r1, np.maximum(np.sqrt(v1), MIN_RD), new_r2, np.maximum(np.sqrt(v2), MIN_RD)
+
+
+def match_outcome(
+    is_doubles: bool,
+    player1_id: Optional[int], player2_id: Optional[int],
+    team1_id: Optional[int], team2_id: Optional[int],
+    score_p1: int, score_p2: int
+) -> Optional[Tuple[str, int, int, float]]:
+    """(entity_type, kant 1, kant 2, legaandeel kant 1), of None voor een bye/lege uitslag."""
+    a, b = (team1_id, team2_id) if is_doubles else (player1_id, player2_id)
+    if not a or not b or score_p1 + score_p2 <= 0:
+        return None
+    return ("team" if is_doubles else "player", a, b, score_p1 / (score_p1 + score_p2))
+
+
+# --- Incrementeel ---
+
+def _get_rows(session: Session, entity_type: str, ids: Sequence[int]) -> Dict[int, Rating]:
+    rows = {
+        row.entity_id: row for row in session.exec(
+            select(Rating).where(Rating.entity_type == entity_type).where(Rating.entity_id.in_(ids))
+        ).all()
+    }
+    for entity_id in ids:
+        if entity_id not in rows:
+            rows[entity_id] = Rating(entity_type=entity_type, entity_id=entity_id, rating=DEFAULT_RATING, rd=INITIAL_RD)
+    return rows
+
+
+def _undo_application(rows: Dict[int, Rating], application: RatingApplication) -> None:
+    """
+    Draait een eerder toegepaste update terug. Is de rating sindsdien niet meer veranderd,
+    dan komen de oude waarden terug; anders gaat alleen het verschil eraf (latere wedstrijden blijven staan).
+    """
+    sides = (
+        (rows[application.side_a_id], application.rating_a_before, application.rd_a_before,
+         application.rating_a_after, application.rd_a_after),
+        (rows[application.side_b_id], application.rating_b_before, application.rd_b_before,
+         application.rating_b_after, application.rd_b_after),
+    )
+    for row, rating_before, rd_before, rating_after, rd_after in sides:
+        if row.rating == rating_after and row.rd == rd_after:
+            row.rating, row.rd = rating_before, rd_before
+        else:
+            row.rating -= rating_after - rating_before
+        row.matches = max(0, row.matches - 1)
+
+
+def apply_match_rating(session: Session, match: Match, is_doubles: bool, event_id: Optional[int] = None) -> bool:
+    """
+    Brengt de ratings in lijn met de huidige uitslag van de wedstrijd (commit niet): een
+    eerder toegepaste update (RatingApplication) wordt eerst teruggedraaid, daarna telt de
+    uitslag opnieuw als de wedstrijd nog voltooid is. False als er niets te doen was.
+    """
+    application = session.exec(
+        select(RatingApplication).where(RatingApplication.match_id == match.id)
+    ).first()
+    if application is not None and event_id is not None and application.event_id == event_id:
+        return False # Herhaald event (retry): al verwerkt
+
+    outcome = match_outcome(
+        is_doubles, match.player1_id, match.player2_id, match.team1_id, match.team2_id,
+        match.score_p1, match.score_p2
+    )
+    if not match.is_completed:
+        outcome = None
+    if application is None and outcome is None:
+        return False
+
+    now = datetime.utcnow()
+    rows: Dict[Tuple[str, int], Rating] = {}
+    if application is not None:
+        undo_rows = _get_rows(session, application.entity_type, [application.side_a_id, application.side_b_id])
+        _undo_application(undo_rows, application)
+        for entity_id, row in undo_rows.items():
+            row.updated_at = now
+            session.add(row)
+            rows[(application.entity_type, entity_id)] = row
+
+    if outcome is None:
+        session.delete(application)
+        return True
+
+    entity_type, a, b, share = outcome
+    missing = [entity_id for entity_id in (a, b) if (entity_type, entity_id) not in rows]
+    if missing:
+        for entity_id, row in _get_rows(session, entity_type, missing).items():
+            rows[(entity_type, entity_id)] = row
+    first, second = rows[(entity_type, a)], rows[(entity_type, b)]
+    before = (first.rating, first.rd, second.rating, second.rd)
+
+    r1, rd1, r2, rd2 = glicko_update(first.rating, first.rd, second.rating, second.rd, share)
+    for row, rating, rd in ((first, r1, rd1), (second, r2, rd2)):
+        row.rating = float(rating)
+        row.rd = float(rd)
+        row.matches += 1
+        row.last_event_id = event_id
+        row.updated_at = now
+        session.add(row)
+
+    application = application or RatingApplication(match_id=match.id, tournament_id=match.tournament_id)
+    application.entity_type, application.side_a_id, application.side_b_id = entity_type, a, b
+    (application.rating_a_before, application.rd_a_before,
+     application.rating_b_before, application.rd_b_before) = before
+    (application.rating_a_after, application.rd_a_after,
+     application.rating_b_after, application.rd_b_after) = (first.rating, first.rd, second.rating, second.rd)
+    application.event_id = event_id
+    application.created_at = now
+    session.add(application)
+    return True
+
+
+def update_ratings_for_event(session: Session, outbox_event) -> None:
+    """
+    Outbox handler voor een voltooide, heropende of gecorrigeerde wedstrijd. Veilig te
+    herhalen: per wedstrijd staat vast welke update al is toegepast (RatingApplication).
+    """
+    if outbox_event.match_id is None:
+        return
+    match = session.get(Match, outbox_event.match_id)
+    if not match:
+        return
+    tournament = session.get(Tournament, match.tournament_id)
+    lock_ratings(session) # Tot de commit van de outbox worker
+    apply_match_rating(session, match, tournament is not None and tournament.mode == "doubles", outbox_event.id)
+
+
+# --- Batch (hele historie) ---
+
+def compute_ratings(side_a: np.ndarray, side_b: np.ndarray, share: np.ndarray, entity_count: int,
+                    with_updates: bool = False):
+    """
+    Speelt de wedstrijden (op volgorde) af voor entity_count deelnemers (indexen 0..n-1).
+    Geeft arrays rating, rd en aantal wedstrijden per deelnemer terug. Met with_updates komt
+    er per wedstrijd nog een rij bij: rating/rd van beide kanten ervoor en erna (8 kolommen).
+    """
+    rating = np.full(entity_count, DEFAULT_RATING)
+    rd = np.full(entity_count, INITIAL_RD)
+    played = np.bincount(np.concatenate([side_a, side_b]), minlength=entity_count)
+    updates = np.empty((len(share), 8))
+    if len(share) == 0:
+        return (rating, rd, played, updates) if with_updates else (rating, rd, played)
+
+    # Laag = 1 + de laatste laag van beide deelnemers; binnen een laag is niemand dubbel
+    last = [0] * entity_count
+    layers = np.empty(len(share), dtype=np.int64)
+    for idx, (a, b) in enumerate(zip(side_a.tolist(), side_b.tolist())):
+        layer = max(last[a], last[b]) + 1
+        last[a] = last[b] = layer
+        layers[idx] = layer
+
+    order = np.argsort(layers, kind="stable")
+    bounds = np.flatnonzero(np.diff(layers[order])) + 1
+    for chunk in np.split(order, bounds):
+        a, b = side_a[chunk], side_b[chunk]
+        r1, rd1, r2, rd2 = glicko_update(rating[a], rd[a], rating[b], rd[b], share[chunk])
+        if with_updates:
+            updates[chunk] = np.column_stack((rating[a], rd[a], rating[b], rd[b], r1, rd1, r2, rd2))
+        rating[a], rd[a], rating[b], rd[b] = r1, rd1, r2, rd2
+    return (rating, rd, played, updates) if with_updates else (rating, rd, played)
+
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def load_rating_history(session: Session) -> List[Tuple[Tuple, str, int, int, float]]:
+    """
+    Alle afgeronde wedstrijden (live en gearchiveerd) op volgorde: (sorteersleutel, type, a, b,
+    aandeel, live) met live = (match_id, tournament_id) voor een live wedstrijd, anders None.
+    Live wedstrijden waarvan het outbox event nog openstaat tellen niet mee; die verwerkt de
+    handler straks zelf (anders telt zo'n wedstrijd dubbel).
+    """
+    history = []
+    pending = select(OutboxEvent.match_id).where(OutboxEvent.processed_at == None).where(OutboxEvent.match_id != None)
+
+    rows = session.exec(
+        select(
+            Match.id, Match.tournament_id, Match.player1_id, Match.player2_id, Match.team1_id, Match.team2_id,
+            Match.score_p1, Match.score_p2, Match.completed_at, Tournament.mode, Tournament.created_at
+        )
+        .join(Tournament, Tournament.id == Match.tournament_id)
+        .where(Match.is_completed == True)
+        .where(Match.id.not_in(pending))
+    ).all()
+    for match_id, tournament_id, p1, p2, t1, t2, s1, s2, completed_at, mode, created_at in rows:
+        outcome = match_outcome(mode == "doubles", p1, p2, t1, t2, s1, s2)
+        if outcome:
+            history.append(((completed_at or created_at, created_at, match_id),) + outcome + ((match_id, tournament_id),))
+
+    for archive in session.exec(select(TournamentArchive)).all():
+        snapshot = decompress_payload(archive.payload).get("tournament", {})
+        is_doubles = snapshot.get("mode") == "doubles"
+        created_at = _parse_time(snapshot.get("created_at")) or archive.archived_at
+        for m in snapshot.get("matches", []):
+            if not m.get("is_completed"):
+                continue
+            outcome = match_outcome(
+                is_doubles, m.get("player1_id"), m.get("player2_id"), m.get("team1_id"), m.get("team2_id"),
+                m.get("score_p1", 0), m.get("score_p2", 0)
+            )
+            if outcome:
+                completed_at = _parse_time(m.get("completed_at")) or created_at
+                history.append(((completed_at, created_at, m.get("id") or 0),) + outcome + (None,))
+
+    history.sort(key=lambda item: item[0])
+    return history
+
+
+def recompute_ratings(session: Session) -> Dict[str, Any]:
+    """
+    Berekent alle ratings opnieuw uit de volledige historie (commit). Bestaande rijen worden
+    bijgewerkt, zodat last_event_id blijft staan; wie geen wedstrijden meer in de historie
+    heeft gaat terug naar de beginwaarde. De toegepaste updates van live wedstrijden
+    (RatingApplication) worden opnieuw opgebouwd, zodat een latere correctie precies de
+    herberekende update terugdraait.
+    """
+    started = time.perf_counter()
+    lock_ratings(session) # Vóór het lezen: de historie en de tabel moeten bij elkaar passen
+    history = load_rating_history(session)
+
+    index: Dict[Tuple[str, int], int] = {}
+    side_a = np.empty(len(history), dtype=np.int64)
+    side_b = np.empty(len(history), dtype=np.int64)
+    share = np.empty(len(history))
+    for idx, (_, entity_type, a, b, s, _live) in enumerate(history):
+        side_a[idx] = index.setdefault((entity_type, a), len(index))
+        side_b[idx] = index.setdefault((entity_type, b), len(index))
+        share[idx] = s
+
+    rating, rd, played, updates = compute_ratings(side_a, side_b, share, len(index), with_updates=True)
+
+    rows = {(row.entity_type, row.entity_id): row for row in session.exec(select(Rating)).all()}
+    now = datetime.utcnow()
+    for key in rows.keys() | index.keys():
+        row = rows.get(key) or Rating(entity_type=key[0], entity_id=key[1])
+        i = index.get(key)
+        row.rating = float(rating[i]) if i is not None else DEFAULT_RATING
+        row.rd = float(rd[i]) if i is not None else INITIAL_RD
+        row.matches = int(played[i]) if i is not None else 0
+        row.updated_at = now
+        session.add(row)
+
+    session.exec(delete(RatingApplication).execution_options(synchronize_session=False))
+    for idx, (_, entity_type, a, b, _s, live) in enumerate(history):
+        if live is None:
+            continue
+        values = [float(v) for v in updates[idx]]
+        session.add(RatingApplication(
+            match_id=live[0], tournament_id=live[1], entity_type=entity_type, side_a_id=a, side_b_id=b,
+            rating_a_before=values[0], rd_a_before=values[1], rating_b_before=values[2], rd_b_before=values[3],
+            rating_a_after=values[4], rd_a_after=values[5], rating_b_after=values[6], rd_b_after=values[7],
+            created_at=now
+        ))
+    session.commit()
+    return {
+        "matches": len(history),
+        "entities": len(index),
+        "elapsed_ms": (time.perf_counter() - started) * 1000,
+    }
+
+
+# --- Seeding ---
+
+def rating_map(session: Session, entity_type: str, ids: Sequence[int]) -> Dict[int, float]:
+    """Rating per id; wie nog geen rating heeft ontbreekt (de simulatie neemt dan DEFAULT_RATING)."""
+    ids = list(ids)
+    if not ids:
+        return {}
+    return {
+        entity_id: rating for entity_id, rating in session.exec(
+            select(Rating.entity_id, Rating.rating)
+            .where(Rating.entity_type == entity_type)
+            .where(Rating.entity_id.in_(ids))
+        ).all()
+    }
+
+
+def seeded_order(session: Session, tournament: Tournament, ids: Sequence[int]) -> List[int]:
+    """Plaatsingsvolgorde: loting, of op rating (hoogste eerst; gelijke ratings geloot)."""
+    order = list(ids)
+    random.shuffle(order)
+    if tournament.seeding == SEEDING_RATING:
+        ratings = rating_map(session, "team" if tournament.mode == "doubles" else "player", order)
+        order.sort(key=lambda entity_id: -ratings.get(entity_id, DEFAULT_RATING))
+    return order
+
+
+def snake_poules(entities: Sequence[Any], ratings: Dict[int, float], num_poules: int) -> Dict[int, List[Any]]:
+    """
+    Slangverdeling op rating: 1-2-3-3-2-1-1-2-3... zodat elke poule even sterk is.
+    entities hebben een .id; zonder rating telt DEFAULT_RATING.
+    """
+    ranked = list(entities)
+    random.shuffle(ranked)
+    ranked.sort(key=lambda e: -ratings.get(e.id, DEFAULT_RATING))
+    poules: Dict[int, List[Any]] = {p: [] for p in range(1, num_poules + 1)}
+    for idx, entity in enumerate(ranked):
+        row, col = divmod(idx, num_poules)
+        poules[col + 1 if row % 2 == 0 else num_poules - col].append(entity)
+    return poules
@@ -0,0 +1,334 @@
+import itertools
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.match import Match
+from app.models.tournament import Tournament
+from app.services.simulation import legs_to_win
+
+# ==========================================
+# SCENARIO'S: "WAT HEB IK NODIG OM DOOR TE GAAN?"
+# ==========================================
+# Exacte analyse van één poule: we lopen de open wedstrijden af (branch-and-bound)
+# en passen dezelfde regels toe als calculate_poule_standings:
+# punten -> leg saldo -> onderling resultaat -> shoot-out.
+#
+# Eerst wordt per wedstrijd alleen de winnaar gekozen (punten beslissen bijna altijd).
+# Pas in een blad waar de deelnemer op punten gelijk staat rond de grens, rekenen we
+# de mogelijke legstanden door. Takken die op punten al beslist zijn worden afgekapt,
+# en deelstanden worden gememoïseerd zodat gelijke tussenstanden maar één keer tellen.
+# Een shoot-out rekenen we in beide richtingen mee: 'zeker door' betekent ook na een
+# verloren shoot-out, 'uitgeschakeld' betekent ook na een gewonnen shoot-out.
+
+QUALIFIED = "qualified"
+ELIMINATED = "eliminated"
+OPEN = "open"
+
+# Vangnet tegen een poule die nog helemaal open ligt (dan is alles nog mogelijk)
+MAX_SEARCH_NODES = 200_000
+
+
+class _SearchBudgetExceeded(Exception):
+    pass
+
+
+def _participants(match: Match, is_doubles: bool) -> Tuple[Optional[int], Optional[int]]:
+    return (match.team1_id, match.team2_id) if is_doubles else (match.player1_id, match.player2_id)
+
+
+class _OpenMatch:
+    def __init__(self, match_id: int, i: int, j: int, score_i: int, score_j: int, best_of_legs: Optional[int]):
+        self.match_id = match_id
+        self.i, self.j = i, j
+        target = legs_to_win(best_of_legs)
+        # Mogelijke winnaars met het bijbehorende leg saldo (vanuit de winnaar gezien)
+        self.margins: Dict[int, List[int]] = {}
+        if score_j < target and score_i <= target:
+            self.margins[i] = sorted({target - lost for lost in range(score_j, target)})
+        if score_i < target and score_j <= target:
+            self.margins[j] = sorted({target - lost for lost in range(score_i, target)})
+
+    def other(self, entity: int) -> int:
+        return self.j if entity == self.i else self.i
+
+
+class PouleScenarios:
+    """
+    Alle deelnemers en wedstrijden van één poule in lokale indexen.
+    Vaste (gespeelde) wedstrijden zitten in de beginstand, open wedstrijden worden doorzocht.
+    """
+
+    def __init__(self, entities: List[int], matches: List[Match], is_doubles: bool, qualifiers: int):
+        self.entities = entities
+        self.n = len(entities)
+        self.qualifiers = qualifiers
+        index = {e: i for i, e in enumerate(entities)}
+
+        self.points = [0] * self.n
+        self.leg_diff = [0] * self.n
+        self.h2h: Dict[Tuple[int, int], int] = {} # (laagste, hoogste index) -> winnaar
+        self.open: List[_OpenMatch] = []
+
+        for m in matches:
+            id_1, id_2 = _participants(m, is_doubles)
+            if not id_1 or not id_2:
+                continue
+            i, j = index[id_1], index[id_2]
+            if m.is_completed:
+                winner = i if m.score_p1 > m.score_p2 else j
+                self.points[winner] += 2
+                self.leg_diff[i] += m.score_p1 - m.score_p2
+                self.leg_diff[j] += m.score_p2 - m.score_p1
+                self.h2h[(min(i, j), max(i, j))] = winner
+            else:
+                self.open.append(_OpenMatch(m.id, i, j, m.score_p1, m.score_p2, m.best_of_legs))
+
+    # --- Publieke analyse ---
+
+    def analyse(self) -> List[Dict[str, Any]]:
+        return [self._analyse_entity(e) for e in range(self.n)]
+
+    def _analyse_entity(self, e: int) -> Dict[str, Any]:
+        result = {
+            "entity_id": self.entities[e],
+            "points": self.points[e],
+            "open_matches": sum(1 for m in self.open if e in (m.i, m.j)),
+            "status": OPEN,
+            "min_wins": None,
+            "clinch_wins": None,
+            "clinch_against": [],
+        }
+
+        can_qualify = self._search(e, want_qualified=True)
+        can_fail = self._search(e, want_qualified=False)
+        if not can_fail:
+            result["status"] = QUALIFIED
+            return result
+        if not can_qualify:
+            result["status"] = ELIMINATED
+            return result
+
+        # Eigen wedstrijden: welke overwinningen zijn minimaal nodig?
+        own = [k for k, m in enumerate(self.open) if e in (m.i, m.j) and e in m.margins]
+        clinch_sets: List[Tuple[int, ...]] = []
+        for size in range(len(own) + 1):
+            for wins in itertools.combinations(own, size):
+                if any(set(found) <= set(wins) for found in clinch_sets):
+                    continue # Superset van een set die al genoeg is
+                forced = self._force_results(e, own, wins)
+                if forced is None:
+                    continue
+                if result["min_wins"] is None and self._search(e, True, forced):
+                    result["min_wins"] = size
+                if not self._search(e, False, forced):
+                    clinch_sets.append(wins)
+
+        if clinch_sets:
+            result["clinch_wins"] = min(len(s) for s in clinch_sets)
+            result["clinch_against"] = [
+                sorted(self.entities[self.open[k].other(e)] for k in wins) for wins in clinch_sets
+            ]
+        return result
+
+    def _force_results(self, e: int, own: List[int], wins: Tuple[int, ...]) -> Optional[Dict[int, int]]:
+        """Eigen wedstrijden in 'wins' gewonnen, de rest verloren (None als dat niet meer kan)."""
+        forced = {}
+        for k in own:
+            winner = e if k in wins else self.open[k].other(e)
+            if winner not in self.open[k].margins:
+                return None
+            forced[k] = winner
+        return forced
+
+    # --- Branch-and-bound ---
+
+    def _search(self, e: int, want_qualified: bool, forced: Optional[Dict[int, int]] = None) -> bool:
+        """
+        Bestaat er een afloop waarin e zeker bij de eerste 'qualifiers' eindigt (want_qualified)
+        of juist zeker niet? Bij een te grote zoekruimte antwoorden we 'ja' (alles nog mogelijk).
+        """
+        forced = forced or {}
+        # Eigen wedstrijden eerst: die beslissen het meest en geven de vroegste afkap
+        order = sorted(range(len(self.open)), key=lambda k: (e not in (self.open[k].i, self.open[k].j), k))
+        remaining = [0] * self.n
+        for m in self.open:
+            remaining[m.i] += 1
+            remaining[m.j] += 1
+
+        state = {"nodes": 0, "memo": {}, "leaf_memo": {}}
+        try:
+            return self._branch(e, want_qualified, forced, order, 0, list(self.points), remaining, {}, state)
+        except _SearchBudgetExceeded:
+            return True
+
+    def _branch(self, e, want_qualified, forced, order, depth, points, remaining, winners, state) -> bool:
+        state["nodes"] += 1
+        if state["nodes"] > MAX_SEARCH_NODES:
+            raise _SearchBudgetExceeded()
+
+        q = self.qualifiers
+        min_e, max_e = points[e], points[e] + 2 * remaining[e]
+        surely_above = sum(1 for x in range(self.n) if x != e and points[x] > max_e)
+        surely_below = sum(1 for x in range(self.n) if x != e and points[x] + 2 * remaining[x] < min_e)
+        if surely_above >= q:
+            return not want_qualified
+        if surely_below >= self.n - q:
+            return want_qualified
+
+        if depth == len(order):
+            return self._evaluate_leaf(e, want_qualified, points, winners, state)
+
+        # Alleen deelnemers die nog op gelijke punten met e kunnen eindigen zijn verder
+        # relevant; uitslagen tussen de rest tellen alleen via hun punten mee.
+        overlap = {x for x in range(self.n) if points[x] <= max_e and points[x] + 2 * remaining[x] >= min_e}
+        memo_key = (
+            depth,
+            tuple(points),
+            tuple(sorted((k, w) for k, w in winners.items() if self.open[k].i in overlap or self.open[k].j in overlap))
+        )
+        if memo_key in state["memo"]:
+            return state["memo"][memo_key]
+
+        k = order[depth]
+        match = self.open[k]
+        candidates = [forced[k]] if k in forced else list(match.margins)
+        candidates.sort(key=lambda w: self._preference(e, w, want_qualified, points))
+
+        found = False
+        remaining[match.i] -= 1
+        remaining[match.j] -= 1
+        for winner in candidates:
+            points[winner] += 2
+            winners[k] = winner
+            found = self._branch(e, want_qualified, forced, order, depth + 1, points, remaining, winners, state)
+            points[winner] -= 2
+            del winners[k]
+            if found:
+                break
+        remaining[match.i] += 1
+        remaining[match.j] += 1
+
+        state["memo"][memo_key] = found
+        return found
+
+    @staticmethod
+    def _preference(e: int, winner: int, want_qualified: bool, points: List[int]) -> int:
+        """Volgorde van proberen: eerst de uitslag die het gezochte antwoord het snelst oplevert."""
+        if winner == e:
+            return 0 if want_qualified else 1
+        distance = abs(points[winner] - points[e])
+        # Voor 'door' liefst winst voor wie ver weg staat, voor 'niet door' voor directe concurrenten
+        return -distance if want_qualified else distance
+
+    def _evaluate_leaf(self, e, want_qualified, points, winners, state) -> bool:
+        q = self.qualifiers
+        above = sum(1 for x in range(self.n) if points[x] > points[e])
+        group = [x for x in range(self.n) if points[x] == points[e]]
+        if above >= q:
+            return not want_qualified
+        if above + len(group) - 1 < q:
+            return want_qualified
+
+        # Gelijk op punten rond de grens: leg saldo en onderling resultaat beslissen
+        relevant = [k for k in winners if self.open[k].i in group or self.open[k].j in group]
+        leaf_key = (want_qualified, above, tuple(group), tuple((k, winners[k]) for k in sorted(relevant)))
+        if leaf_key in state["leaf_memo"]:
+            return state["leaf_memo"][leaf_key]
+
+        h2h = dict(self.h2h)
+        for k, winner in winners.items():
+            match = self.open[k]
+            h2h[(min(match.i, match.j), max(match.i, match.j))] = winner
+
+        found = self._search_margins(e, want_qualified, above, group, relevant, winners, h2h)
+        state["leaf_memo"][leaf_key] = found
+        return found
+
+    def _search_margins(self, e, want_qualified, above, group, relevant, winners, h2h) -> bool:
+        """
+        Zoekt over de legstanden van de wedstrijden binnen de groep (gelijk op punten).
+        Gememoïseerd op het tussentijdse saldo, met afkap zodra het saldo al beslist.
+        """
+        q = self.qualifiers
+        pos = {x: idx for idx, x in enumerate(group)}
+        steps = []
+        for k in relevant:
+            winner = winners[k]
+            loser = self.open[k].other(winner)
+            steps.append((pos.get(winner), pos.get(loser), self.open[k].margins[winner]))
+
+        # Nog haalbare saldo-wijziging per groepslid vanaf elke stap (voor de afkap)
+        low = [[0] * len(group) for _ in range(len(steps) + 1)]
+        high = [[0] * len(group) for _ in range(len(steps) + 1)]
+        for idx in range(len(steps) - 1, -1, -1):
+            w, l, margins = steps[idx]
+            low[idx], high[idx] = list(low[idx + 1]), list(high[idx + 1])
+            if w is not None:
+                low[idx][w] += margins[0]
+                high[idx][w] += margins[-1]
+            if l is not None:
+                low[idx][l] -= margins[-1]
+                high[idx][l] -= margins[0]
+
+        me = pos[e]
+        seen = set()
+
+        def branch(idx: int, diff: List[int]) -> bool:
+            key = (idx, tuple(diff))
+            if key in seen:
+                return False # Deze tussenstand leverde eerder al niets op
+            seen.add(key)
+
+            e_low, e_high = diff[me] + low[idx][me], diff[me] + high[idx][me]
+            if want_qualified:
+                surely_above = sum(1 for x in range(len(group)) if x != me and diff[x] + low[idx][x] > e_high)
+                if above + surely_above >= q:
+                    return False
+            else:
+                surely_below = sum(1 for x in range(len(group)) if x != me and diff[x] + high[idx][x] < e_low)
+                if above + len(group) - 1 - surely_below < q:
+                    return False
+
+            if idx == len(steps):
+                best, worst = _rank_range(e, above, group, dict(zip(group, diff)), h2h)
+                return best < q if want_qualified else worst >= q
+
+            w, l, margins = steps[idx]
+            for margin in margins:
+                nxt = list(diff)
+                if w is not None:
+                    nxt[w] += margin
+                if l is not None:
+                    nxt[l] -= margin
+                if branch(idx + 1, nxt):
+                    return True
+            return False
+
+        return branch(0, [self.leg_diff[x] for x in group])
+
+
+def _rank_range(e: int, above: int, group: List[int], diff: Dict[int, int], h2h: Dict[Tuple[int, int], int]) -> Tuple[int, int]:
+    """Beste en slechtste eindpositie (0 = eerste) binnen een groep met gelijke punten."""
+    rank = above + sum(1 for x in group if diff[x] > diff[e])
+    tied = [x for x in group if diff[x] == diff[e]]
+
+    # Onderling resultaat binnen de groep met gelijk saldo; gelijk aantal onderlinge zeges = shoot-out
+    def h2h_wins(x: int) -> int:
+        return sum(1 for y in tied if y != x and h2h.get((min(x, y), max(x, y))) == x)
+
+    own = h2h_wins(e)
+    better = sum(1 for x in tied if x != e and h2h_wins(x) > own)
+    shootout = sum(1 for x in tied if x != e and h2h_wins(x) == own)
+    return rank + better, rank + better + shootout
+
+
+def poule_scenarios(tournament: Tournament, matches: List[Match], poule_number: int) -> List[Dict[str, Any]]:
+    """
+    Per deelnemer van de poule: 'qualified' (zeker door), 'eliminated' (kan niet meer)
+    of 'open', met het minimaal aantal zeges om nog door te kunnen (min_wins) en de
+    minimale sets tegenstanders die je moet verslaan om zeker door te zijn (clinch_against).
+    """
+    is_doubles = tournament.mode == "doubles"
+    poule_matches = [m for m in matches if m.poule_number == poule_number]
+    entities = sorted({e for m in poule_matches for e in _participants(m, is_doubles) if e})
+    qualifiers = tournament.qualifiers_per_poule or 2
+    return PouleScenarios(entities, poule_matches, is_doubles, qualifiers).analyse()
@@ -0,0 +1,223 @@
+import bisect
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from app.models.match import Match
+from app.models.tournament import Tournament
+from app.models.player import Player
+from app.models.team import Team
+from app.models.links import TeamPlayerLink, TournamentTeamLink
+from app.services.change_feed import LIVE_MATCH_FIELDS, register_commit_listener
+
+# ==========================================
+# INDEX: DEELNEMER -> OPENSTAANDE WEDSTRIJDEN
+# ==========================================
+# Per toernooi houden we in het geheugen bij welke wedstrijden nog open staan,
+# per deelnemer en per bord (op id gesorteerd, zelfde volgorde als de scorer tablets).
+# De index wordt na elke commit bijgewerkt via de change feed; bij twijfel
+# (set-based wijzigingen of een ander volgnummer) bouwen we hem opnieuw op.
+
+# Grove schatting voor de ETA; telemetrie kan dit later verfijnen
+MINUTES_PER_LEG = 4.0
+
+Participant = Tuple[str, int] # ("player", id) of ("team", id)
+
+
+def expected_legs(best_of_legs: Optional[int]) -> float:
+    """Gemiddeld aantal gespeelde legs in een best-of-N (niet elke wedstrijd gaat de volle afstand)."""
+    best_of = best_of_legs or 1
+    return max(1.0, 0.8 * best_of)
+
+
+def estimate_match_minutes(match: Dict[str, Any]) -> float:
+    played = (match.get("score_p1") or 0) + (match.get("score_p2") or 0)
+    remaining = max(expected_legs(match.get("best_of_legs")) - played, 1.0)
+    return remaining * MINUTES_PER_LEG
+
+
+def _participants(match: Dict[str, Any]) -> List[Participant]:
+    result = []
+    for key in ("player1_id", "player2_id"):
+        if match.get(key):
+            result.append(("player", match[key]))
+    for key in ("team1_id", "team2_id"):
+        if match.get(key):
+            result.append(("team", match[key]))
+    return result
+
+
+class TournamentSchedule:
+    def __init__(self, seq: int):
+        self.seq = seq
+        self.matches: Dict[int, Dict[str, Any]] = {}
+        self.by_participant: Dict[Participant, List[int]] = {}
+        self.by_board: Dict[int, List[int]] = {}
+
+    def upsert(self, match: Dict[str, Any]) -> None:
+        self.remove(match["id"])
+        if match.get("is_completed"):
+            return
+
+        match_id = match["id"]
+        self.matches[match_id] = match
+        for participant in _participants(match):
+            bisect.insort(self.by_participant.setdefault(participant, []), match_id)
+        if match.get("board_number") is not None:
+            bisect.insort(self.by_board.setdefault(match["board_number"], []), match_id)
+
+    def remove(self, match_id: int) -> None:
+        old = self.matches.pop(match_id, None)
+        if old is None:
+            return
+        for participant in _participants(old):
+            _discard_sorted(self.by_participant.get(participant), match_id)
+        if old.get("board_number") is not None:
+            _discard_sorted(self.by_board.get(old["board_number"]), match_id)
+
+    def next_for(self, participant: Participant) -> Optional[Dict[str, Any]]:
+        pending = self.by_participant.get(participant)
+        if not pending:
+            return None
+
+        match = self.matches[pending[0]]
+        board = match.get("board_number")
+        if board is None:
+            return {"match": match, "board_number": None, "queue_position": None,
+                    "matches_ahead": None, "estimated_start": None}
+
+        board_queue = self.by_board.get(board, [])
+        position = bisect.bisect_left(board_queue, match["id"])
+        minutes = sum(estimate_match_minutes(self.matches[mid]) for mid in board_queue[:position])
+
+        return {
+            "match": match,
+            "board_number": board,
+            "queue_position": position, # 0 = nu aan de beurt
+            "matches_ahead": position,
+            "estimated_start": datetime.utcnow() + timedelta(minutes=minutes),
+        }
+
+
+def _discard_sorted(items: Optional[List[int]], value: int) -> None:
+    if not items:
+        return
+    idx = bisect.bisect_left(items, value)
+    if idx < len(items) and items[idx] == value:
+        items.pop(idx)
+
+
+class ScheduleIndex:
+    def __init__(self):
+        self._schedules: Dict[int, TournamentSchedule] = {}
+        self._lock = threading.Lock()
+
+    def get(self, session: Session, tournament: Tournament) -> TournamentSchedule:
+        """Geeft de index terug; bouwt hem (opnieuw) op als het volgnummer niet klopt."""
+        with self._lock:
+            schedule = self._schedules.get(tournament.id)
+            if schedule is not None and schedule.seq == tournament.change_seq:
+                return schedule
+
+        schedule = self._build(session, tournament)
+        with self._lock:
+            self._schedules[tournament.id] = schedule
+        return schedule
+
+    def next_for(self, session: Session, tournament: Tournament, participant: Participant) -> Optional[Dict[str, Any]]:
+        """
+        TournamentSchedule.next_for onder de lock: apply_changes (commit listener, andere thread)
+        past dezelfde dicts en lijsten ter plekke aan. De match dicts zelf worden nooit gewijzigd
+        (upsert zet een nieuwe dict neer), dus het resultaat mag buiten de lock gebruikt worden.
+        """
+        schedule = self.get(session, tournament)
+        with self._lock:
+            return schedule.next_for(participant)
+
+    def _build(self, session: Session, tournament: Tournament) -> TournamentSchedule:
+        rows = session.exec(
+            select(*[getattr(Match, f) for f in LIVE_MATCH_FIELDS])
+            .where(Match.tournament_id == tournament.id)
+            .where(Match.is_completed == False)
+        ).all()
+
+        schedule = TournamentSchedule(tournament.change_seq)
+        for row in rows:
+            schedule.upsert(dict(zip(LIVE_MATCH_FIELDS, row)))
+        return schedule
+
+    def apply_changes(self, tournament_id: int, change_event: Dict[str, Any]) -> None:
+        """Commit listener: verwerkt een 'changes' event uit de change feed."""
+        with self._lock:
+            schedule = self._schedules.get(tournament_id)
+            if schedule is None:
+                return
+            if change_event["seq"] <= schedule.seq:
+                return # Index is al nieuwer (opnieuw opgebouwd)
+            if change_event.get("partial") or change_event.get("first_seq", change_event["seq"]) != schedule.seq + 1:
+                # Set-based wijziging (inhoud onbekend) of een gat: een eerdere commit is nog
+                # niet binnen (after_commit callbacks kunnen elkaar inhalen). Bij de volgende
+                # lookup opnieuw opbouwen, anders raken we die wijziging kwijt.
+                del self._schedules[tournament_id]
+                return
+
+            for match_id in change_event.get("deleted", []):
+                schedule.remove(match_id)
+            for match in change_event.get("matches", []):
+                schedule.upsert(match)
+            schedule.seq = change_event["seq"]
+
+    def invalidate(self, tournament_id: int) -> None:
+        with self._lock:
+            self._schedules.pop(tournament_id, None)
+
+
+schedule_index = ScheduleIndex()
+register_commit_listener(schedule_index.apply_changes)
+
+
+def find_next_match(session: Session, tournament: Tournament, player_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Volgende wedstrijd van een speler (singles) of diens team (doubles) in dit toernooi,
+    met bord, plek in de wachtrij en geschatte starttijd. None als er niets meer open staat.
+    """
+    participant: Participant = ("player", player_id)
+    if tournament.mode == "doubles":
+        team_id = session.exec(
+            select(TeamPlayerLink.team_id)
+            .join(TournamentTeamLink, TournamentTeamLink.team_id == TeamPlayerLink.team_id)
+            .where(TeamPlayerLink.player_id == player_id)
+            .where(TournamentTeamLink.tournament_id == tournament.id)
+        ).first()
+        if team_id is None:
+            return None
+        participant = ("team", team_id)
+
+    result = schedule_index.next_for(session, tournament, participant)
+    if result is None:
+        return None
+
+    match = result["match"]
+    entity_type, entity_id = participant
+    model = Team if entity_type == "team" else Player
+    id_1, id_2 = match.get(f"{entity_type}1_id"), match.get(f"{entity_type}2_id")
+    names = {
+        e.id: e.name for e in session.exec(select(model).where(model.id.in_([i for i in (id_1, id_2) if i])))
+    }
+
+    return {
+        "tournament_id": tournament.id,
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "match_id": match["id"],
+        "round_number": match["round_number"],
+        "poule_number": match["poule_number"],
+        "player1_name": names.get(id_1, "Bye"),
+        "player2_name": names.get(id_2, "Bye"),
+        "board_number": result["board_number"],
+        "queue_position": result["queue_position"],
+        "matches_ahead": result["matches_ahead"],
+        "estimated_start": result["estimated_start"],
+    }
@@ -0,0 +1,371 @@
+import functools
+import math
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.match import Match
+
+# ==========================================
+# VOLGORDE VAN POULEWEDSTRIJDEN (RUST TUSSEN WEDSTRIJDEN)
+# ==========================================
+# De circle method levert rondes op, maar op één bord (of bij gedeelde borden in het
+# overflow scenario) speelt iemand zo soms twee keer achter elkaar terwijl een ander lang
+# stilzit. Deze stap zet de wedstrijden in een volgorde met zoveel mogelijk rust:
+#
+# - Een "groep" is een set wedstrijden die samen een wachtrij vormen met 'capacity' borden
+#   tegelijk: bij vaste borden één groep per poule (capacity 1), in het overflow scenario
+#   alle poules samen (capacity = aantal borden, bord = positie % aantal borden).
+# - Positie p in de groep speelt in 'slot' p // capacity (alle wedstrijden even lang).
+# - Eerst een gulzige opbouw (langst uitgeruste spelers eerst; een slot wordt eerst gevuld met
+#   wedstrijden van spelers die het vorige slot niet speelden), daarna local search met
+#   swaps die de strafpunten per speler verlaagt: korte rust weegt exponentieel zwaarder
+#   (maximin), tegelijk op twee borden is verboden, en per poule mogen er niet meer
+#   wedstrijden tegelijk zijn dan er schrijvers uit die poule over zijn (size // 3).
+#
+# Het resultaat hangt alleen af van de 'vorm' van de groep (paren per poule + capacity),
+# dus het wordt per vorm gecachet: 64 poules van 7 rekenen één keer. De zoektocht is
+# begrensd in zetten (niet in tijd), zodat dezelfde vorm altijd dezelfde volgorde geeft.
+
+# Zetten per nieuwe groepsvorm: één per wedstrijd, minimaal TEMPLATE_MIN_MOVES.
+# Een zet kost ~10-20 µs, ongeacht de grootte (1344 wedstrijden: ~60 ms in totaal).
+TEMPLATE_MOVES_PER_MATCH = 1
+TEMPLATE_MIN_MOVES = 1_000
+STALL_MOVES = 400 # Zoveel zetten zonder verbetering: stoppen
+ORDER_SEED = 17
+
+REST_BASE = 8 # Eén slot minder rust weegt 8x zo zwaar
+CLASH_PENALTY = 10 ** 12 # Speler tegelijk op twee borden
+REFEREE_PENALTY = 10 ** 9 # Meer wedstrijden tegelijk dan er schrijvers uit de poule zijn
+
+
+def match_entities(match: Match, is_doubles: bool) -> Tuple[Optional[int], Optional[int]]:
+    if is_doubles:
+        return match.team1_id, match.team2_id
+    return match.player1_id, match.player2_id
+
+
+def _groups(matches: List[Match], board_numbers: List[int], num_poules: int) -> List[Tuple[List[List[Match]], int]]:
+    """Deelt de wedstrijden op in wachtrij-groepen: [(wedstrijden per poule, capacity)]."""
+    by_poule: Dict[Optional[int], List[Match]] = {}
+    for m in matches:
+        by_poule.setdefault(m.poule_number, []).append(m)
+    poules = [by_poule[p] for p in sorted(by_poule, key=lambda p: (p is not None, p or 0))]
+
+    if len(board_numbers) > num_poules:
+        # Overflow: de borden worden dynamisch over alle poules verdeeld
+        return [(poules, len(board_numbers))]
+    return [([pm], 1) for pm in poules]
+
+
+def _group_key(poules: List[List[Match]], is_doubles: bool) -> Tuple[Tuple[Tuple[int, int], ...], ...]:
+    """Vorm van een groep: per poule de paren in lokale nummering (volgorde van eerste optreden)."""
+    key = []
+    for pm in poules:
+        local: Dict[Any, int] = {}
+        pairs = []
+        for m in pm:
+            a, b = match_entities(m, is_doubles)
+            # Een lege plek (None) krijgt een eigen nummer, zodat hij nergens mee botst
+            a = local.setdefault(a if a is not None else ("bye", m.id, 1), len(local))
+            b = local.setdefault(b if b is not None else ("bye", m.id, 2), len(local))
+            pairs.append((a, b))
+        key.append(tuple(pairs))
+    return tuple(key)
+
+
+def schedule_slots(matches: List[Match], board_numbers: List[int], num_poules: int) -> List[int]:
+    """Slot van elke wedstrijd in de huidige volgorde (zelfde indeling in groepen als order_matches)."""
+    slot_of: Dict[int, int] = {}
+    for poules, capacity in _groups(matches, board_numbers, num_poules):
+        if capacity > 1:
+            flat = sorted((m for pm in poules for m in pm), key=lambda m: (m.round_number, m.poule_number))
+        else:
+            flat = poules[0]
+        for pos, m in enumerate(flat):
+            slot_of[id(m)] = pos // capacity
+    return [slot_of[id(m)] for m in matches]
+
+
+class _OrderSearch:
+    """Greedy + local search op een abstracte groep (spelers zijn 0..n-1)."""
+
+    def __init__(self, poules: Tuple[Tuple[Tuple[int, int], ...], ...], capacity: int):
+        self.capacity = capacity
+        self.match_players: List[Tuple[int, int]] = []
+        self.match_poule: List[int] = []
+        self.poule_matches: List[List[int]] = []
+        self.limits: List[int] = []
+        offset = 0
+        for p, pairs in enumerate(poules):
+            size = 1 + max(max(pair) for pair in pairs)
+            self.poule_matches.append(list(range(len(self.match_players), len(self.match_players) + len(pairs))))
+            for a, b in pairs:
+                self.match_players.append((offset + a, offset + b))
+                self.match_poule.append(p)
+            # Elke wedstrijd bindt twee spelers en een schrijver uit de eigen poule
+            self.limits.append(max(1, size // 3) if capacity > 1 else capacity)
+            offset += size
+
+        self.n_players = offset
+        self.n_matches = len(self.match_players)
+        self.n_slots = math.ceil(self.n_matches / capacity)
+        self.player_matches: List[List[int]] = [[] for _ in range(self.n_players)]
+        for m, (a, b) in enumerate(self.match_players):
+            self.player_matches[a].append(m)
+            self.player_matches[b].append(m)
+        # Streefrust: gelijkmatig verdeeld over alle slots (direct doorspelen telt altijd)
+        self.target = [
+            max(1, self.n_slots // len(ms) - 1) if ms else 0
+            for ms in self.player_matches
+        ]
+        self.rest_penalty = [REST_BASE ** k - 1 for k in range(max(self.target, default=0) + 1)]
+
+    # --- Opbouw ---
+
+    def greedy(self) -> List[int]:
+        remaining = [list(ms) for ms in self.poule_matches]
+        placed = [0] * len(remaining)
+        last = [-self.n_slots - 1] * self.n_players
+        left = [len(ms) for ms in self.player_matches]
+        seq: List[int] = []
+        slot = 0
+
+        def place(m: int, busy: set) -> None:
+            a, b = self.match_players[m]
+            remaining[self.match_poule[m]].remove(m)
+            placed[self.match_poule[m]] += 1
+            seq.append(m)
+            busy.update((a, b))
+            last[a] = last[b] = slot
+            left[a] -= 1
+            left[b] -= 1
+
+        while len(seq) < self.n_matches:
+            busy: set = set()
+            used = 0
+            # Poules die achterlopen eerst, zodat ze gelijk opschieten
+            order = sorted(
+                (p for p in range(len(remaining)) if remaining[p]),
+                key=lambda p: (placed[p] / len(self.poule_matches[p]), p)
+            )
+            # Per ronde één wedstrijd per poule, zodat de borden over alle poules verdeeld worden.
+            # Eerst alleen spelers die het vorige slot vrij waren (min_gap 2); wat dan nog leeg
+            # is mag met direct doorspelen (anders dwingt elke poule zich elk slot naar binnen)
+            taken = [0] * len(remaining)
+            for min_gap in (2, 1):
+                for _ in range(max(self.limits)):
+                    for p in order:
+                        if used >= self.capacity:
+                            break
+                        if taken[p] >= self.limits[p] or not remaining[p]:
+                            continue
+                        best, best_key = None, None
+                        for m in remaining[p]:
+                            a, b = self.match_players[m]
+                            if a in busy or b in busy:
+                                continue
+                            gap = min(slot - last[a], slot - last[b])
+                            if gap < min_gap:
+                                continue
+                            key = (gap, left[a] + left[b])
+                            if best_key is None or key > best_key:
+                                best, best_key = m, key
+                        if best is not None:
+                            place(best, busy)
+                            used += 1
+                            taken[p] += 1
+
+            # Slot niet vol te krijgen zonder botsing: toch vullen, de local search lost het op
+            for p in order:
+                while used < self.capacity and remaining[p]:
+                    place(remaining[p][0], busy)
+                    used += 1
+            slot += 1
+        return seq
+
+    # --- Kosten ---
+
+    def _player_cost(self, player: int, pos: List[int]) -> int:
+        capacity = self.capacity
+        slots = sorted([pos[m] // capacity for m in self.player_matches[player]])
+        target = self.target[player]
+        cost = 0
+        for x, y in zip(slots, slots[1:]):
+            gap = y - x - 1
+            if gap < 0:
+                cost += CLASH_PENALTY
+            elif gap < target:
+                cost += self.rest_penalty[target - gap]
+        return cost
+
+    def _referee_cost(self, counts: List[List[int]], slot: int, poule: int) -> int:
+        return REFEREE_PENALTY * max(0, counts[slot][poule] - self.limits[poule])
+
+    def _swap_referee_cost(self, counts: List[List[int]], si: int, sj: int, pa: int, pb: int) -> int:
+        """Schrijverskosten van de twee slots en twee poules die een zet raakt."""
+        la, lb = self.limits[pa], self.limits[pb]
+        ci, cj = counts[si], counts[sj]
+        excess = max(0, ci[pa] - la) + max(0, cj[pa] - la) + max(0, ci[pb] - lb) + max(0, cj[pb] - lb)
+        return REFEREE_PENALTY * excess
+
+    # --- Local search ---
+
+    def improve(self, seq: List[int]) -> List[int]:
+        capacity = self.capacity
+        pos = [0] * self.n_matches
+        for i, m in enumerate(seq):
+            pos[m] = i
+        costs = [self._player_cost(p, pos) for p in range(self.n_players)]
+        counts = [[0] * len(self.poule_matches) for _ in range(self.n_slots)]
+        for i, m in enumerate(seq):
+            counts[i // capacity][self.match_poule[m]] += 1
+        total = sum(costs) + sum(
+            self._referee_cost(counts, s, p) for s in range(self.n_slots) for p in range(len(self.poule_matches))
+        )
+
+        rng = random.Random(ORDER_SEED)
+        window = 3 * capacity
+        last_improvement = 0
+        hot: List[int] = []
+        max_moves = max(TEMPLATE_MIN_MOVES, TEMPLATE_MOVES_PER_MATCH * self.n_matches)
+        for move in range(max_moves):
+            if total == 0 or move - last_improvement > STALL_MOVES:
+                break
+            if move & 63 == 0:
+                # Wedstrijden van de spelers met (bijna) de meeste strafpunten: daar valt het meeste te winnen
+                threshold = max(1, max(costs) // REST_BASE)
+                hot = [m for p in range(self.n_players) if costs[p] >= threshold for m in self.player_matches[p]]
+
+            i = pos[rng.choice(hot)] if hot and move & 2 else rng.randrange(self.n_matches)
+            if move & 1:
+                j = min(self.n_matches - 1, max(0, i + rng.randint(-window, window)))
+            else:
+                j = rng.randrange(self.n_matches)
+            si, sj = i // capacity, j // capacity
+            if si == sj:
+                continue
+
+            ma, mb = seq[i], seq[j]
+            pa, pb = self.match_poule[ma], self.match_poule[mb]
+            players = set(self.match_players[ma] + self.match_players[mb])
+            before = sum(costs[p] for p in players)
+            if pa != pb:
+                before += self._swap_referee_cost(counts, si, sj, pa, pb)
+
+            seq[i], seq[j] = mb, ma
+            pos[ma], pos[mb] = j, i
+            if pa != pb:
+                counts[si][pa] -= 1
+                counts[sj][pa] += 1
+                counts[sj][pb] -= 1
+                counts[si][pb] += 1
+
+            new_costs = {p: self._player_cost(p, pos) for p in players}
+            after = sum(new_costs.values())
+            if pa != pb:
+                after += self._swap_referee_cost(counts, si, sj, pa, pb)
+
+            if after <= before:
+                # Ook gelijke kosten accepteren: zo loopt de zoektocht over plateaus heen
+                for p, c in new_costs.items():
+                    costs[p] = c
+                total += after - before
+                if after < before:
+                    last_improvement = move
+                continue
+
+            seq[i], seq[j] = ma, mb
+            pos[ma], pos[mb] = i, j
+            if pa != pb:
+                counts[si][pa] += 1
+                counts[sj][pa] -= 1
+                counts[sj][pb] += 1
+                counts[si][pb] -= 1
+        return seq
+
+
+@functools.lru_cache(maxsize=128)
+def _order_template(poules: Tuple[Tuple[Tuple[int, int], ...], ...], capacity: int) -> Tuple[int, ...]:
+    """Volgorde (indexen in de platte lijst van de groep) voor een groepsvorm."""
+    if not any(poules):
+        return ()
+    search = _OrderSearch(poules, capacity)
+    return tuple(search.improve(search.greedy()))
+
+
+def order_matches(
+    matches: List[Match],
+    board_numbers: List[int],
+    num_poules: int,
+    is_doubles: bool
+) -> Tuple[List[Match], List[int]]:
+    """
+    Zet de (al op een bord gezette) poulewedstrijden in een rustvriendelijke volgorde.
+    Geeft de nieuwe volgorde terug (= volgorde van opslaan, dus van de wachtrij per bord)
+    plus het slot van elke wedstrijd. In het overflow scenario worden de borden opnieuw
+    cyclisch verdeeld, zoals assign_poule_boards dat doet.
+    """
+    ordered: List[Match] = []
+    slots: List[int] = []
+    for poules, capacity in _groups(matches, board_numbers, num_poules):
+        flat = [m for pm in poules for m in pm]
+        template = _order_template(_group_key(poules, is_doubles), capacity)
+        for pos, index in enumerate(template):
+            m = flat[index]
+            if capacity > 1:
+                m.board_number = board_numbers[pos % capacity]
+            ordered.append(m)
+            slots.append(pos // capacity)
+    return ordered, slots
+
+
+def schedule_quality(matches: List[Match], slots: List[int], is_doubles: bool) -> Dict[str, Any]:
+    """
+    Kwaliteit van een schema: rust (in wedstrijden) tussen twee eigen wedstrijden,
+    botsingen, en hoe eerlijk de schrijfbeurten per poule verdeeld zijn.
+    """
+    # Eén keer de attributen lezen (ORM attributen zijn relatief duur)
+    rows = [
+        (*match_entities(m, is_doubles), m.poule_number, m.referee_team_id if is_doubles else m.referee_id, slot)
+        for m, slot in zip(matches, slots)
+    ]
+
+    playing: Dict[Any, List[int]] = {}
+    members: Dict[Optional[int], set] = {}
+    for a, b, poule, _, slot in rows:
+        for entity in (a, b):
+            if entity is not None:
+                playing.setdefault(entity, []).append(slot)
+                members.setdefault(poule, set()).add(entity)
+
+    rests: List[int] = []
+    clashes = 0
+    for entity_slots in playing.values():
+        entity_slots.sort()
+        for x, y in zip(entity_slots, entity_slots[1:]):
+            if y == x:
+                clashes += 1
+            else:
+                rests.append(y - x - 1)
+
+    duties: Dict[Optional[int], Dict[int, int]] = {}
+    referee_clashes = 0
+    refereeing: set = set()
+    for _, _, poule, referee, slot in rows:
+        if referee is None:
+            continue
+        poule_duties = duties.setdefault(poule, dict.fromkeys(members.get(poule, ()), 0))
+        poule_duties[referee] = poule_duties.get(referee, 0) + 1
+        if slot in playing.get(referee, ()) or (referee, slot) in refereeing:
+            referee_clashes += 1
+        refereeing.add((referee, slot))
+
+    spread = max((max(d.values()) - min(d.values()) for d in duties.values() if d), default=0)
+    return {
+        "min_rest": min(rests) if rests else None,
+        "avg_rest": sum(rests) / len(rests) if rests else None,
+        "back_to_back": sum(1 for r in rests if r == 0),
+        "clashes": clashes,
+        "referee_spread": spread,
+        "referee_clashes": referee_clashes,
+    }
@@ -0,0 +1,147 @@
+from datetime import datetime, timezone
+from typing import Optional
+from sqlmodel import Session
+from sqlalchemy import update
+
+from app.models.match import Match
+from app.schemas.match import MatchScoreUpdate
+
+
+class ScoreValidationError(ValueError):
+    """Onmogelijke score (wordt in de API een 400)."""
+
+
+class MatchNotFoundError(LookupError):
+    """Wedstrijd bestaat niet (wordt in de API een 404)."""
+
+
+class VersionConflictError(Exception):
+    """Client stuurde een verouderde versie mee (wordt in de API een 409 met de actuele stand)."""
+
+    def __init__(self, match_id: int):
+        super().__init__("Match is intussen door iemand anders gewijzigd")
+        self.match_id = match_id
+
+
+def check_version(match: Match, expected_version: Optional[int]) -> None:
+    """
+    Compare-and-set, deel 1: klopt de meegestuurde versie niet, dan meteen een conflict.
+    Deel 2 (iemand schrijft tussen ons lezen en schrijven) doet de ORM zelf via
+    'UPDATE ... WHERE version=?' en geeft dan een StaleDataError.
+    Clients die (nog) geen versie meesturen, schrijven zoals vroeger.
+    """
+    if expected_version is not None and expected_version != match.version:
+        raise VersionConflictError(match.id)
+
+
+def apply_score_update(match: Match, match_in: MatchScoreUpdate, at: Optional[datetime] = None) -> None:
+    """
+    Valideert en zet de score op het Match object (zonder commit).
+    Gedeeld door de directe route en de write-queue.
+    'at' is het moment van de update (offline sync: tijdstip op de tablet), standaard nu.
+    """
+    check_version(match, match_in.version)
+
+    # --- VALIDATION LOGIC --- 
+    if match.best_of_legs:
+        limit = match.best_of_legs
+        winning_threshold = (limit // 2) + 1
+        
+        # 1. Validate Total Legs
+        if match_in.score_p1 + match_in.score_p2 > limit:
+            raise ScoreValidationError(
+                f"Impossible score: Total legs ({match_in.score_p1 + match_in.score_p2}) cannot exceed Best of {limit}."
+            )
+
+        # 2. Validate Individual Score
+        if match_in.score_p1 > winning_threshold or match_in.score_p2 > winning_threshold:
+            raise ScoreValidationError(
+                f"Impossible score: A player cannot win more than {winning_threshold} legs in a Best of {limit} match."
+            )
+
+        # 3. Auto-Complete Logic
+        if match_in.score_p1 == winning_threshold or match_in.score_p2 == winning_threshold:
+            match.is_completed = True
+        else:
+            match.is_completed = False
+
+    # Apply updates
+    # We updaten de scores altijd
+    match.score_p1 = match_in.score_p1
+    match.score_p2 = match_in.score_p2
+    
+    # --- FIX: Gebruik model_dump(exclude_unset=True) ---
+    # Dit zorgt ervoor dat we alleen velden updaten die expliciet zijn meegestuurd.
+    # Als de tablet géén referee_id stuurt, wordt deze dus ook NIET overschreven met None.
+    update_data = match_in.model_dump(exclude_unset=True)
+
+    if "referee_id" in update_data:
+        match.referee_id = update_data["referee_id"]
+    
+    if "referee_team_id" in update_data:
+        match.referee_team_id = update_data["referee_team_id"]
+
+    if "custom_referee_name" in update_data:
+        match.custom_referee_name = update_data["custom_referee_name"]
+
+    if not match.best_of_legs:
+        match.is_completed = match_in.is_completed
+
+    record_timing(match, to_utc(at) if at else datetime.utcnow())
+
+
+def to_utc(at: datetime) -> datetime:
+    """Tijdstippen van tablets kunnen een tijdzone hebben; we slaan naïeve UTC op."""
+    if at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    return at
+
+
+def record_timing(match: Match, at: datetime) -> None:
+    """Zet started_at/completed_at bij een score-update (voor de analytics)."""
+    if match.started_at is None:
+        # Geen startmelding van de tablet gehad: de eerste score is het beste wat we weten
+        match.started_at = at
+    if match.called_at is None:
+        match.called_at = match.started_at
+    if match.is_completed and match.completed_at is None:
+        match.completed_at = max(at, match.started_at)
+    elif not match.is_completed:
+        match.completed_at = None # Uitslag heropend
+
+
+def mark_match_called(session: Session, match_id: int, at: Optional[datetime] = None) -> bool:
+    """
+    Zet called_at (alleen de eerste keer). Set-based en zonder versie-ophoging:
+    een tijdstempel mag de versie van de tablet niet ongeldig maken. Commit niet.
+    """
+    result = session.exec(
+        update(Match)
+        .where(Match.id == match_id)
+        .where(Match.called_at.is_(None))
+        .values(called_at=to_utc(at) if at else datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    return bool(result.rowcount)
+
+
+def mark_match_started(session: Session, match_id: int, at: Optional[datetime] = None) -> bool:
+    """Zet started_at (en zo nodig called_at) bij de startmelding van de tablet. Commit niet."""
+    at = to_utc(at) if at else datetime.utcnow()
+    mark_match_called(session, match_id, at)
+    result = session.exec(
+        update(Match)
+        .where(Match.id == match_id)
+        .where(Match.started_at.is_(None))
+        .where(Match.is_completed == False)
+        .values(started_at=at)
+        .execution_options(synchronize_session=False)
+    )
+    return bool(result.rowcount)
+
+
+def load_match_for_update(session: Session, match_id: int) -> Match:
+    match: Optional[Match] = session.get(Match, match_id)
+    if not match:
+        raise MatchNotFoundError("Match not found")
+    return match
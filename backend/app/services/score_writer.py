@@ -0,0 +1,171 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import List, Optional, Tuple
+
+from sqlmodel import Session
+
+from app.db.session import engine
+from app.schemas.match import MatchRead, MatchScoreUpdate
+from app.services.score_service import (
+    MatchNotFoundError,
+    ScoreValidationError,
+    VersionConflictError,
+    apply_score_update,
+    load_match_for_update
+)
+
+logger = logging.getLogger("dart_app")
+
+# ==========================================
+# SINGLE-WRITER QUEUE VOOR SCORES (OPTIONEEL)
+# ==========================================
+# SQLite kan maar één schrijver tegelijk aan. Met veel tablets tegelijk geeft dat
+# 'database is locked' fouten. Met SCORE_WRITE_QUEUE=true zetten de endpoints hun
+# score in een wachtrij; één thread verwerkt ze in batches (één commit per batch).
+
+_STOP = object()
+
+QueueItem = Tuple[int, MatchScoreUpdate, Future]
+
+# Fouten die alleen het eigen item raken; de rest van de batch gaat gewoon door
+SCORE_INPUT_ERRORS = (ScoreValidationError, MatchNotFoundError, VersionConflictError)
+
+RETRY_AFTER_SECONDS = 2
+
+
+class ScoreQueueTimeoutError(Exception):
+    """
+    Geen antwoord van de writer binnen de timeout (wordt in de API een 503 met Retry-After).
+    'written' is False als het item nog in de wachtrij stond en is geannuleerd: de score is
+    dan zeker niet opgeslagen. Anders was de writer er al mee bezig en kan hij alsnog landen.
+    """
+
+    def __init__(self, written: bool):
+        if written:
+            message = "De score wordt nog verwerkt. Controleer de stand voordat je opnieuw verstuurt."
+        else:
+            message = "De score-wachtrij is overbelast; de score is niet opgeslagen. Probeer het opnieuw."
+        super().__init__(message)
+        self.written = written
+        self.retry_after = RETRY_AFTER_SECONDS
+
+
+class ScoreWriter:
+    def __init__(self):
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self.batch_size = 20
+        self.batch_wait = 0.005
+        self.enabled = False
+
+    def start(self, batch_size: int = 20, batch_wait_ms: int = 5) -> None:
+        if self._thread is not None:
+            return
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = max(0, batch_wait_ms) / 1000
+        self._thread = threading.Thread(target=self._run, name="score-writer", daemon=True)
+        self._thread.start()
+        self.enabled = True
+        logger.info("Score write-queue gestart")
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self.enabled = False
+        self._queue.put(_STOP)
+        self._thread.join(timeout=10)
+        self._thread = None
+
+    def submit(self, match_id: int, match_in: MatchScoreUpdate, timeout: float = 30) -> MatchRead:
+        """Zet de score in de wachtrij en wacht op het eigen resultaat (of de eigen fout)."""
+        future: Future = Future()
+        self._queue.put((match_id, match_in, future))
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # Nog niet opgepakt: annuleren, dan slaat de writer hem over
+            raise ScoreQueueTimeoutError(written=not future.cancel())
+
+    # --- Writer thread ---
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            batch: List[QueueItem] = [item]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    nxt = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    stopping = True
+                    break
+                batch.append(nxt)
+
+            # Geannuleerde items (caller kreeg al een timeout) overslaan; de rest kan
+            # vanaf nu niet meer geannuleerd worden
+            batch = [entry for entry in batch if entry[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                self._process(batch)
+            except Exception as e:
+                # Zou niet moeten gebeuren, maar callers mogen nooit blijven hangen
+                logger.exception("Score write-queue: batch mislukt")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _process(self, batch: List[QueueItem]) -> None:
+        try:
+            self._write(batch)
+        except Exception:
+            # Flush/commit van de batch faalde: los verwerken zodat alleen de schuldige een fout krijgt
+            if len(batch) == 1:
+                raise
+            for item in batch:
+                if item[2].done():
+                    continue # Al beantwoord (bijv. validatiefout)
+                try:
+                    self._write([item])
+                except Exception as e:
+                    if not item[2].done():
+                        item[2].set_exception(e)
+
+    def _write(self, batch: List[QueueItem]) -> None:
+        with Session(engine) as session:
+            applied = []
+            for match_id, match_in, future in batch:
+                try:
+                    match = load_match_for_update(session, match_id)
+                    apply_score_update(match, match_in)
+                except SCORE_INPUT_ERRORS as e:
+                    future.set_exception(e)
+                    continue
+                session.add(match)
+                # Direct flushen: een tweede score voor dezelfde wedstrijd in deze batch
+                # moet de nieuwe versie zien (anders gaan beide door de versiecheck)
+                session.flush()
+                applied.append((match, future))
+
+            if not applied:
+                return
+
+            session.commit()
+
+            # Knockout progressie volgt via de outbox (events zitten in dezelfde commit)
+            for match, future in applied:
+                session.refresh(match)
+                future.set_result(MatchRead.model_validate(match))
+
+score_writer = ScoreWriter()
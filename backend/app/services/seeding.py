@@ -0,0 +1,50 @@
+import functools
+from typing import Optional, Tuple
+
+# ==========================================
+# SEEDING TEMPLATES (KO SCHEMA'S)
+# ==========================================
+# Eén plek voor de volgorde van de seeds in een KO schema, gedeeld door de KO na de poules,
+# de directe KO, double elimination en de simulatie. Per macht van 2 wordt de volgorde één
+# keer opgebouwd (uit die van de helft, O(n)) en daarna uit de cache gehaald.
+#
+# Voorbeeld (8): posities 0..7 = seeds 1, 8, 4, 5, 2, 7, 3, 6 -> 1-8 en 4-5 treffen elkaar
+# in de halve finale, 1 en 2 pas in de finale. Byes gaan naar de topseeds: een seed boven
+# het aantal deelnemers is 'geen tegenstander'.
+
+MAX_TEMPLATE_SIZE = 1024 # Groter dan dit komt in de praktijk niet voor; cache blijft klein
+
+
+def bracket_size_for(entity_count: int) -> int:
+    """Kleinste macht van 2 waar iedereen in past (minimaal 2)."""
+    size = 2
+    while size < entity_count:
+        size *= 2
+    return size
+
+
+@functools.lru_cache(maxsize=None)
+def seed_order(bracket_size: int) -> Tuple[int, ...]:
+    """Seed (0-based) per positie in het schema; positie 2i en 2i+1 spelen tegen elkaar."""
+    if bracket_size <= 1:
+        return (0,)
+    if bracket_size & (bracket_size - 1):
+        raise ValueError("Bracketgrootte moet een macht van 2 zijn")
+    half = seed_order(bracket_size // 2)
+    # Elke seed s uit de helft krijgt de zwakste tegenstander die bij hem past: size-1-s
+    return tuple(seed for s in half for seed in (s, bracket_size - 1 - s))
+
+
+@functools.lru_cache(maxsize=MAX_TEMPLATE_SIZE)
+def first_round(entity_count: int) -> Tuple[Tuple[int, Optional[int]], ...]:
+    """
+    Eerste ronde voor 'entity_count' deelnemers, in schemavolgorde (= bracket_slot):
+    (seed, tegenstander-seed of None voor een bye). De beste seed staat altijd links.
+    """
+    if entity_count < 2:
+        return ((0, None),) if entity_count == 1 else ()
+    order = seed_order(bracket_size_for(entity_count))
+    return tuple(
+        (order[i], order[i + 1] if order[i + 1] < entity_count else None)
+        for i in range(0, len(order), 2)
+    )
@@ -0,0 +1,397 @@
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.models.match import Match
+from app.models.tournament import Tournament
+from app.services.seeding import bracket_size_for, seed_order
+
+# ==========================================
+# MONTE CARLO: KWALIFICATIE- EN TITELKANSEN
+# ==========================================
+# Speelt de rest van het toernooi 100k+ keer uit, volledig gevectoriseerd met NumPy
+# (één kolom per simulatie). Gespeelde uitslagen liggen vast, lopende wedstrijden gaan
+# verder vanaf de huidige stand. Poule standen volgen dezelfde regels als
+# calculate_poule_standings (punten -> leg saldo -> onderling -> shoot-out) en de
+# KO wordt opgebouwd zoals generate_knockout_bracket dat doet (seeding template).
+#
+# Sterktes zijn Elo-achtige ratings per speler/team (kans op een gewonnen leg);
+# zonder ratings is iedereen even sterk.
+
+DEFAULT_RATING = 1500.0
+DEFAULT_SIMULATIONS = 100_000
+MAX_SIMULATIONS = 500_000
+
+
+def leg_win_probability(rating_a: float, rating_b: float) -> float:
+    return 1.0 / (1.0 + 10 ** ((rating_b - rating_a) / 400.0))
+
+
+def legs_to_win(best_of_legs: Optional[int]) -> int:
+    return (best_of_legs // 2) + 1 if best_of_legs else 1
+
+
+def score_distribution(p: float, best_of_legs: Optional[int], score_1: int = 0, score_2: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Alle mogelijke eindstanden vanaf (score_1, score_2) met hun kans, als p de kans is
+    dat speler 1 een leg wint. Geeft (kansen, legs speler 1, legs speler 2) terug.
+    """
+    target = legs_to_win(best_of_legs)
+    need_1, need_2 = max(target - score_1, 0), max(target - score_2, 0)
+    if need_1 == 0 or need_2 == 0:
+        return np.array([1.0]), np.array([score_1]), np.array([score_2])
+
+    probs, legs_1, legs_2 = [], [], []
+    # Speler 1 wint, speler 2 pakt er onderweg nog 'lost' legs bij (laatste leg is voor speler 1)
+    for lost in range(need_2):
+        probs.append(math.comb(need_1 - 1 + lost, lost) * p ** need_1 * (1 - p) ** lost)
+        legs_1.append(target)
+        legs_2.append(score_2 + lost)
+    for lost in range(need_1):
+        probs.append(math.comb(need_2 - 1 + lost, lost) * (1 - p) ** need_2 * p ** lost)
+        legs_1.append(score_1 + lost)
+        legs_2.append(target)
+
+    probs = np.array(probs)
+    return probs / probs.sum(), np.array(legs_1), np.array(legs_2)
+
+
+def match_win_probability(p: float, best_of_legs: Optional[int]) -> float:
+    probs, legs_1, legs_2 = score_distribution(p, best_of_legs)
+    return float(probs[legs_1 > legs_2].sum())
+
+
+def _participants(match: Match, is_doubles: bool) -> Tuple[Optional[int], Optional[int]]:
+    return (match.team1_id, match.team2_id) if is_doubles else (match.player1_id, match.player2_id)
+
+
+class _Poule:
+    """Een poule met vaste (gespeelde) en nog te simuleren wedstrijden, in lokale indexen."""
+
+    def __init__(self, number: int, entities: List[int]):
+        self.number = number
+        self.entities = entities
+        self.index = {e: i for i, e in enumerate(entities)}
+        n = len(entities)
+        self.points = np.zeros(n, dtype=np.int32)
+        self.legs_won = np.zeros(n, dtype=np.int32)
+        self.legs_lost = np.zeros(n, dtype=np.int32)
+        self.played: List[Tuple[int, int, bool]] = [] # (i, j, i won)
+        self.remaining: List[Tuple[int, int, Optional[int], int, int]] = [] # (i, j, best_of, score_i, score_j)
+
+
+class TournamentSimulator:
+    def __init__(
+        self,
+        tournament: Tournament,
+        matches: List[Match],
+        ratings: Optional[Dict[int, float]] = None,
+        simulations: int = DEFAULT_SIMULATIONS,
+        seed: Optional[int] = None
+    ):
+        self.tournament = tournament
+        self.is_doubles = tournament.mode == "doubles"
+        self.ratings = ratings or {}
+        self.simulations = max(1, min(simulations, MAX_SIMULATIONS))
+        self.rng = np.random.default_rng(seed)
+
+        self.poule_matches = [m for m in matches if m.poule_number is not None]
+        self.ko_matches = [m for m in matches if m.poule_number is None]
+
+        # Alle deelnemers krijgen een globale index (voor de KO matrix)
+        entity_ids = set()
+        for m in matches:
+            entity_ids.update(e for e in _participants(m, self.is_doubles) if e)
+        self.entities = sorted(entity_ids)
+        self.entity_index = {e: i for i, e in enumerate(self.entities)}
+
+    # --- Kansen per wedstrijd ---
+
+    def _rating(self, entity_id: int) -> float:
+        return self.ratings.get(entity_id, DEFAULT_RATING)
+
+    def _leg_p(self, a: int, b: int) -> float:
+        return leg_win_probability(self._rating(a), self._rating(b))
+
+    def _ko_win_matrix(self) -> np.ndarray:
+        """W[i, j] = kans dat i van j wint in een KO wedstrijd (globale indexen)."""
+        ratings = np.array([self._rating(e) for e in self.entities])
+        leg_p = 1.0 / (1.0 + 10 ** ((ratings[None, :] - ratings[:, None]) / 400.0))
+        best_of = self.tournament.starting_legs_ko
+        # Unieke leg-kansen uitrekenen (bij uniforme ratings is dat er maar één)
+        unique, inverse = np.unique(np.round(leg_p, 6), return_inverse=True)
+        win = np.array([match_win_probability(p, best_of) for p in unique])
+        return win[inverse].reshape(leg_p.shape)
+
+    # --- Simulatie ---
+
+    def run(self) -> Dict[str, Any]:
+        n = len(self.entities)
+        positions: Dict[int, np.ndarray] = {}
+        qualified_counts = np.zeros(n, dtype=np.int64)
+        champions = np.full(self.simulations, -1, dtype=np.int64)
+
+        poules = self._build_poules()
+        q_per_poule = self.tournament.qualifiers_per_poule or 2
+        poule_orders = {}
+        for poule in poules:
+            order, stats = self._simulate_poule(poule)
+            poule_orders[poule.number] = (poule, order, stats)
+            positions[poule.number] = np.stack([
+                np.bincount(order[:, rank], minlength=len(poule.entities)) for rank in range(len(poule.entities))
+            ], axis=1) if len(poule.entities) else np.zeros((0, 0), dtype=np.int64)
+
+        if self.ko_matches:
+            # KO loopt al: gekwalificeerden liggen vast, vanaf de huidige ronde verder spelen
+            ko_entities = {e for m in self.ko_matches if m.round_number == min(x.round_number for x in self.ko_matches)
+                           for e in _participants(m, self.is_doubles) if e}
+            for e in ko_entities:
+                qualified_counts[self.entity_index[e]] = self.simulations
+            champions = self._simulate_running_knockout()
+        elif poule_orders:
+            seeded, poule_of_seed = self._seed_qualifiers(poule_orders, q_per_poule)
+            for col in range(seeded.shape[1]):
+                qualified_counts += np.bincount(seeded[:, col], minlength=n)
+            champions = self._simulate_bracket(seeded, poule_of_seed)
+
+        title_counts = np.bincount(champions[champions >= 0], minlength=n)
+        return {
+            "simulations": self.simulations,
+            "entities": self.entities,
+            "qualified": qualified_counts / self.simulations,
+            "title": title_counts / self.simulations,
+            "positions": {
+                p_num: (poule.entities, positions[p_num] / self.simulations)
+                for p_num, (poule, _, _) in poule_orders.items()
+            },
+        }
+
+    def _build_poules(self) -> List[_Poule]:
+        by_poule: Dict[int, List[Match]] = {}
+        for m in self.poule_matches:
+            by_poule.setdefault(m.poule_number, []).append(m)
+
+        poules = []
+        for p_num in sorted(by_poule):
+            entities = sorted({e for m in by_poule[p_num] for e in _participants(m, self.is_doubles) if e})
+            poule = _Poule(p_num, entities)
+            for m in by_poule[p_num]:
+                id_1, id_2 = _participants(m, self.is_doubles)
+                if not id_1 or not id_2:
+                    continue
+                i, j = poule.index[id_1], poule.index[id_2]
+                if m.is_completed:
+                    poule.legs_won[i] += m.score_p1
+                    poule.legs_lost[i] += m.score_p2
+                    poule.legs_won[j] += m.score_p2
+                    poule.legs_lost[j] += m.score_p1
+                    i_won = m.score_p1 > m.score_p2
+                    poule.points[i if i_won else j] += 2
+                    poule.played.append((i, j, i_won))
+                else:
+                    poule.remaining.append((i, j, m.best_of_legs, m.score_p1, m.score_p2))
+            poules.append(poule)
+        return poules
+
+    def _simulate_poule(self, poule: _Poule) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Geeft (volgorde per simulatie [S, n] met lokale indexen, statistieken [n, S]) terug.
+        Statistieken staan per deelnemer op een rij, dat maakt de vergelijkingen hieronder snel.
+        """
+        S, n = self.simulations, len(poule.entities)
+        points = np.repeat(poule.points[:, None], S, axis=1)
+        legs_won = np.repeat(poule.legs_won[:, None], S, axis=1)
+        legs_lost = np.repeat(poule.legs_lost[:, None], S, axis=1)
+        results: List[Tuple[int, int, Any]] = list(poule.played)
+
+        if poule.remaining:
+            m = len(poule.remaining)
+            dists = [
+                score_distribution(self._leg_p(poule.entities[i], poule.entities[j]), bo, s_i, s_j)
+                for i, j, bo, s_i, s_j in poule.remaining
+            ]
+            width = max(len(d[0]) for d in dists)
+            cdf = np.ones((m, width), dtype=np.float32) # Opvulling met 1.0 wordt nooit gekozen
+            legs_i = np.zeros((m, width), dtype=np.float32)
+            legs_j = np.zeros((m, width), dtype=np.float32)
+            for k, (probs, l_1, l_2) in enumerate(dists):
+                cdf[k, :len(probs)] = np.cumsum(probs)
+                legs_i[k, :len(probs)] = l_1
+                legs_j[k, :len(probs)] = l_2
+            cdf[:, -1] = 1.0
+
+            # Uitkomst per (wedstrijd, simulatie) via de cumulatieve verdeling
+            u = self.rng.random((m, S), dtype=np.float32)
+            outcome = np.zeros((m, S), dtype=np.intp)
+            for k in range(width - 1):
+                outcome += u > cdf[:, k:k + 1]
+            outcome += (np.arange(m) * width)[:, None] # Index in de platte tabellen
+            won_i = legs_i.ravel()[outcome]
+            won_j = legs_j.ravel()[outcome]
+
+            # Optellen per deelnemer met een matrixvermenigvuldiging i.p.v. een loop
+            side_i = np.zeros((n, m), dtype=np.float32)
+            side_j = np.zeros((n, m), dtype=np.float32)
+            side_i[[r[0] for r in poule.remaining], np.arange(m)] = 1
+            side_j[[r[1] for r in poule.remaining], np.arange(m)] = 1
+            i_won = won_i > won_j
+            wins = i_won.astype(np.float32)
+
+            legs_won += (side_i @ won_i + side_j @ won_j).astype(np.int32)
+            legs_lost += (side_i @ won_j + side_j @ won_i).astype(np.int32)
+            points += (2 * (side_i @ wins + side_j @ (1 - wins))).astype(np.int32)
+            results += [(r[0], r[1], i_won[k]) for k, r in enumerate(poule.remaining)]
+
+        leg_diff = legs_won - legs_lost
+        # Sleutel past in int32: max. 7 per poule, dus punten <= 12 en onderling <= 6
+        primary = points * 2048 + (leg_diff + 1024)
+
+        # Onderling resultaat telt alleen tussen deelnemers met gelijke punten en saldo
+        h2h = np.zeros((n, S), dtype=np.int32)
+        for i, j, i_won in results:
+            tied = primary[i] == primary[j]
+            h2h[i] += tied & i_won
+            h2h[j] += tied & ~np.asarray(i_won)
+
+        # Laatste tiebreak: shoot-out (willekeurig)
+        key = (primary * 8 + h2h) * 1024 + self.rng.integers(0, 1024, size=(n, S), dtype=np.int32)
+        order = np.argsort(-key.T, axis=1)
+        return order, {"points": points, "leg_diff": leg_diff, "legs_won": legs_won}
+
+    def _seed_qualifiers(self, poule_orders, q_per_poule: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Qualifiers per simulatie in seed-volgorde (zoals generate_knockout_bracket):
+        eerst alle nummers 1, dan punten, saldo en gewonnen legs. Geeft globale indexen
+        en de poule per seed terug.
+        """
+        S = self.simulations
+        rows = np.arange(S)
+        gids, ranks, pts, diffs, won, poule_nums = [], [], [], [], [], []
+        for p_num in sorted(poule_orders):
+            poule, order, stats = poule_orders[p_num]
+            global_idx = np.array([self.entity_index[e] for e in poule.entities])
+            for rank in range(min(q_per_poule, len(poule.entities))):
+                local = order[:, rank]
+                gids.append(global_idx[local])
+                ranks.append(rank)
+                pts.append(stats["points"][local, rows])
+                diffs.append(stats["leg_diff"][local, rows])
+                won.append(stats["legs_won"][local, rows])
+                poule_nums.append(p_num)
+
+        if not gids:
+            return np.zeros((S, 0), dtype=np.int64), np.zeros((S, 0), dtype=np.int64)
+
+        # Eén sorteersleutel: rang (oplopend), dan punten, saldo en gewonnen legs (aflopend).
+        # Stabiel sorteren, zodat gelijke qualifiers in poule-volgorde blijven (zoals Python's sort)
+        key = (
+            np.array(ranks, dtype=np.int64)[None, :] * (1 << 40)
+            - np.stack(pts, axis=1).astype(np.int64) * (1 << 26)
+            - (np.stack(diffs, axis=1).astype(np.int64) + 4096) * (1 << 13)
+            - np.stack(won, axis=1).astype(np.int64)
+        )
+        seed_order = np.argsort(key, axis=1, kind="stable")
+        gids = np.take_along_axis(np.stack(gids, axis=1), seed_order, axis=1)
+        poule_of_seed = np.array(poule_nums, dtype=np.int64)[seed_order]
+        return gids, poule_of_seed
+
+    def _simulate_bracket(self, seeded: np.ndarray, poule_of_seed: np.ndarray) -> np.ndarray:
+        S, total = seeded.shape
+        if total == 0:
+            return np.full(S, -1, dtype=np.int64)
+        if total == 1:
+            return seeded[:, 0]
+
+        bracket_size = bracket_size_for(total)
+        num_byes = bracket_size - total
+
+        # Slots: eerst de byes voor de topseeds, dan 'sterkste vs zwakste uit een andere poule'
+        slots_a = [seeded[:, i] for i in range(num_byes)]
+        slots_b = [np.full(S, -1, dtype=np.int64) for _ in range(num_byes)]
+
+        rest, rest_poule = seeded[:, num_byes:], poule_of_seed[:, num_byes:]
+        alive = np.ones(rest.shape, dtype=bool)
+        rows = np.arange(S)
+        width = rest.shape[1]
+        for _ in range(width // 2):
+            first = np.argmax(alive, axis=1)
+            alive[rows, first] = False
+            other_poule = alive & (rest_poule != rest_poule[rows, first][:, None])
+            has_other = other_poule.any(axis=1)
+            last_other = width - 1 - np.argmax(other_poule[:, ::-1], axis=1)
+            last_alive = width - 1 - np.argmax(alive[:, ::-1], axis=1)
+            opponent = np.where(has_other, last_other, last_alive)
+            alive[rows, opponent] = False
+            slots_a.append(rest[rows, first])
+            slots_b.append(rest[rows, opponent])
+
+        order = [idx for idx in seed_order(bracket_size // 2) if idx < len(slots_a)]
+        a = np.stack([slots_a[i] for i in order], axis=1)
+        b = np.stack([slots_b[i] for i in order], axis=1)
+        return self._play_out(a, b)
+
+    def _play_out(self, a: np.ndarray, b: np.ndarray, fixed: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Speelt de KO uit vanaf een ronde met paren (a, b) per slot; b = -1 is een bye.
+        'fixed' bevat per slot een al bekende winnaar (of -1).
+        """
+        win_matrix = self._ko_win_matrix()
+        safe_b = np.where(b < 0, a, b)
+        winners = np.where(self.rng.random(a.shape) < win_matrix[a, safe_b], a, safe_b)
+        winners = np.where(b < 0, a, winners)
+        if fixed is not None:
+            winners = np.where(fixed >= 0, fixed, winners)
+
+        while winners.shape[1] > 1:
+            left, right = winners[:, 0::2], winners[:, 1::2]
+            winners = np.where(self.rng.random(left.shape) < win_matrix[left, right], left, right)
+        return winners[:, 0]
+
+    def _simulate_running_knockout(self) -> np.ndarray:
+        S = self.simulations
+        latest = max(m.round_number for m in self.ko_matches)
+        current = sorted(
+            (m for m in self.ko_matches if m.round_number == latest),
+            key=lambda m: (m.bracket_slot is None, m.bracket_slot or 0, m.id)
+        )
+
+        a_cols, b_cols, fixed_cols = [], [], []
+        for m in current:
+            id_1, id_2 = _participants(m, self.is_doubles)
+            idx_1 = self.entity_index.get(id_1, -1) if id_1 else -1
+            idx_2 = self.entity_index.get(id_2, -1) if id_2 else -1
+            if idx_1 < 0:
+                idx_1, idx_2 = idx_2, -1
+
+            winner = np.full(S, -1, dtype=np.int64)
+            if m.is_completed or idx_2 < 0:
+                winner[:] = idx_1 if (idx_2 < 0 or m.score_p1 > m.score_p2) else idx_2
+            elif m.score_p1 or m.score_p2:
+                # Lopende wedstrijd: verder vanaf de huidige stand
+                probs, legs_1, legs_2 = score_distribution(self._leg_p(id_1, id_2), m.best_of_legs, m.score_p1, m.score_p2)
+                p_win = float(probs[legs_1 > legs_2].sum())
+                winner = np.where(self.rng.random(S) < p_win, idx_1, idx_2)
+
+            a_cols.append(np.full(S, idx_1, dtype=np.int64))
+            b_cols.append(np.full(S, idx_2, dtype=np.int64))
+            fixed_cols.append(winner)
+
+        if len(current) > 1 and len(current) % 2:
+            # Zelfde gedrag als check_and_advance_knockout: de laatste wedstrijd valt buiten het schema
+            a_cols, b_cols, fixed_cols = a_cols[:-1], b_cols[:-1], fixed_cols[:-1]
+        return self._play_out(np.stack(a_cols, axis=1), np.stack(b_cols, axis=1), np.stack(fixed_cols, axis=1))
+
+
+def simulate_tournament(
+    tournament: Tournament,
+    matches: List[Match],
+    ratings: Optional[Dict[int, float]] = None,
+    simulations: int = DEFAULT_SIMULATIONS,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Kansen per deelnemer: 'qualified' (door naar de KO), 'title' (toernooiwinst) en per poule
+    de kans op elke eindpositie. Ratings: entity id -> Elo-achtige sterkte (optioneel).
+    """
+    return TournamentSimulator(tournament, matches, ratings, simulations, seed).run()
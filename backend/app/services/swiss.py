@@ -0,0 +1,347 @@
+import math
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from app.models.match import Match
+from app.models.swiss import SwissStanding
+from app.models.tournament import Tournament
+
+# ==========================================
+# SWISS SYSTEEM (GROTE OPEN TOERNOOIEN)
+# ==========================================
+# Iedereen speelt een vast aantal ronden; elke ronde wordt ingedeeld op de stand van dat
+# moment. Indelen gaat per scoregroep (zelfde aantal punten), van boven naar beneden:
+#   - binnen een groep speelt de bovenste helft (S1) tegen de onderste helft (S2), S1[i]
+#     bij voorkeur tegen S2[i] (Dutch systeem);
+#   - rematches zijn uitgesloten; een maximale bipartiete matching (Kuhn, met de voorkeurs-
+#     volgorde als zoekvolgorde) vindt toch een indeling als de voor de hand liggende niet kan;
+#   - wie overblijft zakt door naar de volgende groep. Blijft er onderaan iemand over, dan
+#     worden de laatst ingedeelde groepen samengevoegd en opnieuw ingedeeld.
+# Bij een oneven aantal krijgt de laagst geplaatste deelnemer zonder eerdere bye een bye
+# (een afgeronde wedstrijd zonder tegenstander, net als in de KO).
+#
+# De stand (SwissStanding) wordt per afgeronde ronde bijgewerkt met alleen de wedstrijden
+# van die ronde; Buchholz en Sonneborn-Berger volgen daarna uit de tabel zelf.
+
+SWISS_FORMAT = "swiss"
+POINTS_WIN = 2
+
+
+def default_swiss_rounds(entity_count: int) -> int:
+    """Genoeg ronden voor één ongeslagen winnaar (log2), minimaal één."""
+    return max(1, math.ceil(math.log2(max(2, entity_count))))
+
+
+def _ids(csv: str) -> List[int]:
+    return [int(x) for x in csv.split(",") if x]
+
+
+def _csv(ids: List[int]) -> str:
+    return ",".join(str(x) for x in ids)
+
+
+class _Entry:
+    """Lichte kopie van een standregel; het indelen raakt de ORM objecten niet aan."""
+    __slots__ = ("id", "points", "seed", "starts", "had_bye", "opponents")
+
+    def __init__(self, row: SwissStanding):
+        self.id = row.entity_id
+        self.points = row.points
+        self.seed = row.seed
+        self.starts = row.starts
+        self.had_bye = row.had_bye
+        self.opponents: Set[int] = set(_ids(row.opponents))
+
+
+# --- Indelen ---
+
+def _match_bipartite(s1: List[_Entry], s2: List[_Entry], allow_rematch: bool) -> List[Optional[int]]:
+    """Kuhn: voor elke speler in S1 de index in S2 (of None). S1[i] probeert eerst S2[i], S2[i+1], ..."""
+    owner: List[Optional[int]] = [None] * len(s2)
+    prefs = []
+    for i, a in enumerate(s1):
+        order = list(range(min(i, len(s2)), len(s2))) + list(range(min(i, len(s2)) - 1, -1, -1))
+        prefs.append([j for j in order if allow_rematch or s2[j].id not in a.opponents])
+
+    def augment(i: int, seen: List[bool]) -> bool:
+        for j in prefs[i]:
+            if seen[j]:
+                continue
+            seen[j] = True
+            if owner[j] is None or augment(owner[j], seen):
+                owner[j] = i
+                return True
+        return False
+
+    for i in range(len(s1)):
+        augment(i, [False] * len(s2))
+
+    partner: List[Optional[int]] = [None] * len(s1)
+    for j, i in enumerate(owner):
+        if i is not None:
+            partner[i] = j
+    return partner
+
+
+def _pair_pool(pool: List[_Entry], allow_rematch: bool = False) -> Tuple[List[Tuple[_Entry, _Entry]], List[_Entry]]:
+    """Deelt een (op rang gesorteerde) groep in; geeft de paren en wie overblijft terug."""
+    half = len(pool) // 2
+    s1, s2 = pool[:half], pool[half:]
+    partner = _match_bipartite(s1, s2, allow_rematch)
+
+    pairs = [(a, s2[j]) for a, j in zip(s1, partner) if j is not None]
+    used = {id(e) for pair in pairs for e in pair}
+    rest = [e for e in pool if id(e) not in used]
+
+    # Wie in S1/S2 geen partner vond, kan misschien nog onderling (rest blijft op rang gesorteerd)
+    if len(rest) >= 2:
+        i = 0
+        while i < len(rest):
+            a = rest[i]
+            for k in range(i + 1, len(rest)):
+                b = rest[k]
+                if allow_rematch or b.id not in a.opponents:
+                    pairs.append((a, b))
+                    rest.pop(k)
+                    rest.pop(i)
+                    break
+            else:
+                i += 1
+    return pairs, rest
+
+
+def _rank_key(e: _Entry) -> Tuple[int, int]:
+    return (-e.points, e.seed)
+
+
+def pair_entries(entries: List[_Entry]) -> List[Tuple[_Entry, _Entry]]:
+    """Paren voor een even aantal deelnemers (de bye is er al af), op volgorde van de tafels."""
+    entries = sorted(entries, key=_rank_key)
+    groups: List[List[_Entry]] = []
+    for e in entries:
+        if groups and groups[-1][0].points == e.points:
+            groups[-1].append(e)
+        else:
+            groups.append([e])
+
+    paired: List[List[Tuple[_Entry, _Entry]]] = [] # Paren per verwerkte groep
+    carry: List[_Entry] = []
+    for group in groups:
+        pairs, carry = _pair_pool(carry + group)
+        paired.append(pairs)
+
+    # Onderaan blijft iemand over: groepen van onder naar boven samenvoegen en opnieuw indelen
+    if carry:
+        pool = list(carry)
+        while paired:
+            pool = sorted(pool + [e for pair in paired.pop() for e in pair], key=_rank_key)
+            pairs, carry = _pair_pool(pool)
+            if not carry:
+                break
+        if carry:
+            # Alleen als het echt niet anders kan (weinig deelnemers, veel ronden): rematch toestaan
+            pairs, _ = _pair_pool(pool, allow_rematch=True)
+        paired.append(pairs)
+
+    tables = [pair for pairs in paired for pair in pairs]
+    tables.sort(key=lambda pair: min(_rank_key(pair[0]), _rank_key(pair[1])))
+    return tables
+
+
+def _choose_bye(entries: List[_Entry]) -> _Entry:
+    candidates = [e for e in entries if not e.had_bye] or entries
+    return max(candidates, key=_rank_key)
+
+
+def _starting_order(a: _Entry, b: _Entry, round_number: int, table: int) -> Tuple[_Entry, _Entry]:
+    """Wie minder vaak begon wordt speler 1; bij gelijke stand wisselt het per ronde en tafel."""
+    if a.starts != b.starts:
+        return (a, b) if a.starts < b.starts else (b, a)
+    return (a, b) if (round_number + table) % 2 else (b, a)
+
+
+def pair_round(
+    tournament: Tournament,
+    standings: List[SwissStanding],
+    round_number: int
+) -> List[Match]:
+    """Maakt de wedstrijden van een Swiss ronde (nog niet toegevoegd aan de sessie)."""
+    is_doubles = tournament.mode == "doubles"
+    entries = [_Entry(row) for row in standings]
+
+    def make(p1: int, p2: Optional[int], slot: int) -> Match:
+        match = Match(
+            tournament_id=tournament.id,
+            round_number=round_number,
+            poule_number=None,
+            bracket_slot=slot,
+            best_of_legs=tournament.starting_legs_ko,
+            best_of_sets=tournament.sets_per_match,
+            is_completed=p2 is None,
+            score_p1=math.ceil(tournament.starting_legs_ko / 2) if p2 is None else 0,
+            score_p2=0
+        )
+        if is_doubles:
+            match.team1_id, match.team2_id = p1, p2
+        else:
+            match.player1_id, match.player2_id = p1, p2
+        return match
+
+    bye = None
+    if len(entries) % 2:
+        bye = _choose_bye(entries)
+        entries.remove(bye)
+
+    matches = []
+    for table, (a, b) in enumerate(pair_entries(entries)):
+        first, second = _starting_order(a, b, round_number, table)
+        matches.append(make(first.id, second.id, table))
+    if bye:
+        matches.append(make(bye.id, None, len(matches)))
+    return matches
+
+
+# --- Stand (tie-break tabel) ---
+
+def _fold_round(rows: Dict[int, SwissStanding], matches: List[Match], round_number: int, is_doubles: bool) -> None:
+    """Verwerkt de uitslagen van één ronde in de tabel."""
+    for m in matches:
+        p1, p2 = (m.team1_id, m.team2_id) if is_doubles else (m.player1_id, m.player2_id)
+        a = rows.get(p1)
+        if a is None:
+            continue
+        if p2 is None:
+            # Bye: winst zonder legs en zonder tegenstander (telt niet mee in de Buchholz)
+            a.points += POINTS_WIN
+            a.wins += 1
+            a.had_bye = True
+            continue
+        b = rows.get(p2)
+        if b is None:
+            continue
+        a.starts += 1
+        a.opponents = _csv(_ids(a.opponents) + [p2])
+        b.opponents = _csv(_ids(b.opponents) + [p1])
+        a.legs_won += m.score_p1
+        a.legs_lost += m.score_p2
+        b.legs_won += m.score_p2
+        b.legs_lost += m.score_p1
+        if m.score_p1 != m.score_p2:
+            winner, loser = (a, b) if m.score_p1 > m.score_p2 else (b, a)
+            winner.points += POINTS_WIN
+            winner.wins += 1
+            winner.beaten = _csv(_ids(winner.beaten) + [loser.entity_id])
+
+    for row in rows.values():
+        row.rounds_played = round_number
+
+
+def _update_tiebreaks(rows: Dict[int, SwissStanding]) -> None:
+    points = {entity_id: row.points for entity_id, row in rows.items()}
+    for row in rows.values():
+        row.buchholz = sum(points.get(o, 0) for o in _ids(row.opponents))
+        row.sonneborn_berger = sum(points.get(o, 0) for o in _ids(row.beaten))
+
+
+def _reset(row: SwissStanding) -> None:
+    row.points = row.wins = row.legs_won = row.legs_lost = 0
+    row.buchholz = row.sonneborn_berger = row.starts = row.rounds_played = 0
+    row.had_bye = False
+    row.opponents = row.beaten = ""
+
+
+def _load_rows(session: Session, tournament_id: int) -> Dict[int, SwissStanding]:
+    rows = session.exec(
+        select(SwissStanding)
+        .where(SwissStanding.tournament_id == tournament_id)
+        .execution_options(populate_existing=True)
+    ).all()
+    return {row.entity_id: row for row in rows}
+
+
+def _round_matches(session: Session, tournament_id: int, round_number: int) -> List[Match]:
+    return session.exec(
+        select(Match)
+        .where(Match.tournament_id == tournament_id)
+        .where(Match.round_number == round_number)
+        .where(Match.poule_number == None)
+        .execution_options(populate_existing=True)
+    ).all()
+
+
+def rebuild_swiss_standings(session: Session, tournament: Tournament, up_to_round: int) -> None:
+    """Bouwt de tabel opnieuw op uit de wedstrijden (na een gecorrigeerde uitslag)."""
+    rows = _load_rows(session, tournament.id)
+    for row in rows.values():
+        _reset(row)
+    is_doubles = tournament.mode == "doubles"
+    for round_number in range(1, up_to_round + 1):
+        matches = _round_matches(session, tournament.id, round_number)
+        if not matches or not all(m.is_completed for m in matches):
+            break
+        _fold_round(rows, matches, round_number, is_doubles)
+    _update_tiebreaks(rows)
+    session.add_all(rows.values())
+
+
+def start_swiss(session: Session, tournament: Tournament, entity_ids: List[int]) -> None:
+    """Maakt de tabel (entity_ids op volgorde van plaatsing) en deelt ronde 1 in."""
+    if not tournament.swiss_rounds:
+        tournament.swiss_rounds = default_swiss_rounds(len(entity_ids))
+        session.add(tournament)
+
+    rows = [
+        SwissStanding(tournament_id=tournament.id, entity_id=entity_id, seed=seed)
+        for seed, entity_id in enumerate(entity_ids, start=1)
+    ]
+    session.add_all(rows)
+    session.add_all(pair_round(tournament, rows, 1))
+    session.commit()
+
+
+def advance_swiss(session: Session, tournament: Tournament, current_round: int) -> None:
+    """
+    Progressie na een afgeronde Swiss ronde (aangeroepen door check_and_advance_knockout,
+    binnen de toernooi-lock): ronde in de tabel verwerken en de volgende ronde indelen.
+    """
+    matches = _round_matches(session, tournament.id, current_round)
+    if not matches or not all(m.is_completed for m in matches):
+        return
+
+    rows = _load_rows(session, tournament.id)
+    if not rows:
+        return
+    played = min(row.rounds_played for row in rows.values())
+    if played >= current_round:
+        # Ronde zat al in de tabel: een uitslag is gecorrigeerd (of het event kwam dubbel)
+        rebuild_swiss_standings(session, tournament, max(row.rounds_played for row in rows.values()))
+    elif played == current_round - 1:
+        _fold_round(rows, matches, current_round, tournament.mode == "doubles")
+        _update_tiebreaks(rows)
+        session.add_all(rows.values())
+    else:
+        return # Een eerdere ronde is nog niet verwerkt; die komt eerst aan de beurt
+
+    next_round = current_round + 1
+    existing = session.exec(
+        select(Match.id)
+        .where(Match.tournament_id == tournament.id)
+        .where(Match.round_number == next_round)
+        .where(Match.poule_number == None)
+    ).first()
+    if existing is None and current_round < (tournament.swiss_rounds or 0):
+        session.add_all(pair_round(tournament, list(rows.values()), next_round))
+
+    try:
+        session.commit()
+    except IntegrityError:
+        # Een ander proces deelde dezelfde ronde net eerder in
+        session.rollback()
+
+
+def swiss_standings(session: Session, tournament_id: int) -> List[SwissStanding]:
+    """Eindstand/tussenstand: punten, Buchholz, Sonneborn-Berger, legsaldo, startvolgorde."""
+    rows = session.exec(select(SwissStanding).where(SwissStanding.tournament_id == tournament_id)).all()
+    return sorted(rows, key=lambda r: (-r.points, -r.buchholz, -r.sonneborn_berger, -(r.legs_won - r.legs_lost), r.seed))
@@ -1,13 +1,22 @@
 import math
 import random
 import functools
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
+from app.db.locks import lock_tournament
 from app.models.match import Match
 from app.models.team import Team
 from app.models.player import Player
 from app.models.tournament import Tournament
 from app.models.dartboard import Dartboard # Toegevoegd voor bordtoewijzing
+from app.services.schedule_order import match_entities, order_matches, schedule_quality, schedule_slots
+from app.services.seeding import bracket_size_for, first_round, seed_order
+from app.services.rating import SEEDING_RATING, rating_map, snake_poules
+from app.services.simulation import DEFAULT_RATING
+from app.services.swiss import SWISS_FORMAT, advance_swiss
+from app.services.double_elimination import DOUBLE_ELIMINATION_FORMAT, advance_double_elimination
 
 # ==========================================
 # 1. POULE FASE LOGICA (VOOR SINGLES)
@@ -23,6 +32,7 @@ def generate_poule_phase(
 ):
     """
     Verdeelt spelers over N poules, wijst borden toe (Dynamisch of Vast) en genereert wedstrijden.
+    Geeft de kwaliteit van het schema terug (rust, schrijfbeurten; zie schedule_quality).
     """
     # 1. Haal toernooi en borden op
     statement = select(Tournament).where(Tournament.id == tournament_id)
@@ -34,18 +44,20 @@ def generate_poule_phase(
     if len(players) < num_poules:
         num_poules = 1
 
-    # 2. Spelers husselen en verdelen
-    shuffled_players = list(players)
-    random.shuffle(shuffled_players)
+    # 2. Spelers verdelen: slangverdeling op rating, of husselen
+    if tournament and tournament.seeding == SEEDING_RATING:
+        poules_map = snake_poules(players, rating_map(session, "player", [p.id for p in players]), num_poules)
+    else:
+        shuffled_players = list(players)
+        random.shuffle(shuffled_players)
 
-    poules_map = {i: [] for i in range(1, num_poules + 1)}
-    for idx, player in enumerate(shuffled_players):
-        target_poule = (idx % num_poules) + 1
-        poules_map[target_poule].append(player)
+        poules_map = {i: [] for i in range(1, num_poules + 1)}
+        for idx, player in enumerate(shuffled_players):
+            target_poule = (idx % num_poules) + 1
+            poules_map[target_poule].append(player)
 
     # 3. Eerst ALLE wedstrijden genereren (zonder bordnummer)
     all_created_matches = []
-    matches_per_poule = {} # Houden we bij voor de referee toewijzing later
 
     for poule_num, pool_players in poules_map.items():
         poule_matches = _create_round_robin_matches(
@@ -55,46 +67,22 @@ def generate_poule_phase(
             legs=legs_best_of,
             sets=sets_best_of
         )
-        matches_per_poule[poule_num] = poule_matches
         all_created_matches.extend(poule_matches)
 
     # 4. BORD TOEWIJZING LOGICA
-    
-    # Scenario A: OVERFLOW (Meer borden dan poules) -> Dynamisch verdelen
-    # Bijv: 1 Poule, 2 Borden. Of 2 Poules, 4 Borden.
-    if len(boards) > num_poules:
-        # We sorteren alle wedstrijden eerst op ronde, dan op poule.
-        # Zo vullen we ronde 1 eerst op bord 1, 2, 3...
-        all_created_matches.sort(key=lambda m: (m.round_number, m.poule_number))
-        
-        for i, match in enumerate(all_created_matches):
-            # Cyclisch toewijzen: Match 1->Bord 1, Match 2->Bord 2, Match 3->Bord 1...
-            board_idx = i % len(boards)
-            match.board_number = boards[board_idx].number
-            
-    # Scenario B: STANDAARD (Gelijk of minder borden) -> Vaste toewijzing
-    # Bijv: 2 Poules, 2 Borden. Poule 1->Bord 1, Poule 2->Bord 2.
-    else:
-        for match in all_created_matches:
-            if match.poule_number and match.poule_number <= len(boards):
-                # Poule 1 krijgt index 0 (Bord 1)
-                match.board_number = boards[match.poule_number - 1].number
-            else:
-                # Geen bord beschikbaar (Queue)
-                match.board_number = None
+    board_numbers = [b.number for b in boards]
+    assign_poule_boards(all_created_matches, board_numbers, num_poules)
 
-    # 5. Referees toewijzen (Nu de borden bekend zijn)
-    # We doen dit per poule, omdat je meestal schrijft bij je eigen poule
-    for poule_num, pool_players in poules_map.items():
-        pm = matches_per_poule[poule_num]
-        pm.sort(key=lambda m: m.round_number)
-        
-        # De vernieuwde assign_referees functie (die bord-locatie meeneemt)
-        assign_referees(pm, pool_players, is_doubles=False)
+    # 5. Volgorde (rust tussen wedstrijden) en referees (nu de borden bekend zijn)
+    # We doen de referees per poule, omdat je meestal schrijft bij je eigen poule
+    ordered, quality = schedule_poule_matches(
+        all_created_matches, poules_map, board_numbers, num_poules, is_doubles=False
+    )
 
-    # 6. Opslaan
-    session.add_all(all_created_matches)
+    # 6. Opslaan (in schemavolgorde: de wachtrij per bord volgt de id's)
+    session.add_all(ordered)
     session.commit()
+    return quality
 
 
 def generate_round_robin_global(
@@ -106,8 +94,114 @@ def generate_round_robin_global(
 ):
     """Klassieke Round Robin (alles in 1 grote groep)."""
     matches = _create_round_robin_matches(tournament_id, players, None, legs_best_of, sets_best_of)
-    session.add_all(matches)
+    ordered, slots = order_matches(matches, [], 1, is_doubles=False)
+    session.add_all(ordered)
     session.commit()
+    return schedule_quality(ordered, slots, is_doubles=False)
+
+
+def schedule_poule_matches(
+    matches: List[Match],
+    participants: Dict[int, List[Any]],
+    board_numbers: List[int],
+    num_poules: int,
+    is_doubles: bool
+) -> Tuple[List[Match], Dict[str, Any]]:
+    """
+    Ordening na het genereren: rustvriendelijke volgorde (zie schedule_order), daarna
+    de referees per poule in die volgorde. Geeft de wedstrijden in opslagvolgorde terug,
+    plus de kwaliteit van het schema (met de oorspronkelijke volgorde ter vergelijking).
+    Ook gebruikt door de planner, zodat die hetzelfde schema doorrekent.
+    """
+    started = time.perf_counter()
+
+    # Nulmeting: de volgorde zoals gegenereerd. De schrijversbotsingen van die volgorde tellen
+    # we zonder echt toe te wijzen (schrijven naar de ORM objecten is duur en wordt hierna
+    # toch overschreven).
+    slots = schedule_slots(matches, board_numbers, num_poules)
+    baseline = schedule_quality(matches, slots, is_doubles)
+    baseline["referee_clashes"] = _referee_shortage(matches, slots, participants, is_doubles)
+
+    ordered, slots = order_matches(matches, board_numbers, num_poules, is_doubles)
+    _assign_poule_referees(ordered, slots, participants, is_doubles)
+
+    quality = schedule_quality(ordered, slots, is_doubles)
+    quality["baseline_min_rest"] = baseline["min_rest"]
+    quality["baseline_back_to_back"] = baseline["back_to_back"]
+    quality["baseline_referee_clashes"] = baseline["referee_clashes"]
+    quality["elapsed_ms"] = (time.perf_counter() - started) * 1000
+    return ordered, quality
+
+
+def _referee_shortage(
+    matches: List[Match],
+    slots: List[int],
+    participants: Dict[int, List[Any]],
+    is_doubles: bool
+) -> int:
+    """
+    Aantal schrijversbotsingen dat _assign_poule_referees in deze volgorde zou geven: per poule
+    en slot heeft elke wedstrijd een eigen vrije (niet spelende) deelnemer nodig, en
+    assign_referees pakt een vrije zolang die er is.
+    """
+    playing: Dict[Tuple[Any, int], set] = {}
+    counts: Dict[Tuple[Any, int], int] = {}
+    for m, slot in zip(matches, slots):
+        key = (m.poule_number, slot)
+        playing.setdefault(key, set()).update(e for e in match_entities(m, is_doubles) if e is not None)
+        counts[key] = counts.get(key, 0) + 1
+
+    shortage = 0
+    for (poule_num, slot), count in counts.items():
+        size = len(participants.get(poule_num, ()))
+        if size < 3:
+            continue # Geen schrijvers (zie assign_referees)
+        shortage += max(0, count - (size - len(playing[(poule_num, slot)])))
+    return shortage
+
+
+def _assign_poule_referees(
+    matches: List[Match],
+    slots: List[int],
+    participants: Dict[int, List[Any]],
+    is_doubles: bool
+) -> None:
+    """Referees per poule (je schrijft bij je eigen poule), in slotvolgorde."""
+    per_poule: Dict[int, List[Tuple[Match, int]]] = {}
+    for m, slot in zip(matches, slots):
+        per_poule.setdefault(m.poule_number, []).append((m, slot))
+    for poule_num, members in participants.items():
+        scheduled = sorted(per_poule.get(poule_num, []), key=lambda pair: pair[1])
+        assign_referees([m for m, _ in scheduled], members, is_doubles, slots=[slot for _, slot in scheduled])
+
+
+def assign_poule_boards(matches: List[Match], board_numbers: List[int], num_poules: int) -> None:
+    """
+    Wijst borden toe aan poule wedstrijden (in place; de lijst kan van volgorde veranderen).
+    Ook gebruikt door de planner, zodat die hetzelfde schema doorrekent.
+    """
+    # Scenario A: OVERFLOW (Meer borden dan poules) -> Dynamisch verdelen
+    # Bijv: 1 Poule, 2 Borden. Of 2 Poules, 4 Borden.
+    if len(board_numbers) > num_poules:
+        # We sorteren alle wedstrijden eerst op ronde, dan op poule.
+        # Zo vullen we ronde 1 eerst op bord 1, 2, 3...
+        matches.sort(key=lambda m: (m.round_number, m.poule_number))
+        
+        for i, match in enumerate(matches):
+            # Cyclisch toewijzen: Match 1->Bord 1, Match 2->Bord 2, Match 3->Bord 1...
+            board_idx = i % len(board_numbers)
+            match.board_number = board_numbers[board_idx]
+            
+    # Scenario B: STANDAARD (Gelijk of minder borden) -> Vaste toewijzing
+    # Bijv: 2 Poules, 2 Borden. Poule 1->Bord 1, Poule 2->Bord 2.
+    else:
+        for match in matches:
+            if match.poule_number and match.poule_number <= len(board_numbers):
+                # Poule 1 krijgt index 0 (Bord 1)
+                match.board_number = board_numbers[match.poule_number - 1]
+            else:
+                # Geen bord beschikbaar (Queue)
+                match.board_number = None
 
 
 def _create_round_robin_matches(
@@ -156,17 +250,27 @@ def _create_round_robin_matches(
 # 2. KNOCKOUT LOGICA & STANDEN
 # ==========================================
 
-def calculate_poule_standings(session: Session, tournament: Tournament) -> Dict[int, List[dict]]:
+def calculate_poule_standings(
+    session: Session,
+    tournament: Tournament,
+    matches: Optional[List[Match]] = None,
+    names: Optional[Dict[int, str]] = None
+) -> Dict[int, List[dict]]:
     """
     Berekent de stand per poule volgens Order of Merit Rules:
     Punten (2 per winst) -> Leg-Difference -> Head-to-Head -> 9-dart-Shoot-out.
+    Optioneel: al geladen wedstrijden en een id -> naam map (speler of team),
+    dan worden er geen extra queries gedaan.
     """
-    matches = session.exec(
-        select(Match)
-        .where(Match.tournament_id == tournament.id)
-        .where(Match.poule_number != None)
-        .where(Match.is_completed == True)
-    ).all()
+    if matches is None:
+        matches = session.exec(
+            select(Match)
+            .where(Match.tournament_id == tournament.id)
+            .where(Match.poule_number != None)
+            .where(Match.is_completed == True)
+        ).all()
+    else:
+        matches = [m for m in matches if m.poule_number is not None and m.is_completed]
 
     is_doubles = tournament.mode == "doubles"
     raw_standings = {} 
@@ -188,7 +292,11 @@ def calculate_poule_standings(session: Session, tournament: Tournament) -> Dict[
             }
 
     for m in matches:
-        if is_doubles:
+        if names is not None:
+            id_1, id_2 = (m.team1_id, m.team2_id) if is_doubles else (m.player1_id, m.player2_id)
+            fallback = "Team ?" if is_doubles else "Player ?"
+            name_1, name_2 = names.get(id_1, fallback), names.get(id_2, fallback)
+        elif is_doubles:
             if not m.team1 or not m.team2: session.refresh(m, ["team1", "team2"])
             id_1, id_2 = m.team1_id, m.team2_id
             name_1, name_2 = (m.team1.name if m.team1 else "Team ?"), (m.team2.name if m.team2 else "Team ?")
@@ -258,31 +366,6 @@ def calculate_poule_standings(session: Session, tournament: Tournament) -> Dict[
 
     return final_standings
 
-# Voeg deze helper toe bovenaan of vlak voor generate_knockout_bracket
-def get_bracket_order(num_items: int) -> List[int]:
-    """
-    Geeft de index-volgorde terug voor een standaard seeded bracket.
-    Bijv voor 4 items (Halve finales): [0, 3, 2, 1] -> Seed 1 vs 4, Seed 3 vs 2
-    """
-    if num_items == 0: return []
-    # Start met finale: seeds 1 en 2
-    rounds = [1, 2]
-    
-    # Bouw op tot het gewenste aantal (powers of 2)
-    while len(rounds) < num_items:
-        next_round = []
-        for seed in rounds:
-            next_round.append(seed)
-            next_round.append((len(rounds) * 2 + 1) - seed)
-        rounds = next_round
-        
-    # Converteer seeds (1-based) naar 0-based index en pas de pairing volgorde aan
-    # We willen dat Match 1 (index 0) speelt tegen Match 2 (index 1) in de volgende ronde.
-    # Standaard lijst: 1, 8, 5, 4, 3, 6, 7, 2
-    # Paar 1: 1 vs 8. Paar 2: 5 vs 4.
-    # Als we ze gewoon in deze volgorde in de DB zetten, speelt (1vs8) tegen (5vs4). Dat klopt!
-    return [x - 1 for x in rounds]
-
 def generate_knockout_bracket(session: Session, tournament: Tournament):
     """
     Genereert bracket met correcte seeding zodat toppers elkaar pas in de finale treffen.
@@ -308,17 +391,20 @@ def generate_knockout_bracket(session: Session, tournament: Tournament):
 
     # 2. Global Ranking (voor Seeds)
     # Sorteer iedereen op prestatie (Punten > Saldo > Won > Rank)
+    # Met seeding op rating telt binnen dezelfde poulepositie eerst de rating
+    ratings = {}
+    if tournament.seeding == SEEDING_RATING:
+        ratings = rating_map(session, "team" if is_doubles else "player", [q['id'] for q in qualifiers])
     qualifiers.sort(key=lambda x: (
         x['poule_rank'],      # Eerst alle nummers 1
+        -ratings.get(x['id'], DEFAULT_RATING),
         -x['points'],         # Dan meeste punten
         -x['leg_diff'],       # Dan beste saldo
         -x['legs_won']
     ))
 
     total_players = len(qualifiers)
-    bracket_size = 2
-    while bracket_size < total_players:
-        bracket_size *= 2
+    bracket_size = bracket_size_for(total_players)
     
     num_byes = bracket_size - total_players
     
@@ -401,8 +487,8 @@ def generate_knockout_bracket(session: Session, tournament: Tournament):
     # Bijv: 6 spelers -> bracket 8 -> 2 Byes, 2 Matches. Totaal 4 slots in de boom.
     num_slots_in_round = bracket_size // 2
     
-    # Haal de index-volgorde op
-    order_indices = get_bracket_order(num_slots_in_round)
+    # Haal de index-volgorde op (gedeeld template per bracketgrootte)
+    order_indices = seed_order(num_slots_in_round)
     
     final_matches_list = []
     
@@ -410,34 +496,53 @@ def generate_knockout_bracket(session: Session, tournament: Tournament):
     # Hierdoor pakt 'check_and_advance' straks automatisch Match 1 vs Match 2.
     for idx in order_indices:
         if idx < len(bracket_slots):
+            bracket_slots[idx].bracket_slot = len(final_matches_list)
             final_matches_list.append(bracket_slots[idx])
 
     session.add_all(final_matches_list)
     session.commit()
 
 
-def check_and_advance_knockout(tournament_id: int, current_round: int, session: Session):
+def check_and_advance_knockout(tournament_id: int, current_round: int, session: Session, match_id: Optional[int] = None):
     """
     Checkt of ronde klaar is en genereert de volgende.
+    Race-vrij: eerst een lock per toernooi, en de unieke index op
+    (tournament_id, round_number, bracket_slot) vangt alles wat daar toch langs komt.
+    match_id (de zojuist afgeronde wedstrijd) gebruikt alleen double elimination.
     """
     tournament = session.get(Tournament, tournament_id)
     if not tournament: return
     is_doubles = tournament.mode == "doubles"
 
+    # Lock vóór de reads: een tweede request wacht hier tot de eerste klaar is en ziet dan de nieuwe ronde
+    lock_tournament(session, tournament_id)
+
+    if tournament.format == SWISS_FORMAT:
+        # Swiss: volgende ronde op basis van de stand in plaats van winnaars doorschuiven
+        advance_swiss(session, tournament, current_round)
+        return
+    if tournament.format == DOUBLE_ELIMINATION_FORMAT:
+        # Double elimination: vaste routering per wedstrijd, niet per ronde
+        advance_double_elimination(session, tournament, current_round, match_id)
+        return
+
     matches = session.exec(
         select(Match)
         .where(Match.tournament_id == tournament_id)
         .where(Match.round_number == current_round)
         .where(Match.poule_number == None) 
+        .execution_options(populate_existing=True)
     ).all()
     
+    # Bij een vroege return houdt de transactie van de aanroeper de lock tot diens commit
     if not matches or not all(m.is_completed for m in matches): return
 
     next_round = current_round + 1
     existing = session.exec(select(Match).where(Match.tournament_id==tournament_id).where(Match.round_number==next_round).where(Match.poule_number==None)).first()
     if existing: return
 
-    matches.sort(key=lambda m: m.id)
+    # Volgorde in het schema; oudere toernooien hebben nog geen slot, daar is het id de volgorde
+    matches.sort(key=lambda m: (m.bracket_slot is None, m.bracket_slot or 0, m.id))
     next_round_count = len(matches) // 2
     if next_round_count < 1: return
 
@@ -457,6 +562,7 @@ def check_and_advance_knockout(tournament_id: int, current_round: int, session:
             tournament_id=tournament_id,
             round_number=next_round,
             poule_number=None,
+            bracket_slot=i,
             best_of_legs=tournament.starting_legs_ko,
             best_of_sets=tournament.sets_per_match,
             is_completed=False,
@@ -471,7 +577,11 @@ def check_and_advance_knockout(tournament_id: int, current_round: int, session:
         new_matches.append(new_match)
         
     session.add_all(new_matches)
-    session.commit()
+    try:
+        session.commit()
+    except IntegrityError:
+        # Iemand anders (bijv. een ander proces zonder gedeelde lock) was net eerder
+        session.rollback()
 
 
 # ==========================================
@@ -483,9 +593,14 @@ def generate_knockout(
     players: List[Player], 
     legs_best_of: int,
     sets_best_of: int,
-    session: Session
+    session: Session,
+    seed_by_rating: bool = False
 ):
     random.shuffle(players)
+    if seed_by_rating:
+        # Hoogste rating = seed 1; byes gaan dan naar de sterkste spelers
+        ratings = rating_map(session, "player", [p.id for p in players])
+        players.sort(key=lambda p: -ratings.get(p.id, DEFAULT_RATING))
     class FakeTournament:
         id = tournament_id
         starting_legs_ko = legs_best_of
@@ -496,19 +611,19 @@ def generate_knockout(
     _create_bracket_matches(fake_tourn, player_ids, session)
 
 def _create_bracket_matches(tournament, player_ids, session):
-    n = len(player_ids)
-    bracket_size = 1
-    while bracket_size < n:
-        bracket_size *= 2
-    padded_players = list(player_ids)
-    while len(padded_players) < bracket_size:
-        padded_players.append(None)
+    """
+    Eerste KO ronde volgens het seeding template (player_ids op volgorde van plaatsing).
+    Byes worden voltooide wedstrijden zonder tegenstander, net als in generate_knockout_bracket;
+    zo blijft elke plek in het schema bezet en schuift check_and_advance de juiste winnaars door.
+    """
     matches = []
-    for i in range(bracket_size // 2):
-        p1 = padded_players[i]
-        p2 = padded_players[bracket_size - 1 - i]
-        if p1 and p2:
-            matches.append(_create_ko_match(tournament, p1, p2))
+    for slot, (seed, opponent) in enumerate(first_round(len(player_ids))):
+        match = _create_ko_match(tournament, player_ids[seed], player_ids[opponent] if opponent is not None else None)
+        match.bracket_slot = slot
+        if opponent is None:
+            match.is_completed = True
+            match.score_p1 = math.ceil(tournament.starting_legs_ko / 2)
+        matches.append(match)
     session.add_all(matches)
     session.commit()
 
@@ -554,56 +669,73 @@ def create_manual_team(tournament_id: int, player_ids: list[int], custom_name: s
     session.refresh(team)
     return team
 
-def assign_referees(matches: List[Match], participants: List[Any], is_doubles: bool):
+def assign_referees(matches: List[Match], participants: List[Any], is_doubles: bool, slots: Optional[List[int]] = None):
     """
     Wijst scheidsrechters toe met prioriteiten:
     1. Gelijke verdeling (count).
     2. Locatie (liefst op hetzelfde bord blijven).
     3. Rusttijd (gap).
+    Met 'slots' (tijdslot per wedstrijd, zie schedule_order) telt de rust in slots en
+    schrijft niemand een wedstrijd terwijl hij zelf speelt of al schrijft op een ander bord.
     """
     if len(participants) < 3: return
 
-    ref_counts = {p.id: 0 for p in participants}
+    # Alles op id: de deelnemers zelf zijn (ORM) objecten, en dit draait voor elke poule
+    ids = [p.id for p in participants]
+    ref_counts = {pid: 0 for pid in ids}
     
     # We houden bij wanneer (index) en WAAR (bord) iemand actief was
-    last_active_index = {p.id: -1 for p in participants}
-    last_active_board = {p.id: None for p in participants}
+    last_active_index = {pid: -1 for pid in ids}
+    last_active_board = {pid: None for pid in ids}
+
+    # ORM attributen één keer lezen
+    rows = [
+        ((m.team1_id, m.team2_id) if is_doubles else (m.player1_id, m.player2_id), m.board_number)
+        for m in matches
+    ]
+
+    # Wie is er per slot al bezet (spelen of schrijven)?
+    busy: Dict[int, set] = {}
+    if slots is not None:
+        for (pair, _), slot in zip(rows, slots):
+            busy.setdefault(slot, set()).update(pair)
 
     for i, match in enumerate(matches):
-        # 1. Spelers identificeren
-        if is_doubles:
-            p1_id, p2_id = match.team1_id, match.team2_id
-        else:
-            p1_id, p2_id = match.player1_id, match.player2_id
+        now = slots[i] if slots is not None else i
 
-        current_board = match.board_number
+        # 1. Spelers identificeren
+        (p1_id, p2_id), current_board = rows[i]
 
         # Spelers zijn nu actief op dit bord
         if p1_id: 
-            last_active_index[p1_id] = i
+            last_active_index[p1_id] = now
             last_active_board[p1_id] = current_board
         if p2_id: 
-            last_active_index[p2_id] = i
+            last_active_index[p2_id] = now
             last_active_board[p2_id] = current_board
 
         # 2. Kandidaten zoeken (niet zelf aan het spelen)
-        candidates = [p for p in participants if p.id not in (p1_id, p2_id)]
+        candidates = [pid for pid in ids if pid != p1_id and pid != p2_id]
+        if slots is not None:
+            # Liefst niemand die in dit slot al ergens anders bezig is
+            now_busy = busy[now]
+            candidates = [pid for pid in candidates if pid not in now_busy] or candidates
         if not candidates: continue
 
         # 3. Scoring Algoritme
         # Score = (Aantal keer geschreven * 100) + LocatieStraf - Rusttijd
         # Laagste score wint.
-        def get_score(candidate):
-            count = ref_counts[candidate.id]
+        def get_score(candidate_id):
+            count = ref_counts[candidate_id]
             
             # Rustfactor
-            last_idx = last_active_index[candidate.id]
-            gap = i - last_idx if last_idx != -1 else 999 
+            last_idx = last_active_index[candidate_id]
+            gap = now - last_idx if last_idx != -1 else 999 
             
             # Locatiefactor (Sectie 5d)
             # Als je vorige keer op bord X was, en nu is de match op bord Y -> Strafpunten
             location_penalty = 0
-            last_board = last_active_board[candidate.id]
+            last_board = last_active_board[candidate_id]
             
             if last_board is not None and current_board is not None:
                 if last_board != current_board:
@@ -612,16 +744,17 @@ def assign_referees(matches: List[Match], participants: List[Any], is_doubles: b
             
             return (count * 100) + location_penalty - gap
 
-        candidates.sort(key=get_score)
-        best_ref = candidates[0]
+        best_ref = min(candidates, key=get_score)
 
         # 4. Toewijzen
         if is_doubles:
-            match.referee_team_id = best_ref.id
+            match.referee_team_id = best_ref
         else:
-            match.referee_id = best_ref.id
+            match.referee_id = best_ref
 
         # 5. Tracking updaten
-        ref_counts[best_ref.id] += 1
-        last_active_index[best_ref.id] = i
-        last_active_board[best_ref.id] = current_board # Ref is nu hier actief
\ No newline at end of file
+        ref_counts[best_ref] += 1
+        last_active_index[best_ref] = now
+        if slots is not None:
+            busy[now].add(best_ref)
+        last_active_board[best_ref] = current_board # Ref is nu hier actief
\ No newline at end of file
@@ -0,0 +1,47 @@
+"""
+Benchmark voor de double elimination routering.
+
+Gebruik (vanuit backend/):
+    python scripts/bench_double_elimination.py [max_deelnemers]
+
+Meet per veldgrootte de koude opbouw (lege cache) van routing_table + bye_plan en
+de tijd met een gevulde routeringstabel (alleen bye_plan).
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.services.double_elimination import bye_plan, routing_table # noqa: E402
+
+SIZES = (8, 16, 32, 64, 100, 128, 200, 256, 500, 1000, 1024)
+REPEATS = 5
+
+
+def measure(entity_count: int, keep_table: bool) -> float:
+    """Beste van REPEATS runs, in milliseconden."""
+    best = float("inf")
+    for _ in range(REPEATS):
+        bye_plan.cache_clear()
+        if not keep_table:
+            routing_table.cache_clear()
+        start = time.perf_counter()
+        bye_plan(entity_count)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else max(SIZES)
+    print(f"{'deelnemers':>10} {'wedstrijden':>12} {'koud (ms)':>10} {'tabel warm (ms)':>16}")
+    for entity_count in SIZES:
+        if entity_count > limit:
+            break
+        cold = measure(entity_count, keep_table=False)
+        warm = measure(entity_count, keep_table=True)
+        print(f"{entity_count:>10} {len(bye_plan(entity_count)):>12} {cold:>10.2f} {warm:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
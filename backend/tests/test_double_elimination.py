@@ -0,0 +1,91 @@
+"""
+Invarianten van de double elimination routering, voor elke veldgrootte tot en met 256.
+Per veld wordt de hele bracket 'gespeeld' met willekeurige uitslagen via bye_plan:
+elke bestemming moet een latere, nog lege plek zijn en iedereen behalve de finalisten
+ligt er na precies twee nederlagen uit.
+"""
+import random
+
+import pytest
+
+from app.services.double_elimination import (
+    GRAND_FINAL, LOSERS, WINNERS, bye_plan, decode_target, routing_table
+)
+from app.services.seeding import bracket_size_for
+
+MAX_ENTITIES = 256
+
+
+def play(entity_count: int, rng: random.Random) -> tuple:
+    """Speelt het plan af; geeft (plan, kanten per wedstrijd, nederlagen per seed)."""
+    plan = bye_plan(entity_count)
+    sides = [[seed_a, seed_b] for (_, _, _, seed_a, seed_b, _, _) in plan]
+    losses = {}
+    for pos, (_, bracket, _, _, _, winner_to, loser_to) in enumerate(plan):
+        a, b = sides[pos]
+        assert a is not None and b is not None and a != b
+        assert losses.get(a, 0) < 2 and losses.get(b, 0) < 2
+        winner, loser = (a, b) if rng.random() < 0.5 else (b, a)
+        losses[loser] = losses.get(loser, 0) + 1
+        for target, entity in ((winner_to, winner), (loser_to, loser)):
+            if target is None:
+                continue
+            slot, side = decode_target(target)
+            assert slot > pos
+            assert sides[slot][side] is None
+            sides[slot][side] = entity
+        if loser_to is None:
+            assert losses[loser] == 2 or bracket == GRAND_FINAL
+    return plan, sides, losses
+
+
+@pytest.mark.parametrize("entity_count", range(2, MAX_ENTITIES + 1))
+def test_bye_plan_eliminates_after_two_losses(entity_count):
+    plan, sides, losses = play(entity_count, random.Random(entity_count))
+
+    assert len(plan) == 2 * entity_count - 2
+    assert plan[-1][1] == GRAND_FINAL
+    assert sum(1 for entry in plan if entry[5] is None) == 1 # Alleen de grand final heeft geen winner_to
+    finalists = set(sides[-1])
+    assert all(losses.get(seed, 0) == 2 for seed in range(entity_count) if seed not in finalists)
+    assert sorted(losses.get(seed, 0) for seed in finalists) in ([0, 2], [1, 1])
+
+
+@pytest.mark.parametrize("bracket_size", [2 ** k for k in range(1, 9)])
+def test_routing_table_full_bracket(bracket_size):
+    table = routing_table(bracket_size)
+    k = bracket_size.bit_length() - 1
+
+    assert len(table) == 2 * bracket_size - 2
+    assert sum(1 for entry in table if entry[0] == WINNERS) == bracket_size - 1
+    assert sum(1 for entry in table if entry[0] == LOSERS) == bracket_size - 2
+    assert table[-1][:2] == (GRAND_FINAL, 1)
+    if k > 1:
+        assert max(entry[1] for entry in table if entry[0] == LOSERS) == 2 * (k - 1)
+
+    # Elke plek (wedstrijd + kant) wordt door hoogstens één route gevuld, altijd vooruit
+    filled = set()
+    for slot, (_, _, winner_to, loser_to) in enumerate(table):
+        for target in (winner_to, loser_to):
+            if target is None:
+                continue
+            assert decode_target(target)[0] > slot
+            assert target not in filled
+            filled.add(target)
+    first_round = {2 * slot + side for slot in range(bracket_size // 2) for side in (0, 1)}
+    assert filled | first_round == set(range(2 * len(table)))
+
+
+def test_bye_plan_matches_full_table_without_byes():
+    for bracket_size in (2, 4, 64, 256):
+        assert bracket_size_for(bracket_size) == bracket_size
+        plan = bye_plan(bracket_size)
+        table = routing_table(bracket_size)
+        assert [entry[0] for entry in plan] == list(range(len(table)))
+        assert [(entry[5], entry[6]) for entry in plan] == [(entry[2], entry[3]) for entry in table]
+
+
+@pytest.mark.parametrize("bracket_size", [0, 1, 3, 6, 12, 100, 255])
+def test_routing_table_rejects_non_power_of_two(bracket_size):
+    with pytest.raises(ValueError):
+        routing_table(bracket_size)
@@ -0,0 +1,157 @@
+"""
+Stresstest voor de knockout progressie: veel threads ronden tegelijk wedstrijden af en
+draaien daarna elk de check (zoals de outbox worker dat doet). Er mag precies één
+volgende ronde ontstaan, hoe de threads ook door elkaar lopen.
+
+Draait op een SQLite bestand (geen :memory:), zodat elke thread een eigen connectie
+heeft en de locking van de database echt meedoet.
+"""
+import threading
+import time
+
+import pytest
+from sqlalchemy import event, func
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.models import dartboard, links, team, scorer_auth, archive, outbox, timing, swiss, rating # noqa: F401
+from app.models.match import Match
+from app.models.player import Player
+from app.models.tournament import Tournament
+from app.models.user import User
+from app.services import change_feed, outbox as outbox_service # noqa: F401
+from app.services.tournament_gen import check_and_advance_knockout
+
+THREADS = 16
+ITERATIONS = 5
+
+# Korte pauze per query: vergroot het venster tussen 'lezen' en 'schrijven', zodat de
+# threads echt door elkaar lopen (zonder lock gaat het dan vrijwel altijd mis)
+QUERY_DELAY_SECONDS = 0.002
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'race.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30}
+    )
+    SQLModel.metadata.create_all(engine)
+    event.listen(engine, "before_cursor_execute", lambda *args: time.sleep(QUERY_DELAY_SECONDS))
+    yield engine
+    engine.dispose()
+
+
+def create_first_round(engine, entity_count: int, completed: bool) -> int:
+    """Knockout toernooi met een volle eerste ronde (bracket_slot 0..n/2-1)."""
+    with Session(engine) as session:
+        user = User(first_name="Test", last_name="Race", email=f"race-{id(session)}@example.com", hashed_password="x")
+        session.add(user)
+        session.flush()
+        tournament = Tournament(date="2026-01-01", user_id=user.id, format="knockout", status="active")
+        players = [Player(first_name=f"P{i}", user_id=user.id) for i in range(entity_count)]
+        session.add(tournament)
+        session.add_all(players)
+        session.flush()
+
+        for slot in range(entity_count // 2):
+            session.add(Match(
+                tournament_id=tournament.id,
+                round_number=1,
+                poule_number=None,
+                bracket_slot=slot,
+                player1_id=players[2 * slot].id,
+                player2_id=players[2 * slot + 1].id,
+                best_of_legs=3,
+                score_p1=2 if completed else 0,
+                score_p2=0,
+                is_completed=completed
+            ))
+        session.commit()
+        return tournament.id
+
+
+def run_threads(count: int, target) -> list:
+    """Start 'count' threads tegelijk (barrier) en verzamelt hun fouten."""
+    barrier = threading.Barrier(count)
+    errors = []
+
+    def worker(index: int) -> None:
+        barrier.wait()
+        try:
+            target(index)
+        except Exception as e: # noqa: BLE001 - elke fout is een mislukte test
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=60)
+    return errors
+
+
+def knockout_rounds(engine, tournament_id: int) -> dict:
+    """Ronde -> gesorteerde bracket_slots."""
+    with Session(engine) as session:
+        matches = session.exec(
+            select(Match)
+            .where(Match.tournament_id == tournament_id)
+            .where(Match.poule_number == None)
+        ).all()
+    rounds = {}
+    for match in matches:
+        rounds.setdefault(match.round_number, []).append(match.bracket_slot)
+    return {r: sorted(slots) for r, slots in rounds.items()}
+
+
+@pytest.mark.parametrize("iteration", range(ITERATIONS))
+def test_parallel_completions_create_one_next_round(engine, iteration):
+    """Elke thread rondt een eigen wedstrijd af en draait daarna de check."""
+    entity_count = 2 * THREADS
+    tournament_id = create_first_round(engine, entity_count, completed=False)
+    with Session(engine) as session:
+        match_ids = session.exec(
+            select(Match.id).where(Match.tournament_id == tournament_id).order_by(Match.bracket_slot)
+        ).all()
+
+    def complete_and_advance(index: int) -> None:
+        with Session(engine) as session:
+            match = session.get(Match, match_ids[index])
+            match.score_p1 = 2
+            match.score_p2 = 1
+            match.is_completed = True
+            session.add(match)
+            session.commit()
+            # Aparte transactie, net als de outbox worker
+            check_and_advance_knockout(tournament_id, 1, session, match.id)
+            session.commit()
+
+    errors = run_threads(THREADS, complete_and_advance)
+
+    assert errors == []
+    rounds = knockout_rounds(engine, tournament_id)
+    assert rounds[1] == list(range(THREADS))
+    assert rounds[2] == list(range(THREADS // 2))
+    assert set(rounds) == {1, 2}
+
+
+def test_repeated_checks_for_same_round_create_one_next_round(engine):
+    """Alle threads draaien tegelijk de check voor een ronde die al klaar is."""
+    tournament_id = create_first_round(engine, 16, completed=True)
+
+    def advance(_: int) -> None:
+        with Session(engine) as session:
+            check_and_advance_knockout(tournament_id, 1, session)
+            session.commit()
+
+    errors = run_threads(THREADS, advance)
+
+    assert errors == []
+    with Session(engine) as session:
+        next_round = session.exec(
+            select(func.count(Match.id))
+            .where(Match.tournament_id == tournament_id)
+            .where(Match.round_number == 2)
+        ).one()
+    assert next_round == 4
+    assert knockout_rounds(engine, tournament_id)[2] == [0, 1, 2, 3]
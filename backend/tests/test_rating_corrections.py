@@ -0,0 +1,146 @@
+"""
+Ratings bij heropende en gecorrigeerde wedstrijden: de outbox handler draait de eerder
+toegepaste update terug voordat de nieuwe uitslag telt. Het resultaat moet gelijk zijn aan
+een volledige herberekening, en niemand mag een wedstrijd dubbel geteld krijgen.
+"""
+from datetime import datetime
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.models import dartboard, links, team, scorer_auth, archive, outbox, timing, swiss # noqa: F401
+from app.models.match import Match
+from app.models.outbox import OutboxEvent
+from app.models.player import Player
+from app.models.rating import Rating, RatingApplication
+from app.models.tournament import Tournament
+from app.models.user import User
+from app.services import change_feed, outbox as outbox_service # noqa: F401
+from app.services.rating import recompute_ratings, update_ratings_for_event
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rating.db'}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def create_matches(engine):
+    """Poule met vier spelers en twee wedstrijden zonder gedeelde speler."""
+    with Session(engine) as session:
+        user = User(first_name="Test", last_name="Rating", email="rating@example.com", hashed_password="x")
+        session.add(user)
+        session.flush()
+        tournament = Tournament(date="2026-01-01", user_id=user.id, status="active")
+        players = [Player(first_name=f"P{i}", user_id=user.id) for i in range(4)]
+        session.add(tournament)
+        session.add_all(players)
+        session.flush()
+        matches = [
+            Match(tournament_id=tournament.id, round_number=1, poule_number=1, best_of_legs=5,
+                  player1_id=players[i].id, player2_id=players[i + 1].id, is_completed=False)
+            for i in (0, 2)
+        ]
+        session.add_all(matches)
+        session.commit()
+        return [m.id for m in matches]
+
+
+def set_score(engine, match_id: int, score_p1: int, score_p2: int) -> None:
+    with Session(engine) as session:
+        match = session.get(Match, match_id)
+        match.score_p1, match.score_p2 = score_p1, score_p2
+        match.is_completed = max(score_p1, score_p2) == 3
+        match.completed_at = datetime.utcnow() if match.is_completed else None
+        session.add(match)
+        session.commit()
+
+
+def drain(engine) -> None:
+    """Verwerkt de openstaande events zoals de outbox worker dat doet (alleen de ratings)."""
+    with Session(engine) as session:
+        event_ids = session.exec(
+            select(OutboxEvent.id).where(OutboxEvent.processed_at == None).order_by(OutboxEvent.id)
+        ).all()
+    for event_id in event_ids:
+        with Session(engine) as session:
+            outbox_event = session.get(OutboxEvent, event_id)
+            update_ratings_for_event(session, outbox_event)
+            outbox_event.processed_at = datetime.utcnow()
+            session.add(outbox_event)
+            session.commit()
+
+
+def ratings(engine):
+    with Session(engine) as session:
+        return {row.entity_id: (row.rating, row.rd, row.matches) for row in session.exec(select(Rating)).all()}
+
+
+def assert_same_ratings(actual, expected) -> None:
+    assert actual.keys() == expected.keys()
+    for entity_id, (rating, rd, played) in actual.items():
+        assert rating == pytest.approx(expected[entity_id][0])
+        assert rd == pytest.approx(expected[entity_id][1])
+        assert played == expected[entity_id][2]
+
+
+def assert_matches_recompute(engine) -> None:
+    incremental = ratings(engine)
+    with Session(engine) as session:
+        recompute_ratings(session)
+    assert_same_ratings(incremental, ratings(engine))
+
+
+def test_reopen_and_recomplete_counts_once(engine):
+    first, second = create_matches(engine)
+    set_score(engine, first, 3, 1)
+    set_score(engine, second, 3, 2)
+    drain(engine)
+    completed = ratings(engine)
+
+    set_score(engine, first, 2, 1) # Heropend
+    drain(engine)
+    with Session(engine) as session:
+        assert session.exec(select(RatingApplication).where(RatingApplication.match_id == first)).first() is None
+    with Session(engine) as session:
+        match = session.get(Match, first)
+        sides = (match.player1_id, match.player2_id)
+    assert [ratings(engine)[entity_id][2] for entity_id in sides] == [0, 0]
+
+    set_score(engine, first, 3, 1)
+    drain(engine)
+    assert_same_ratings(ratings(engine), completed)
+    assert_matches_recompute(engine)
+
+
+def test_score_correction_replaces_update(engine):
+    first, second = create_matches(engine)
+    set_score(engine, first, 3, 1)
+    set_score(engine, second, 3, 2)
+    drain(engine)
+
+    set_score(engine, first, 3, 0) # Correctie terwijl de wedstrijd voltooid blijft
+    drain(engine)
+    with Session(engine) as session:
+        assert session.exec(select(OutboxEvent).where(OutboxEvent.event_type == outbox_service.MATCH_RESULT_CHANGED)).first()
+    assert_matches_recompute(engine)
+
+    # Na een herberekening draait een correctie precies de herberekende update terug
+    set_score(engine, second, 0, 3)
+    drain(engine)
+    assert_matches_recompute(engine)
+
+
+def test_retried_event_is_ignored(engine):
+    first, _ = create_matches(engine)
+    set_score(engine, first, 3, 1)
+    drain(engine)
+    before = ratings(engine)
+
+    with Session(engine) as session:
+        outbox_event = session.exec(select(OutboxEvent)).first()
+        update_ratings_for_event(session, outbox_event)
+        session.commit()
+    assert ratings(engine) == before
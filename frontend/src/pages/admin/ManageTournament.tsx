@@ -170,11 +170,13 @@ const ManageTournament = () => {
         await api.put(`/matches/${matchId}/score`, {
             score_p1: 0,
             score_p2: 0,
-            is_completed: false
+            is_completed: false,
+            version: matches.find(m => m.id === matchId)?.version
         });
         loadData();
-    } catch (err) {
-        alert("Reset mislukt.");
+    } catch (err: any) {
+        alert(err.response?.status === 409 ? err.response.data.detail.message : "Reset mislukt.");
+        if (err.response?.status === 409) loadData();
     }
   };
 
@@ -204,7 +206,8 @@ const ManageTournament = () => {
               score_p2: match.score_p2,
               is_completed: true,
               referee_id: match.referee_id,        
-              custom_referee_name: match.custom_referee_name 
+              custom_referee_name: match.custom_referee_name,
+              version: match.version
           });
           setMatches(prev => prev.map(m => m.id === match.id ? { ...m, is_saving: false, save_success: true, is_completed: true } : m));
           setExpandedMatchIds(prev => prev.filter(id => id !== match.id));
@@ -214,9 +217,12 @@ const ManageTournament = () => {
           }, 2000);
       } catch (err: any) {
           console.error(err);
-          const errorMessage = err.response?.data?.detail || "Error saving score";
+          const detail = err.response?.data?.detail;
+          const errorMessage = detail?.message || detail || "Error saving score";
           alert(errorMessage); 
           setMatches(prev => prev.map(m => m.id === match.id ? { ...m, is_saving: false } : m));
+          // 409: iemand anders was sneller, actuele stand ophalen
+          if (err.response?.status === 409) loadData(true);
       }
   };
 
@@ -353,7 +359,8 @@ const ManageTournament = () => {
   const handleRefereeChange = async (matchId: number, value: string) => {
     let payload: any = { 
         score_p1: matches.find(m => m.id === matchId)?.score_p1 || 0,
-        score_p2: matches.find(m => m.id === matchId)?.score_p2 || 0
+        score_p2: matches.find(m => m.id === matchId)?.score_p2 || 0,
+        version: matches.find(m => m.id === matchId)?.version
     };
 
     if (value === "CUSTOM_PROMPT") {
@@ -372,8 +379,9 @@ const ManageTournament = () => {
     try {
         await api.put(`/matches/${matchId}/score`, payload);
         loadData(false); 
-    } catch (err) {
+    } catch (err: any) {
         console.error("Update failed", err);
+        if (err.response?.status === 409) loadData(false);
     }
   };
 
@@ -41,6 +41,11 @@ const Scoreboard = () => {
   const [boardStatus, setBoardStatus] = useState<StatusResponse | null>(null);
   const intervalRef = useRef<any>(null);
 
+  // Laatst geziene versie van de wedstrijd (optimistic concurrency) en de lopende opslag-keten,
+  // zodat snelle tikken na elkaar steeds de versie van de vorige opslag gebruiken
+  const versionRef = useRef<number | undefined>(undefined);
+  const saveChainRef = useRef<Promise<void>>(Promise.resolve());
+
   const sessionStr = localStorage.getItem('scorer_session');
   const isTabletMode = sessionStr !== null;
 
@@ -57,6 +62,7 @@ const Scoreboard = () => {
                 setScoreP1(match.score_p1);
                 setScoreP2(match.score_p2);
                 setIsCompleted(match.is_completed);
+                versionRef.current = match.version;
                 setRefereeName(match.referee_name || '-');
             }
         } catch (err) {
@@ -94,12 +100,31 @@ const Scoreboard = () => {
     setScoreP1(p1);
     setScoreP2(p2);
     setIsCompleted(completed);
-    try {
-      await api.put(`/matches/${match_id}/score`, { score_p1: p1, score_p2: p2, is_completed: completed });
-      if (completed) handleNavigation();
-    } catch (err: any) {
-      alert("Fout bij opslaan: " + (err.response?.data?.detail || "Onbekende fout"));
-    }
+    const save = async () => {
+      try {
+        const res = await api.put(`/matches/${match_id}/score`, {
+            score_p1: p1, score_p2: p2, is_completed: completed, version: versionRef.current
+        });
+        versionRef.current = res.data.version;
+        if (completed) handleNavigation();
+      } catch (err: any) {
+        if (err.response?.status === 409) {
+            // Iemand anders heeft de stand gewijzigd: actuele stand tonen
+            const current = err.response.data.detail.current;
+            if (current) {
+                versionRef.current = current.version;
+                setScoreP1(current.score_p1);
+                setScoreP2(current.score_p2);
+                setIsCompleted(current.is_completed);
+            }
+            alert(err.response.data.detail.message);
+            return;
+        }
+        alert("Fout bij opslaan: " + (err.response?.data?.detail || "Onbekende fout"));
+      }
+    };
+    saveChainRef.current = saveChainRef.current.then(save);
+    await saveChainRef.current;
   };
 
   if (loadingMatch) return (
@@ -20,7 +20,8 @@ const ScorerLogin = () => {
             const { tournament_id, board_number } = res.data;
 
             // 2. Sla sessie op in localStorage zodat we na refresh nog weten wie we zijn
-            localStorage.setItem('scorer_session', JSON.stringify({ tournament_id, board_number }));
+            // (de code gaat mee met de polling, zodat de server weet wanneer een wedstrijd is afgeroepen)
+            localStorage.setItem('scorer_session', JSON.stringify({ tournament_id, board_number, code }));
 
             // 3. Ga naar de standby pagina
             navigate('/scorer/standby');
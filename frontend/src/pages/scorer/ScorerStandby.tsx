@@ -24,7 +24,7 @@ interface StatusResponse {
 
 const ScorerStandby = () => {
     const navigate = useNavigate();
-    const [sessionData, setSessionData] = useState<{tournament_id: number, board_number: number} | null>(null);
+    const [sessionData, setSessionData] = useState<{tournament_id: number, board_number: number, code?: string} | null>(null);
     const [data, setData] = useState<StatusResponse | null>(null);
     const intervalRef = useRef<any>(null);
 
@@ -41,7 +41,9 @@ const ScorerStandby = () => {
 
         const checkStatus = async () => {
             try {
-                const res = await api.get(`/scorer/status/${sessionData.tournament_id}/${sessionData.board_number}`);
+                const res = await api.get(`/scorer/status/${sessionData.tournament_id}/${sessionData.board_number}`, {
+                    params: { code: sessionData.code }
+                });
                 const statusData: StatusResponse = res.data;
                 setData(statusData);
 
@@ -54,6 +54,7 @@ export interface Match {
     player2?: Player | null;
 
     referee_name?: string;
+    version?: number;
 }
 
 export interface Team {